@@ -35,6 +35,12 @@ BuildRequires:  python3-requests
 BuildRequires:  python3-requests-kerberos
 BuildRequires:  python3-PyYAML
 BuildRequires:  python3-jsonschema
+%if %{python3_version_nodots} < 38
+BuildRequires:  python3-importlib-metadata
+%endif
+%if %{python3_version_nodots} < 37
+BuildRequires:  python3-contextvars
+%endif
 %endif # with_check
 
 Provides:       osbs = %{version}-%{release}
@@ -54,11 +60,17 @@ Requires:       python3-jsonschema
 Requires:       python3-requests
 Requires:       python3-requests-kerberos
 Requires:       python3-dateutil
-Requires:       python3-setuptools
 Requires:       python3-six
 Requires:       krb5-workstation
 Requires:       python3-PyYAML
 Requires:       git-core
+# backports of modules added in later Python versions, see requirements.txt
+%if %{python3_version_nodots} < 38
+Requires:       python3-importlib-metadata
+%endif
+%if %{python3_version_nodots} < 37
+Requires:       python3-contextvars
+%endif
 
 Provides:       python3-osbs = %{version}-%{release}
 Obsoletes:      python3-osbs < %{osbs_obsolete_vr}
@@ -0,0 +1,155 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Accounting of API requests per OSBS operation
+"""
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import urlsplit
+import contextvars
+import threading
+
+
+# name of the OSBS API method being called, set by the osbsapi decorator
+_operation = contextvars.ContextVar('osbs_operation', default=None)
+
+RequestKey = namedtuple('RequestKey', ['operation', 'method', 'endpoint'])
+
+
+def current_operation():
+    """
+    :return: str, name of the OSBS operation in progress, None outside of any
+    """
+    return _operation.get()
+
+
+@contextmanager
+def operation(name):
+    """
+    Charge requests made in this context to the operation
+
+    Operations called by other operations are charged to the outermost one.
+    """
+    if _operation.get() is not None:
+        yield
+        return
+    token = _operation.set(name)
+    try:
+        yield
+    finally:
+        _operation.reset(token)
+
+
+def charge_generator(name, generator):
+    """
+    Charge requests made while consuming the generator to the operation
+
+    Context variables set in a generator would leak to its consumer, so the
+    operation is set only for the time of producing each item. Generators of
+    log lines produce many items, so this avoids the overhead of operation().
+    """
+    try:
+        while True:
+            token = _operation.set(name) if _operation.get() is None else None
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                if token is not None:
+                    _operation.reset(token)
+            yield item
+    finally:
+        generator.close()
+
+
+def propagate(func):
+    """
+    Charge requests made by func to the current operation, even when it runs
+    in another thread
+    """
+    name = _operation.get()
+
+    @wraps(func)
+    def with_operation(*args, **kwargs):
+        token = _operation.set(name)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _operation.reset(token)
+
+    return with_operation
+
+
+def endpoint(method, url):
+    """
+    Group URLs of API requests by the kind of resource they access
+
+    :param method: str, HTTP method
+    :param url: str, request URL
+    :return: tuple, (method, endpoint), method is 'WATCH' for watches and
+             the endpoint is e.g. 'pipelineruns', 'pipelineruns/{name}' or
+             'pods/{name}/log'; URLs outside namespaces are kept as they are
+    """
+    method = method.upper()
+    path = urlsplit(url).path.strip('/')
+    parts = path.split('/')
+    if 'watch' in parts:
+        method = 'WATCH'
+    if 'namespaces' not in parts:
+        return method, path
+    parts = parts[parts.index('namespaces') + 2:]
+    if len(parts) > 1:
+        parts[1] = '{name}'
+    return method, '/'.join(parts)
+
+
+class RequestAccounting(object):
+    """
+    Counters of API requests keyed by RequestKey
+    """
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, method, url):
+        """
+        Count the request, charged to the current operation
+        """
+        key = RequestKey(current_operation(), *endpoint(method, url))
+        with self._lock:
+            self._counts[key] += 1
+
+    def counts(self, operation=None):
+        """
+        :param operation: str, only requests of this operation, all when None
+        :return: dict, {RequestKey: number of requests}
+        """
+        with self._lock:
+            return {key: count for key, count in self._counts.items()
+                    if operation is None or key.operation == operation}
+
+    def total(self, operation=None):
+        """
+        :param operation: str, only requests of this operation, all when None
+        :return: int, number of requests
+        """
+        return sum(self.counts(operation).values())
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+    def format(self, operation=None):
+        """
+        :return: str, one line per counter, the most frequent first
+        """
+        counts = sorted(self.counts(operation).items(), key=lambda item: (-item[1], str(item[0])))
+        return '\n'.join(f'{count:6d} {key.operation or "-"} {key.method} {key.endpoint}'
+                         for key, count in counts)
@@ -8,21 +8,27 @@ of the BSD license. See the LICENSE file for details.
 from __future__ import print_function, unicode_literals, absolute_import
 
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import inspect
 import logging
 import sys
 import warnings
-import yaml
 from functools import wraps
 from typing import Any, Dict
 from string import Template
 
+from osbs.accounting import charge_generator, operation, propagate
+from osbs import profiling, tracing
+from osbs.cache import ObjectCache
+from osbs.timings import PhaseTimings
 from osbs.build.user_params import (
     BuildUserParams,
     SourceContainerUserParams
 )
 from osbs.constants import (RELEASE_LABEL_FORMAT, VERSION_LABEL_FORBIDDEN_CHARS,
-                            ISOLATED_RELEASE_FORMAT)
-from osbs.tekton import Openshift, PipelineRun
+                            ISOLATED_RELEASE_FORMAT, OS_BULK_OPERATION_WORKERS)
+from osbs.tekton import (Openshift, PipelineRun, API_VERSION, FAILED_STEP_TAIL_LINES,
+                         LIST_PAGE_SIZE, wait_for_pipeline_runs)
 from osbs.exceptions import (OsbsException, OsbsValidationException, OsbsResponseException)
 from osbs.utils.labels import Labels
 # import utils in this way, so that we can mock standalone functions with flexmock
@@ -31,6 +37,8 @@ from osbs import utils
 
 def _load_pipeline_from_template(pipeline_run_path, substitutions):
     """Load pipeline run from template and apply substitutions"""
+    import yaml
+
     with open(pipeline_run_path) as f:
         yaml_data = f.read()
     template = Template(yaml_data)
@@ -45,7 +53,15 @@ def osbsapi(func):
             warnings.warn("OSBS.%s: the 'namespace' argument is no longer supported" %
                           func.__name__)
         try:
-            return func(*args, **kwargs)
+            with operation(func.__name__), tracing.span(f'osbs.{func.__name__}'), \
+                    profiling.profile(func.__name__):
+                result = func(*args, **kwargs)
+            if inspect.isgenerator(result):
+                # the span of the call ends when the generator is returned,
+                # consuming it is traced as a span of its own
+                return tracing.trace_generator(f'osbs.{func.__name__}.iterate',
+                                               charge_generator(func.__name__, result))
+            return result
         except OsbsException:
             # Re-raise OsbsExceptions
             raise
@@ -71,6 +87,9 @@ logger = logging.getLogger(__name__)
 
 LogEntry = namedtuple('LogEntry', ['platform', 'line'])
 
+# Outcome of a bulk operation for a single build, error is None on success
+BuildOperationResult = namedtuple('BuildOperationResult', ['name', 'succeeded', 'error'])
+
 
 class OSBS(object):
 
@@ -96,8 +115,12 @@ class OSBS(object):
                             use_auth=self.os_conf.get_use_auth(),
                             verify_ssl=self.os_conf.get_verify_ssl(),
                             token=self.os_conf.get_oauth2_token(),
-                            namespace=self.os_conf.get_namespace())
+                            namespace=self.os_conf.get_namespace(),
+                            capture_dir=self.os_conf.get_capture_dir(),
+                            replay_dir=self.os_conf.get_replay_dir())
         self._bm = None
+        cache_ttl = self.os_conf.get_build_cache_ttl()
+        self._cache = ObjectCache(ttl=cache_ttl) if cache_ttl > 0 else None
 
     def _check_labels(self, repo_info):
         labels = repo_info.labels
@@ -280,51 +303,62 @@ class OSBS(object):
         if operator_csv_modifications_url and not isolated:
             raise OsbsException('Only isolated build can update operator CSV metadata')
 
-        repo_info = utils.get_repo_info(git_uri, git_ref, git_branch=git_branch,
-                                        depth=git_commit_depth)
-
-        self._checks_for_flatpak(flatpak, repo_info)
-
-        default_buildtime_limit = kwargs.get('default_buildtime_limit')
-        max_buildtime_limit = kwargs.get('max_buildtime_limit')
-
-        if repo_info.configuration.buildtime_limit > max_buildtime_limit:
-            raise OsbsException(f'Build limit cannot be more than {max_buildtime_limit} '
-                                f'and is set to {repo_info.configuration.buildtime_limit}')
-
-        if repo_info.configuration.buildtime_limit == 0:
-            logger.info('No build time limit is set, using default limit: %s',
-                        default_buildtime_limit)
-            repo_info.configuration.buildtime_limit = default_buildtime_limit
-
-        req_labels = self._check_labels(repo_info)
-
-        user_params = self.get_user_params(
-            base_image=repo_info.base_image,
-            component=component,
-            flatpak=flatpak,
-            isolated=isolated,
-            koji_target=target,
-            koji_task_id=koji_task_id,
-            req_labels=req_labels,
-            repo_info=repo_info,
-            operator_csv_modifications_url=operator_csv_modifications_url,
-            **kwargs)
-
-        self._checks_for_isolated(user_params)
+        timings = PhaseTimings()
+        with timings.phase('repo_fetch'), \
+                tracing.span('git clone', **{'git.uri': git_uri, 'git.ref': git_ref,
+                                             'git.branch': git_branch}):
+            repo_info = utils.get_repo_info(git_uri, git_ref, git_branch=git_branch,
+                                            depth=git_commit_depth)
+
+        with timings.phase('validation'):
+            self._checks_for_flatpak(flatpak, repo_info)
+
+            default_buildtime_limit = kwargs.get('default_buildtime_limit')
+            max_buildtime_limit = kwargs.get('max_buildtime_limit')
+
+            if repo_info.configuration.buildtime_limit > max_buildtime_limit:
+                raise OsbsException(f'Build limit cannot be more than {max_buildtime_limit} '
+                                    f'and is set to {repo_info.configuration.buildtime_limit}')
+
+            if repo_info.configuration.buildtime_limit == 0:
+                logger.info('No build time limit is set, using default limit: %s',
+                            default_buildtime_limit)
+                repo_info.configuration.buildtime_limit = default_buildtime_limit
+
+            with tracing.span('check labels'):
+                req_labels = self._check_labels(repo_info)
+
+            with tracing.span('user params'):
+                user_params = self.get_user_params(
+                    base_image=repo_info.base_image,
+                    component=component,
+                    flatpak=flatpak,
+                    isolated=isolated,
+                    koji_target=target,
+                    koji_task_id=koji_task_id,
+                    req_labels=req_labels,
+                    repo_info=repo_info,
+                    operator_csv_modifications_url=operator_csv_modifications_url,
+                    **kwargs)
+
+                self._checks_for_isolated(user_params)
 
         pipeline_run_name = self._get_binary_container_pipeline_name(user_params)
-        pipeline_run_data = self._get_binary_container_pipeline_data(
-            buildtime_limit=repo_info.configuration.buildtime_limit,
-            user_params=user_params,
-            pipeline_run_name=pipeline_run_name)
+        with timings.phase('template_render'), \
+                tracing.span('render pipeline run', **{'osbs.pipeline_run': pipeline_run_name}):
+            pipeline_run_data = self._get_binary_container_pipeline_data(
+                buildtime_limit=repo_info.configuration.buildtime_limit,
+                user_params=user_params,
+                pipeline_run_name=pipeline_run_name)
 
         logger.info("creating binary container image pipeline run: %s", pipeline_run_name)
 
-        pipeline_run = PipelineRun(self.os, pipeline_run_name, pipeline_run_data)
+        pipeline_run = PipelineRun(self.os, pipeline_run_name, pipeline_run_data,
+                                   timings=timings)
 
         try:
-            logger.info("pipeline run created: %s", pipeline_run.start_pipeline_run())
+            with tracing.span('create pipeline run', **{'osbs.pipeline_run': pipeline_run_name}):
+                logger.info("pipeline run created: %s", pipeline_run.start_pipeline_run())
         except OsbsResponseException:
             logger.error("failed to create pipeline run %s", pipeline_run_name)
             raise
@@ -403,27 +437,63 @@ class OSBS(object):
 
     @osbsapi
     def get_build(self, build_name):
-        pipeline_run = PipelineRun(self.os, build_name)
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.get_info()
 
+    @osbsapi
+    def list_builds(self, label_selector=None, field_selector=None, page_size=LIST_PAGE_SIZE,
+                    metadata_only=False):
+        """
+        List builds (pipeline runs) in the namespace
+
+        Builds are fetched page by page while the returned iterator is consumed.
+
+        :param label_selector: str, e.g. 'koji-task-id=123'
+        :param field_selector: str, e.g. 'metadata.name=my-build'
+        :param page_size: int, number of builds fetched in one request
+        :param metadata_only: bool, fetch only metadata (names, labels, annotations)
+                              of builds, without their much larger spec and status
+        :return: iterator of pipeline run info (dicts)
+        """
+        return self.os.list_resources('apis', API_VERSION, 'pipelineruns',
+                                      label_selector=label_selector,
+                                      field_selector=field_selector,
+                                      page_size=page_size,
+                                      metadata_only=metadata_only)
+
     @osbsapi
     def get_final_platforms(self, build_name):
-        pipeline_run = PipelineRun(self.os, build_name)
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.get_final_platforms()
 
+    @osbsapi
+    def get_build_report(self, build_name):
+        """
+        Get post-mortem report of a build
+
+        The build and its tasks are fetched once, use this instead of calling
+        build_has_succeeded, get_build_error_message, get_task_results etc.
+        one by one.
+
+        :param build_name: str, name of the build
+        :return: BuildReport
+        """
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
+        return pipeline_run.build_report()
+
     @osbsapi
     def get_build_reason(self, build_name):
-        pipeline_run = PipelineRun(self.os, build_name)
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.status_reason
 
     @osbsapi
     def build_has_succeeded(self, build_name):
-        pipeline_run = PipelineRun(self.os, build_name)
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.has_succeeded()
 
     @osbsapi
     def build_not_finished(self, build_name):
-        pipeline_run = PipelineRun(self.os, build_name)
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.has_not_finished()
 
     @osbsapi
@@ -431,49 +501,148 @@ class OSBS(object):
         pipeline_run = PipelineRun(self.os, build_name)
         return pipeline_run.wait_for_finish()
 
+    @osbsapi
+    def wait_for_builds(self, build_names, timeout=None):
+        """
+        Wait for builds to finish, yield them as they finish
+
+        All builds are tracked through a single watch, in the manner of
+        concurrent.futures.as_completed.
+
+        :param build_names: list of str, names of builds
+        :param timeout: float, seconds to wait for all builds to finish
+        :return: iterator of (build name, final build info) in completion order;
+                 build info is None for builds which do not exist
+        :raises OsbsTimeoutException: when some builds did not finish in time
+        """
+        return wait_for_pipeline_runs(self.os, build_names, timeout=timeout)
+
     @osbsapi
     def build_was_cancelled(self, build_name):
-        pipeline_run = PipelineRun(self.os, build_name)
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.was_cancelled()
 
     @osbsapi
     def build_has_any_failed_tasks(self, build_name):
-        pipeline_run = PipelineRun(self.os, build_name)
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.any_task_failed()
 
     @osbsapi
     def build_has_any_cancelled_tasks(self, build_name):
-        pipeline_run = PipelineRun(self.os, build_name)
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.any_task_was_cancelled()
 
     @osbsapi
     def cancel_build(self, build_name):
-        pipeline_run = PipelineRun(self.os, build_name)
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.cancel_pipeline_run()
 
     @osbsapi
     def remove_build(self, build_name):
-        pipeline_run = PipelineRun(self.os, build_name)
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.remove_pipeline_run()
 
     @osbsapi
-    def get_build_logs(self, build_name, follow=False, wait=False):
+    def remove_builds(self, label_selector):
+        """
+        Remove all builds matching the label selector with a single request
+
+        :param label_selector: str, e.g. 'koji-task-id=123', must not be empty
+        :return: list of BuildOperationResult, one for each removed build
+        """
+        removed = self.os.delete_collection('apis', API_VERSION, 'pipelineruns',
+                                            label_selector=label_selector)
+        if self._cache is not None:
+            for pipeline_run in removed:
+                self._cache.invalidate('PipelineRun', pipeline_run['metadata']['name'])
+        return [BuildOperationResult(pipeline_run['metadata']['name'], True, None)
+                for pipeline_run in removed]
+
+    @osbsapi
+    def cancel_builds(self, build_names=None, label_selector=None,
+                      max_workers=OS_BULK_OPERATION_WORKERS):
+        """
+        Cancel builds, concurrently
+
+        A failure to cancel one build does not stop cancelling the others,
+        it is reported in its result instead.
+
+        :param build_names: list of str, names of builds to cancel
+        :param label_selector: str, cancel builds matching the label selector
+                               instead, e.g. 'koji-task-id=123'
+        :param max_workers: int, maximum number of builds cancelled at the same time
+        :return: list of BuildOperationResult, in the order of build names
+        """
+        if (build_names is None) == (label_selector is None):
+            raise OsbsValidationException("Specify either build names or label selector")
+
+        if label_selector is not None:
+            build_names = [pipeline_run['metadata']['name'] for pipeline_run in
+                           self.os.list_resources('apis', API_VERSION, 'pipelineruns',
+                                                  label_selector=label_selector,
+                                                  metadata_only=True)]
+
+        def cancel(build_name):
+            try:
+                PipelineRun(self.os, build_name, cache=self._cache).cancel_pipeline_run()
+            except Exception as ex:
+                logger.warning("Failed to cancel build %s: %s", build_name, ex)
+                return BuildOperationResult(build_name, False, ex)
+            return BuildOperationResult(build_name, True, None)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(tracing.propagate(propagate(cancel)), build_names))
+
+    @osbsapi
+    def get_build_logs(self, build_name, follow=False, wait=False, tail_lines=None,
+                       limit_bytes=None, merged=False):
         pipeline_run = PipelineRun(self.os, build_name)
-        return pipeline_run.get_logs(follow=follow, wait=wait)
+        return pipeline_run.get_logs(follow=follow, wait=wait, tail_lines=tail_lines,
+                                     limit_bytes=limit_bytes, merged=merged)
 
     @osbsapi
-    def get_build_error_message(self, build_name):
+    def get_build_failed_steps_logs(self, build_name, tail_lines=FAILED_STEP_TAIL_LINES,
+                                    limit_bytes=None):
+        """
+        Get last lines of logs of failed build steps
+
+        :param build_name: str, name of the build
+        :param tail_lines: int, number of lines from the end of each failed step log
+        :param limit_bytes: int, maximum number of bytes of each failed step log
+        :return: dict, {task name: {container: log}}
+        """
+        pipeline_run = PipelineRun(self.os, build_name)
+        return pipeline_run.get_failed_steps_logs(tail_lines=tail_lines,
+                                                  limit_bytes=limit_bytes)
+
+    @osbsapi
+    def download_build_logs(self, build_name, directory, compress='gzip'):
+        """
+        Download logs of all build steps into files in directory
+
+        Logs are streamed straight to disk, one file per task and step container.
+
+        :param build_name: str, name of the build
+        :param directory: str, directory to write log files into, created if missing
+        :param compress: str, 'gzip', 'xz' or None for no compression
+        :return: dict, manifest {task name: {container: {'path', 'bytes', 'lines'}}}
+        """
         pipeline_run = PipelineRun(self.os, build_name)
+        return pipeline_run.download_logs(directory, compress=compress)
+
+    @osbsapi
+    def get_build_error_message(self, build_name):
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.get_error_message()
 
     @osbsapi
     def get_build_results(self, build_name) -> Dict[str, Any]:
         """Fetch the pipelineResults for this build."""
-        pipeline_run = PipelineRun(self.os, build_name)
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.pipeline_results
 
     @osbsapi
     def get_task_results(self, build_name) -> Dict[str, Any]:
         """Fetch tasks results for this build."""
-        pipeline_run = PipelineRun(self.os, build_name)
+        pipeline_run = PipelineRun(self.os, build_name, cache=self._cache)
         return pipeline_run.get_task_results()
@@ -0,0 +1,98 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Cache of OpenShift objects shared by calls of a single OSBS instance
+"""
+from collections import OrderedDict, namedtuple
+import copy
+import logging
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of cached objects, least recently used are evicted first
+CACHE_MAX_SIZE = 128
+
+CacheEntry = namedtuple('CacheEntry', ['obj', 'validated', 'final'])
+
+
+def _resource_version(obj):
+    return (obj or {}).get('metadata', {}).get('resourceVersion')
+
+
+class ObjectCache(object):
+    """
+    LRU cache of objects keyed by (kind, name)
+
+    Cached objects are returned without any request for ttl seconds. After that,
+    they are revalidated by comparing their resourceVersion with the one from
+    a cheap metadata-only request, and fetched again only when it changed.
+    Objects in a final state never change, so they are never revalidated.
+    """
+
+    def __init__(self, ttl, max_size=CACHE_MAX_SIZE):
+        """
+        :param ttl: float, seconds for which cached objects are used without revalidation
+        :param max_size: int, maximum number of cached objects
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, kind, name, fetch, fetch_metadata, is_final=None):
+        """
+        Get object from the cache, fetch it when missing or outdated
+
+        :param kind: str, kind of the object, e.g. 'PipelineRun'
+        :param name: str, name of the object
+        :param fetch: callable, returns the full object, None if it does not exist
+        :param fetch_metadata: callable, returns the object with metadata only
+        :param is_final: callable, (obj) -> bool, True if the object will not change anymore
+        :return: copy of the object, None if it does not exist
+        """
+        key = (kind, name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None:
+            if entry.final or time.monotonic() - entry.validated < self.ttl:
+                return copy.deepcopy(entry.obj)
+
+            version = _resource_version(entry.obj)
+            if version is not None and _resource_version(fetch_metadata()) == version:
+                logger.debug("%s %s has not changed", kind, name)
+                self._store(key, entry.obj, entry.final)
+                return copy.deepcopy(entry.obj)
+
+        obj = fetch()
+        if obj:
+            self._store(key, obj, bool(is_final and is_final(obj)))
+        else:
+            self.invalidate(kind, name)
+        return copy.deepcopy(obj)
+
+    def invalidate(self, kind, name):
+        """
+        Remove object from the cache, e.g. after changing it
+        """
+        with self._lock:
+            self._entries.pop((kind, name), None)
+
+    def _store(self, key, obj, final):
+        with self._lock:
+            self._entries[key] = CacheEntry(obj, time.monotonic(), final)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
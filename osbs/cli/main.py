@@ -6,22 +6,27 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 from __future__ import print_function, absolute_import, unicode_literals
+import atexit
 import collections.abc
 
 import json
 import logging
-import pkg_resources
+try:
+    from importlib import metadata
+except ImportError:
+    # Python < 3.8
+    import importlib_metadata as metadata
 
 import sys
 import argparse
-from osbs import set_logging
-from osbs.api import OSBS
+from osbs import metrics, profiling, set_logging
 from osbs.conf import Configuration
 from osbs.constants import (DEFAULT_CONFIGURATION_FILE, DEFAULT_CONF_BINARY_SECTION,
                             DEFAULT_CONF_SOURCE_SECTION)
 from osbs.exceptions import (OsbsNetworkException, OsbsException, OsbsAuthException,
                              OsbsResponseException)
 from osbs.utils import UserWarningsStore
+from osbs.utils.logs import classify_logs
 
 logger = logging.getLogger('osbs')
 
@@ -34,6 +39,7 @@ def _print_pipeline_run_logs(pipeline_run, user_warnings_store):
                    False when reading logs fails or is not iterable
     """
     pipeline_run_name = pipeline_run.pipeline_run_name
+    timings = pipeline_run.timings
 
     pipeline_run_logs = pipeline_run.get_logs(follow=True, wait=True)
     if not isinstance(pipeline_run_logs, collections.abc.Iterable):
@@ -41,12 +47,10 @@ def _print_pipeline_run_logs(pipeline_run, user_warnings_store):
         return False
     print(f"Pipeline run created ({pipeline_run_name}), watching logs (feel free to interrupt)")
     try:
-        for _, line in pipeline_run_logs:
-            if user_warnings_store.is_user_warning(line):
-                user_warnings_store.store(line)
-                continue
-
-            print('{!r}'.format(line))
+        with timings.phase('log_streaming'):
+            for record in classify_logs(pipeline_run_logs, user_warnings_store):
+                timings.record_since('time_to_first_log_line', 'created')
+                print('{!r}'.format(record.line))
         return True
     except Exception as ex:
         logger.error("Error during fetching logs for pipeline run %s: %s",
@@ -55,10 +59,12 @@ def _print_pipeline_run_logs(pipeline_run, user_warnings_store):
 
 
 def _get_build_metadata(pipeline_run, user_warnings_store):
+    with pipeline_run.timings.phase('post_mortem'):
+        report = pipeline_run.build_report()
     output = {
         "pipeline_run": {
             "name": pipeline_run.pipeline_run_name,
-            "status": pipeline_run.status_reason,
+            "status": report.reason,
             "info": {}
         },
         "results": {
@@ -68,25 +74,29 @@ def _get_build_metadata(pipeline_run, user_warnings_store):
         },
     }
 
-    if pipeline_run.has_succeeded():
-        info = pipeline_run.get_info()
-        output['pipeline_run']['info'] = info
-        results = pipeline_run.pipeline_results
-        all_repositories = results.get('repositories', {})
+    if report.succeeded:
+        output['pipeline_run']['info'] = report.info
+        all_repositories = report.pipeline_results.get('repositories', {})
         output['results']['repositories'] = all_repositories
-    else:
-        output['results']['error_msg'] = pipeline_run.get_error_message()
+    elif report.error_message:
+        output['results']['error_msg'] = report.error_message
 
     if user_warnings_store:
         output['results']['user_warnings'] = list(user_warnings_store)
 
+    output['timings'] = {
+        'client': pipeline_run.timings.as_dict(),
+        'tasks': report.task_times,
+    }
+
     return output
 
 
 def print_output(pipeline_run, export_metadata_file=None):
     user_warnings_store = UserWarningsStore()
     get_logs_passed = _print_pipeline_run_logs(pipeline_run, user_warnings_store)
-    pipeline_run.wait_for_finish()
+    with pipeline_run.timings.phase('wait_for_finish'):
+        pipeline_run.wait_for_finish()
     build_metadata = _get_build_metadata(pipeline_run, user_warnings_store)
     _display_pipeline_run_summary(build_metadata)
 
@@ -104,6 +114,8 @@ def print_output(pipeline_run, export_metadata_file=None):
 
 
 def cmd_build(args):
+    from osbs.api import OSBS
+
     if args.instance is None:
         conf_section = DEFAULT_CONF_BINARY_SECTION
     else:
@@ -146,7 +158,7 @@ def cmd_build(args):
     if pipeline_run.has_succeeded():
         return_val = 0
     cleanup_used_resources = osbs.os_conf.get_cleanup_used_resources()
-    if cleanup_used_resources and pipeline_run.data is not None:
+    if cleanup_used_resources and pipeline_run.get_metadata() is not None:
         try:
             logger.info("pipeline run removed: %s", pipeline_run.remove_pipeline_run())
         except OsbsResponseException:
@@ -156,6 +168,8 @@ def cmd_build(args):
 
 
 def cmd_build_source_container(args):
+    from osbs.api import OSBS
+
     if args.instance is None:
         conf_section = DEFAULT_CONF_SOURCE_SECTION
     else:
@@ -186,7 +200,7 @@ def cmd_build_source_container(args):
     if pipeline_run.has_succeeded():
         return_val = 0
     cleanup_used_resources = osbs.os_conf.get_cleanup_used_resources()
-    if cleanup_used_resources and pipeline_run.data is not None:
+    if cleanup_used_resources and pipeline_run.get_metadata() is not None:
         try:
             logger.info("pipeline run removed: %s", pipeline_run.remove_pipeline_run())
         except OsbsResponseException:
@@ -230,8 +244,8 @@ def _display_pipeline_run_summary(build_metadata):
 
 def cli():
     try:
-        version = pkg_resources.get_distribution("osbs-client").version
-    except pkg_resources.DistributionNotFound:
+        version = metadata.version("osbs-client")
+    except metadata.PackageNotFoundError:
         version = "GIT"
 
     parser = argparse.ArgumentParser(
@@ -374,6 +388,11 @@ def cli():
                         metavar="NAMESPACE", action="store")
     parser.add_argument("--capture-dir", metavar="DIR", action="store",
                         help="capture JSON responses and save them in DIR")
+    parser.add_argument("--replay-dir", metavar="DIR", action="store",
+                        help="serve responses captured with --capture-dir in DIR "
+                             "instead of contacting the cluster")
+    parser.add_argument("--metrics-file", metavar="FILE", action="store",
+                        help="write client metrics in Prometheus text format to FILE on exit")
     parser.add_argument("--token", metavar="TOKEN", action="store",
                         help="OAuth 2.0 token")
     parser.add_argument("--token-file", metavar="TOKENFILE", action="store",
@@ -408,6 +427,10 @@ def main():
 
     is_verbose = os_conf.get_verbosity()
 
+    metrics_file = os_conf.get_metrics_file()
+    if metrics_file:
+        atexit.register(metrics.REGISTRY.write_to_file, metrics_file)
+
     if args.quiet:
         set_logging(level=logging.WARNING)
     elif is_verbose:
@@ -418,7 +441,8 @@ def main():
 
     return_value = -1
     try:
-        return_value = args.func(args)
+        with profiling.profile(f"cli-{args.func.__name__}"):
+            return_value = args.func(args)
     except AttributeError:
         if hasattr(args, 'func'):
             raise
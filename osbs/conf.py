@@ -154,6 +154,15 @@ class Configuration(object):
         return self._get_value("verbose", GENERAL_CONFIGURATION_SECTION, "verbose",
                                is_bool_val=True)
 
+    def get_capture_dir(self):
+        return self._get_value("capture_dir", GENERAL_CONFIGURATION_SECTION, "capture_dir")
+
+    def get_replay_dir(self):
+        return self._get_value("replay_dir", GENERAL_CONFIGURATION_SECTION, "replay_dir")
+
+    def get_metrics_file(self):
+        return self._get_value("metrics_file", GENERAL_CONFIGURATION_SECTION, "metrics_file")
+
     def get_git_uri(self):
         return self._get_value("git_url", self.conf_section, "git_url")
 
@@ -213,6 +222,10 @@ class Configuration(object):
         return self._get_value("cleanup_used_resources", self.conf_section,
                                "cleanup_used_resources", default=True, is_bool_val=True)
 
+    def get_build_cache_ttl(self):
+        return float(self._get_value("build_cache_ttl", self.conf_section,
+                                     "build_cache_ttl", default=0))
+
     def get_default_buildtime_limit(self):
         return int(self._get_value("default_buildtime_limit", self.conf_section,
                                    "default_buildtime_limit", default=10800))
@@ -62,12 +62,20 @@ HTTP_RETRIES_METHODS_WHITELIST = ['GET', 'PUT', 'POST', 'DELETE']
 # requests timeout in seconds
 HTTP_REQUEST_TIMEOUT = 600
 
+# size of chunks read from streamed responses (logs, watches)
+HTTP_STREAM_CHUNK_SIZE = 64 * 1024
+# name of the file with recorded HTTP traffic in the capture directory
+HTTP_CAPTURE_FILE = 'http-capture.jsonl'
+
 # number of retries on openshift conflict
 OS_CONFLICT_MAX_RETRIES = 8
 
 # number of seconds to wait, before retrying on openshift conflict
 OS_CONFLICT_WAIT = 5
 
+# maximum number of builds cancelled at the same time
+OS_BULK_OPERATION_WORKERS = 8
+
 # number of retries on openshift not found
 OS_NOT_FOUND_MAX_RETRIES = 6
 
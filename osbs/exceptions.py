@@ -11,7 +11,6 @@ Exceptions raised by OSBS
 from __future__ import print_function, absolute_import, unicode_literals
 
 import json
-from requests.utils import guess_json_utf
 import six
 from traceback import format_tb
 
@@ -52,6 +51,8 @@ class OsbsResponseException(OsbsException):
         # try decoding openshift Status object
         # https://docs.openshift.org/latest/rest_api/openshift_v1.html#v1-status
         if isinstance(message, six.binary_type):
+            from requests.utils import guess_json_utf
+
             encoding = guess_json_utf(message)
             message = message.decode(encoding)
 
@@ -79,6 +80,10 @@ class OsbsValidationException(OsbsException):
     pass
 
 
+class OsbsTimeoutException(OsbsException):
+    """ Waiting for OpenShift resources timed out """
+
+
 class OsbsLocallyModified(OsbsException):
     """Local modifications found in repo"""
 
@@ -0,0 +1,272 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Client metrics in the Prometheus text exposition format
+
+Metrics are collected in REGISTRY for the whole process. Export them with
+REGISTRY.write_to_file(), e.g. into a directory read by the node exporter
+textfile collector, or pass REGISTRY.render() to a callback with
+REGISTRY.export().
+"""
+import bisect
+import logging
+import math
+import os
+import tempfile
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of histogram buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+                   60.0, 120.0, 300.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric(object):
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        """
+        :param name: str, metric name, e.g. 'osbs_http_requests_total'
+        :param documentation: str, help text
+        :param labelnames: sequence of str, names of labels, values are passed as
+                           keyword arguments when updating the metric
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        try:
+            key = tuple(str(labels.pop(name)) for name in self.labelnames)
+        except KeyError as exc:
+            raise ValueError(f"Missing label {exc} of metric {self.name}") from None
+        if labels:
+            raise ValueError(f"Unknown labels {sorted(labels)} of metric {self.name}")
+        return key
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        """
+        :return: str, metric in the Prometheus text format
+        """
+        lines = [f'# HELP {self.name} {_escape(self.documentation)}',
+                 f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            lines.extend(self._samples())
+        return '\n'.join(lines) + '\n'
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value, e.g. number of requests
+    """
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        """
+        :return: current value, 0 for labels never used
+        """
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def _samples(self):
+        for key, value in sorted(self._values.items()):
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values, e.g. request durations
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        :param buckets: sequence of float, upper bounds of buckets, +Inf is added
+        """
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, (None, 0))
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def get_count(self, **labels):
+        """
+        :return: int, number of observed values
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, _ = self._values.get(key, ([], 0))
+            return sum(counts)
+
+    def _samples(self):
+        for key, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = _format_labels(self.labelnames, key)
+            yield f'{self.name}_sum{labels} {_format_value(total)}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class Registry(object):
+    """
+    Collection of metrics exported together
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """
+        :param metric: Counter or Histogram
+        :return: the metric
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def clear(self):
+        """
+        Reset values of all metrics
+        """
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def render(self):
+        """
+        :return: str, all metrics in the Prometheus text format
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return ''.join(metric.render() for metric in metrics)
+
+    def write_to_file(self, path):
+        """
+        Write metrics into the file atomically, readers never see a partial file
+
+        :param path: str, path of the file
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.osbs-metrics-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.render())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        logger.debug("Metrics written to %s", path)
+
+    def export(self, callback):
+        """
+        :param callback: callable, called with all metrics in the Prometheus text format
+        """
+        callback(self.render())
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    'osbs_http_request_duration_seconds',
+    'Duration of API requests until the response headers, whole body for non-streamed ones',
+    ('method', 'resource'))
+HTTP_RESPONSES = REGISTRY.counter(
+    'osbs_http_responses_total',
+    'API responses by status code, "error" for requests without response',
+    ('method', 'resource', 'status'))
+HTTP_RETRIES = REGISTRY.counter(
+    'osbs_http_retries_total',
+    'API requests retried by urllib3',
+    ('method', 'resource'))
+
+WATCH_RECONNECTS = REGISTRY.counter(
+    'osbs_watch_reconnects_total',
+    'Watches opened again after the server closed them or the connection failed',
+    ('resource',))
+WATCH_EVENTS = REGISTRY.counter(
+    'osbs_watch_events_total',
+    'Events received from watches',
+    ('resource', 'type'))
+WATCH_BAD_RESPONSES = REGISTRY.counter(
+    'osbs_watch_bad_responses_total',
+    'Watch responses with error status and events which could not be decoded',
+    ('resource',))
+
+LOG_BYTES = REGISTRY.counter(
+    'osbs_log_bytes_total',
+    'Bytes of container logs received, per build',
+    ('build',))
+LOG_LINES = REGISTRY.counter(
+    'osbs_log_lines_total',
+    'Lines of container logs received, per build',
+    ('build',))
+
+GIT_OPERATION_DURATION = REGISTRY.histogram(
+    'osbs_git_operation_duration_seconds',
+    'Duration of git commands run by the client',
+    ('operation',))
+GIT_OPERATION_FAILURES = REGISTRY.counter(
+    'osbs_git_operation_failures_total',
+    'Failed git commands run by the client',
+    ('operation',))
@@ -12,23 +12,31 @@ abstraction on top of http api calls
 from __future__ import print_function, absolute_import, unicode_literals
 
 import sys
+import base64
+import codecs
+import collections
 import logging
 import json
 import http
-
+import os
+import socket
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from osbs import metrics, tracing
+from osbs.accounting import endpoint
 from osbs.exceptions import OsbsException, OsbsNetworkException, OsbsResponseException
 from osbs.constants import (
     HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR, HTTP_RETRIES_STATUS_FORCELIST,
-    HTTP_RETRIES_METHODS_WHITELIST, HTTP_REQUEST_TIMEOUT)
+    HTTP_RETRIES_METHODS_WHITELIST, HTTP_REQUEST_TIMEOUT, HTTP_STREAM_CHUNK_SIZE,
+    HTTP_CAPTURE_FILE)
 
 import requests
-from requests.adapters import HTTPAdapter
+from requests.adapters import BaseAdapter, HTTPAdapter
 from requests.exceptions import HTTPError, RetryError, Timeout
-from requests.utils import guess_json_utf
-try:
-    from requests_kerberos import HTTPKerberosAuth
-except ImportError:
-    HTTPKerberosAuth = None
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, guess_json_utf
 
 from urllib3.exceptions import InsecureRequestWarning
 from urllib3.util import Retry
@@ -39,8 +47,15 @@ logger = logging.getLogger(__name__)
 
 
 class HttpSession(object):
-    def __init__(self, verbose=False):
+    def __init__(self, verbose=False, capture=None, replay=None):
+        """
+        :param verbose: bool
+        :param capture: HttpCapture, record all requests and responses
+        :param replay: HttpReplay, serve recorded responses instead of sending requests
+        """
         self.verbose = verbose
+        self.capture = capture
+        self.replay = replay
 
     def get(self, url, **kwargs):
         return self.request(url, "get", **kwargs)
@@ -59,12 +74,14 @@ class HttpSession(object):
 
     def request(self, url, *args, **kwargs):
         try:
-            stream = HttpStream(url, *args, verbose=self.verbose, **kwargs)
+            stream = HttpStream(url, *args, verbose=self.verbose, capture=self.capture,
+                                replay=self.replay, **kwargs)
             if kwargs.get('stream', False):
                 return stream
 
             with stream as s:
                 content = s.req.content
+                s.record(content)
                 return HttpResponse(s.status_code, s.headers, content)
         # Timeout will catch both ConnectTimout and ReadTimeout
         except (RetryError, Timeout) as ex:
@@ -92,7 +109,8 @@ class HttpStream(object):
     def __init__(self, url, method, data=None, kerberos_auth=False,
                  allow_redirects=True, verify_ssl=True, ca=None, use_json=False,
                  headers=None, stream=False, username=None, password=None,
-                 client_cert=None, client_key=None, verbose=False, retries_enabled=True):
+                 client_cert=None, client_key=None, verbose=False, retries_enabled=True,
+                 capture=None, replay=None):
 
         def log_error_response_text_hook(resp, *args, **kwargs):
             """requests hook to log error response"""
@@ -104,6 +122,7 @@ class HttpStream(object):
 
         self.status_code = 0
         self.headers = None
+        self.received_bytes = 0  # of streamed response body read so far
 
         retry = Retry(
             total=HTTP_MAX_RETRIES,
@@ -117,7 +136,10 @@ class HttpStream(object):
         self.session = requests.Session()
         self.session.hooks['response'] = [log_error_response_text_hook]
 
-        if retries_enabled:
+        if replay is not None:
+            self.session.mount('http://', ReplayAdapter(replay))
+            self.session.mount('https://', ReplayAdapter(replay))
+        elif retries_enabled:
             self.session.mount('http://', HTTPAdapter(max_retries=retry))
             self.session.mount('https://', HTTPAdapter(max_retries=retry))
 
@@ -156,8 +178,10 @@ class HttpStream(object):
         args['allow_redirects'] = allow_redirects
 
         if kerberos_auth:
-            if not HTTPKerberosAuth:
-                raise RuntimeError('Kerberos auth unavailable')
+            try:
+                from requests_kerberos import HTTPKerberosAuth
+            except ImportError:
+                raise RuntimeError('Kerberos auth unavailable') from None
             args['auth'] = HTTPKerberosAuth()
 
         if stream:
@@ -166,43 +190,144 @@ class HttpStream(object):
         args['headers'] = headers
         args['timeout'] = HTTP_REQUEST_TIMEOUT
 
-        self.req = self.session.request(method, url, **args)
-
-        self.headers = self.req.headers
-        self.status_code = self.req.status_code
+        self._capture = capture
+        self._exchange = None
+        if capture is not None:
+            # the same URL and headers as the adapter gets them, to match them on replay
+            self._exchange = {'t': capture.now(), 'method': method,
+                              'url': requests.Request(method, url).prepare().url,
+                              'accept': headers.get('Accept', self.session.headers['Accept']),
+                              'stream': stream}
+            if data:
+                self._exchange['data'] = _encode_data(data)
+
+        metrics_method, metrics_endpoint = endpoint(method, url)
+        metrics_labels = {'method': metrics_method,
+                          'resource': metrics_endpoint.replace('/{name}', '')}
+        span_attributes = {'http.method': metrics_method, 'http.url': url,
+                           'osbs.resource': metrics_labels['resource']}
+        with tracing.span(f"HTTP {metrics_method} {metrics_labels['resource']}",
+                          **span_attributes) as http_span:
+            started = time.monotonic()
+            try:
+                self.req = self.session.request(method, url, **args)
+            except Exception as ex:
+                metrics.HTTP_RESPONSES.inc(status='error', **metrics_labels)
+                if capture is not None:
+                    self._exchange['error'] = repr(ex)
+                    self._record()
+                raise
+            finally:
+                metrics.HTTP_REQUEST_DURATION.observe(time.monotonic() - started,
+                                                      **metrics_labels)
+
+            self.headers = self.req.headers
+            self.status_code = self.req.status_code
+
+            metrics.HTTP_RESPONSES.inc(status=self.status_code, **metrics_labels)
+            retries = getattr(getattr(self.req.raw, 'retries', None), 'history', None)
+            if retries:
+                metrics.HTTP_RETRIES.inc(len(retries), **metrics_labels)
+            http_span.set_attributes({'http.status_code': self.status_code,
+                                      'osbs.retries': len(retries or ())})
+
+        if capture is not None:
+            self._exchange.update(
+                status=self.status_code,
+                headers=_captured_headers(self.headers),
+                elapsed=round(capture.now() - self._exchange['t'], 6),
+            )
+
+    def _record(self):
+        if self._exchange is not None:
+            self._capture.record(self._exchange)
+            self._exchange = None
+
+    def record(self, content):
+        """
+        Record the whole content of a response which is not streamed
+        """
+        if self._exchange is not None:
+            self._exchange['body'] = _encode_data(content)
+            self._record()
+
+    def _iter_content(self, chunk_size):
+        chunks = self.req.iter_content(chunk_size)
+        if self._exchange is None:
+            return chunks
+        return self._iter_recorded_chunks(chunks)
+
+    def _iter_recorded_chunks(self, chunks):
+        # chunks are written as they arrive, not to keep followed logs in memory
+        capture = self._capture
+        self._exchange['chunks'] = []
+        seq = capture.record(self._exchange)
+        self._exchange = None
+        started = time.monotonic()
+        for chunk in chunks:
+            capture.record_chunk(seq, round(time.monotonic() - started, 6), chunk)
+            yield chunk
 
     def _get_received_data(self):
         return self.req.text
 
     def iter_chunks(self):
-        return self.req.iter_content(None)
-
-    def iter_lines(self):
-        kwargs = {
-            # OpenShift does not respond with any encoding value.
-            # This causes requests module to guess it as ISO-8859-1.
-            # Likely, the encoding is actually UTF-8, but we can't
-            # guarantee it. Therefore, we take the approach of simply
-            # passing through the encoded data with no effort to
-            # attempt decoding it.
-            'decode_unicode': False
-        }
-        if requests.__version__.startswith('2.6.'):
-            kwargs['chunk_size'] = 1
+        return self._iter_content(None)
+
+    def _iter_stream_chunks(self):
         # if this fails for any reason other than ChunkedEncodingError
         # or IncompleteRead (either of which may happen when no bytes
         # are received), let someone else handle the exception
         try:
-            for line in self.req.iter_lines(**kwargs):
-                yield line
+            for chunk in self._iter_content(HTTP_STREAM_CHUNK_SIZE):
+                self.received_bytes += len(chunk)
+                yield chunk
         except (requests.exceptions.ChunkedEncodingError,
                 http.client.IncompleteRead):
             return
 
+    def iter_lines(self, keepends=False):
+        """
+        Iterate over lines of the response as bytes
+
+        OpenShift does not respond with any encoding value. This causes
+        requests module to guess it as ISO-8859-1. Likely, the encoding is
+        actually UTF-8, but we can't guarantee it. Therefore, we take the
+        approach of simply passing through the encoded data with no effort
+        to attempt decoding it.
+        """
+        return LineFramer(self._iter_stream_chunks()).iter_lines(keepends=keepends)
+
+    def iter_text_lines(self, encoding='utf-8'):
+        """
+        Iterate over lines of the response decoded as text, undecodable bytes are replaced
+        """
+        return LineFramer(self._iter_stream_chunks()).iter_text_lines(encoding=encoding)
+
+    def abort(self):
+        """
+        Shut down the connection of a streamed response, possibly from another thread
+
+        A thread blocked reading the response wakes up and sees the end of the
+        stream, instead of waiting for more data from the server.
+        """
+        req = getattr(self, 'req', None)
+        raw = getattr(req, 'raw', None)
+        sock = getattr(getattr(raw, '_connection', None), 'sock', None)
+        if sock is None:
+            # replayed or already released connection, nothing blocks on it
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError as exc:
+            logger.debug("Cannot shut down connection: %s", exc)
+
     def close(self):
         # using getattr and hasattr because this may be called from __del__
         if not getattr(self, 'closed', True):
             logger.debug("cleaning up")
+            # streamed response which was not read to the end
+            self._record()
             if hasattr(self, 'req'):
                 del self.req
             self.closed = True
@@ -217,6 +342,305 @@ class HttpStream(object):
         self.close()
 
 
+# content is captured decoded, its length and transfer encoding differ
+_NOT_CAPTURED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+# headers which may carry credentials, recorded without their values
+_REDACTED_HEADERS = ('authorization', 'proxy-authorization', 'set-cookie')
+REDACTED = 'REDACTED'
+
+
+def _redact_url_fragment(url):
+    """
+    Redact parameter values in the URL fragment, e.g. the OAuth access token
+    in the Location of the redirect from the authorize endpoint
+    """
+    parts = urlsplit(url)
+    if not parts.fragment:
+        return url
+    params = parse_qsl(parts.fragment, keep_blank_values=True)
+    fragment = urlencode([(name, REDACTED) for name, _ in params]) if params else REDACTED
+    return urlunsplit(parts._replace(fragment=fragment))
+
+
+def _captured_headers(headers):
+    captured = {}
+    for name, value in headers.items():
+        lower_name = name.lower()
+        if lower_name in _NOT_CAPTURED_HEADERS:
+            continue
+        if lower_name in _REDACTED_HEADERS:
+            value = REDACTED
+        elif lower_name == 'location':
+            value = _redact_url_fragment(value)
+        captured[name] = value
+    return captured
+
+
+def _encode_data(data):
+    """
+    :param data: bytes or str
+    :return: str if data is valid UTF-8, otherwise {'b64': base64-encoded str}
+    """
+    if isinstance(data, str):
+        return data
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return {'b64': base64.b64encode(data).decode('ascii')}
+
+
+def _decode_data(data):
+    if isinstance(data, dict):
+        return base64.b64decode(data['b64'])
+    return data.encode('utf-8')
+
+
+class HttpCapture(object):
+    """
+    Record HTTP requests and responses for later replay, see HttpReplay
+
+    Every exchange is appended as one JSON line to HTTP_CAPTURE_FILE in the
+    directory. Responses read at once have their body; chunks of streamed
+    responses (watches, followed logs) are appended as they arrive, each as
+    a line with the seq of its exchange and its offset in seconds from
+    receiving the response headers.
+
+    Request headers are not recorded. Response headers which may carry
+    credentials (Authorization, Set-Cookie and the fragment of Location, with
+    the OAuth access token) are redacted, response bodies may still contain
+    sensitive data.
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: str, created if missing
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, HTTP_CAPTURE_FILE)
+        self._started = time.monotonic()
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def now(self):
+        """
+        :return: float, seconds since the capture started
+        """
+        return round(time.monotonic() - self._started, 6)
+
+    def record(self, exchange):
+        """
+        :param exchange: dict, request and response, see HttpStream
+        :return: int, seq of the exchange, to record its chunks
+        """
+        with self._lock:
+            seq = exchange['seq'] = self._seq
+            self._seq += 1
+            self._write(exchange)
+        return seq
+
+    def record_chunk(self, seq, offset, data):
+        """
+        :param seq: int, seq of the streamed exchange, as returned by record()
+        :param offset: float, seconds since the response headers were received
+        :param data: bytes, chunk of the response body
+        """
+        with self._lock:
+            self._write({'chunk_of': seq, 'offset': offset, 'data': _encode_data(data)})
+
+    def _write(self, record):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+class HttpReplay(object):
+    """
+    Recorded HTTP exchanges to be served by ReplayAdapter
+
+    Requests are matched by method, URL and Accept header. Matching exchanges are
+    served in the order in which they were requested, the last one is repeated
+    when they run out, e.g. for polling.
+    """
+
+    def __init__(self, directory, speed=1.0):
+        """
+        :param directory: str, directory with a capture made by HttpCapture
+        :param speed: float, multiplier of recorded delays; 1 reproduces the
+                      recorded timing, 0 serves everything right away
+        """
+        self.speed = speed
+        self._exchanges = collections.defaultdict(collections.deque)
+        self._lock = threading.Lock()
+
+        exchanges = {}
+        with open(os.path.join(directory, HTTP_CAPTURE_FILE)) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if 'chunk_of' in record:
+                    # chunks follow the exchange they belong to
+                    exchanges[record['chunk_of']]['chunks'].append([record['offset'],
+                                                                   record['data']])
+                else:
+                    exchanges[record['seq']] = record
+        for exchange in sorted(exchanges.values(), key=lambda e: (e['t'], e['seq'])):
+            key = (exchange['method'], exchange['url'], exchange.get('accept'))
+            self._exchanges[key].append(exchange)
+
+    def take(self, method, url, accept=None):
+        """
+        :return: dict, recorded exchange; None when there is no such request
+        """
+        with self._lock:
+            exchanges = self._exchanges.get((method.lower(), url, accept))
+            if not exchanges:
+                return None
+            if len(exchanges) > 1:
+                return exchanges.popleft()
+            return exchanges[0]
+
+    def sleep(self, seconds):
+        if seconds > 0 and self.speed > 0:
+            time.sleep(seconds * self.speed)
+
+
+class _ReplayBody(object):
+    """
+    Response body served in recorded chunks, in place of urllib3 response
+    """
+
+    def __init__(self, replay, chunks):
+        self.replay = replay
+        self.chunks = chunks
+
+    def stream(self, amt=None, decode_content=None):
+        offset = 0
+        for chunk_offset, data in self.chunks:
+            self.replay.sleep(chunk_offset - offset)
+            offset = chunk_offset
+            yield _decode_data(data)
+
+    def read(self, amt=None, decode_content=None):
+        return b''.join(self.stream())
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Transport adapter serving responses recorded by HttpCapture, without network
+    """
+
+    def __init__(self, replay):
+        """
+        :param replay: HttpReplay
+        """
+        super(ReplayAdapter, self).__init__()
+        self.replay = replay
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None,
+             proxies=None):
+        exchange = self.replay.take(request.method, request.url,
+                                    request.headers.get('Accept'))
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.connection = self
+
+        if exchange is None:
+            logger.warning("No recorded response for %s %s", request.method, request.url)
+            response.status_code = requests.codes.not_found
+            response.headers = CaseInsensitiveDict({'Content-Type': 'application/json'})
+            body = json.dumps({'kind': 'Status', 'status': 'Failure', 'code': 404,
+                               'message': 'no recorded response'})
+            response.raw = _ReplayBody(self.replay, [[0, body]])
+            return response
+
+        self.replay.sleep(exchange.get('elapsed', 0))
+        if 'error' in exchange:
+            raise requests.exceptions.ConnectionError(exchange['error'], request=request)
+
+        response.status_code = exchange['status']
+        response.headers = CaseInsensitiveDict(exchange.get('headers') or {})
+        response.encoding = get_encoding_from_headers(response.headers)
+        if 'chunks' in exchange:
+            chunks = exchange['chunks']
+        else:
+            chunks = [[0, exchange.get('body', '')]]
+        response.raw = _ReplayBody(self.replay, chunks)
+        return response
+
+    def close(self):
+        pass
+
+
+class LineFramer(object):
+    """
+    Split stream of byte chunks into lines
+
+    Chunks are appended to a single reusable buffer and lines are sliced out of it
+    through a memoryview, so every line is copied only once. Text lines are decoded
+    a whole chunk at a time by an incremental decoder, which correctly handles
+    multibyte characters split between chunks.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def iter_lines(self, keepends=False):
+        """
+        :param keepends: bool, keep line endings in yielded lines
+        :return: iterator of bytes
+        """
+        buf = bytearray()
+        for chunk in self.chunks:
+            if not chunk:
+                continue
+            buf += chunk
+            start = 0
+            with memoryview(buf) as view:
+                while True:
+                    end = buf.find(b'\n', start)
+                    if end == -1:
+                        break
+                    if keepends:
+                        line_end = end + 1
+                    elif end > start and buf[end - 1] == 0x0d:  # \r\n
+                        line_end = end - 1
+                    else:
+                        line_end = end
+                    yield bytes(view[start:line_end])
+                    start = end + 1
+            del buf[:start]
+
+        if buf:
+            yield bytes(buf)
+
+    def iter_text_lines(self, encoding='utf-8'):
+        """
+        :param encoding: str, encoding of the stream
+        :return: iterator of str, without line endings
+        """
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        pending = ''
+        for chunk in self.chunks:
+            text = decoder.decode(chunk)
+            if not text:
+                continue
+            lines = (pending + text).split('\n')
+            pending = lines.pop()
+            for line in lines:
+                yield line[:-1] if line.endswith('\r') else line
+
+        pending += decoder.decode(b'', final=True)
+        if pending:
+            yield pending
+
+
 class HttpResponse(object):
     def __init__(self, status_code, headers, content):
         self.status_code = status_code
@@ -0,0 +1,230 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Opt-in profiling of OSBS API calls and CLI commands
+
+Profiling is enabled by environment variables, read when the module is
+imported:
+
+    OSBS_PROFILE              comma-separated profilers: 'cpu' (cProfile),
+                              'memory' (tracemalloc)
+    OSBS_PROFILE_DIR          directory to write profiles to, default is
+                              the system temporary directory
+    OSBS_PROFILE_SAMPLE_RATE  fraction of calls to profile, default 1.0
+    OSBS_PROFILE_TOP          number of allocation sites to report, default 25
+
+Only the outermost profiled call is profiled, API methods called by other
+API methods or by a CLI command are part of its profile. For generators
+returned by API methods only creating the generator is profiled. cProfile
+profiles only the calling thread, work done in thread pools, e.g. by
+download_logs and cancel_builds, is missing from CPU profiles.
+"""
+from contextlib import contextmanager
+import contextvars
+import cProfile
+import itertools
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ('cpu', 'memory')
+DEFAULT_TOP_ALLOCATIONS = 25
+
+# set while a call is profiled, nested calls are not profiled on their own
+_active = contextvars.ContextVar('osbs_profile_active', default=False)
+
+
+class Profiler(object):
+    """
+    Dump cProfile stats and top allocation sites of sampled calls to a directory
+    """
+
+    def __init__(self, directory, cpu=True, memory=False, sample_rate=1.0,
+                 top_allocations=DEFAULT_TOP_ALLOCATIONS):
+        """
+        :param directory: str, directory to write profiles to, created if missing
+        :param cpu: bool, profile with cProfile, stats are written to *.prof files,
+                    read them with pstats or snakeviz
+        :param memory: bool, trace allocations with tracemalloc, allocation sites
+                       with the largest growth during the call are written to
+                       *.alloc.txt files
+        :param sample_rate: float, fraction of calls to profile, from 0.0 to 1.0
+        :param top_allocations: int, number of allocation sites to write
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"Sample rate must be between 0 and 1, not {sample_rate}")
+        self.directory = directory
+        self.cpu = cpu
+        self.memory = memory
+        self.sample_rate = sample_rate
+        self.top_allocations = top_allocations
+        self._counter = itertools.count(1)
+        self._tracemalloc_users = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls, environ=None):
+        """
+        :param environ: dict, environment variables, os.environ by default
+        :return: Profiler; None when profiling is not enabled
+        """
+        environ = os.environ if environ is None else environ
+        profilers = {name.strip() for name in environ.get('OSBS_PROFILE', '').split(',')
+                     if name.strip()}
+        if not profilers:
+            return None
+        unknown = profilers.difference(PROFILERS)
+        if unknown:
+            logger.warning("Unknown profilers %s in OSBS_PROFILE, expected some of %s",
+                           ', '.join(sorted(unknown)), ', '.join(PROFILERS))
+        try:
+            sample_rate = float(environ.get('OSBS_PROFILE_SAMPLE_RATE', 1.0))
+            top_allocations = int(environ.get('OSBS_PROFILE_TOP', DEFAULT_TOP_ALLOCATIONS))
+            return cls(environ.get('OSBS_PROFILE_DIR') or tempfile.gettempdir(),
+                       cpu='cpu' in profilers, memory='memory' in profilers,
+                       sample_rate=sample_rate, top_allocations=top_allocations)
+        except ValueError as exc:
+            logger.warning("Profiling disabled, invalid settings: %s", exc)
+            return None
+
+    def _sampled(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def _path(self, name, suffix):
+        safe_name = re.sub(r'[^\w.-]', '_', name)
+        stamp = time.strftime('%Y%m%dT%H%M%S')
+        return os.path.join(self.directory,
+                            f'{stamp}-{os.getpid()}-{next(self._counter)}-{safe_name}{suffix}')
+
+    def _start_tracemalloc(self):
+        with self._lock:
+            if self._tracemalloc_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracemalloc_users = 1
+            elif self._tracemalloc_users:
+                self._tracemalloc_users += 1
+        return tracemalloc.take_snapshot()
+
+    def _stop_tracemalloc(self):
+        snapshot = tracemalloc.take_snapshot()
+        with self._lock:
+            # tracing started by someone else is left running
+            if self._tracemalloc_users:
+                self._tracemalloc_users -= 1
+                if self._tracemalloc_users == 0:
+                    tracemalloc.stop()
+        return snapshot
+
+    def _write_allocations(self, path, name, before, after):
+        stats = after.compare_to(before, 'lineno')[:self.top_allocations]
+        with open(path, 'w') as f:
+            f.write(f"# top {len(stats)} allocation sites of {name}, by size growth\n")
+            for stat in stats:
+                f.write(f"{stat}\n")
+
+    @contextmanager
+    def profile(self, name):
+        """
+        Profile the block if it's sampled and no enclosing call is profiled
+
+        Failures to profile or to write profiles are logged, they never
+        affect the profiled call.
+
+        :param name: str, name of the profiled call, part of file names
+        """
+        if _active.get() or not self._sampled():
+            yield
+            return
+
+        token = _active.set(True)
+        snapshot = self._start_memory(name) if self.memory else None
+        profile = self._start_cpu(name) if self.cpu else None
+        try:
+            yield
+        finally:
+            _active.reset(token)
+            after = None
+            try:
+                if profile is not None:
+                    profile.disable()
+                if snapshot is not None:
+                    after = self._stop_tracemalloc()
+            except Exception as exc:
+                logger.warning("Failed to stop profiling %s: %s", name, exc)
+            else:
+                self._dump(name, profile, snapshot, after)
+
+    def _start_memory(self, name):
+        try:
+            return self._start_tracemalloc()
+        except Exception as exc:
+            logger.warning("Not tracing allocations of %s: %s", name, exc)
+            return None
+
+    def _start_cpu(self, name):
+        try:
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile
+        except ValueError as exc:
+            # another profiler is active, e.g. in a concurrent thread
+            logger.debug("Not profiling %s: %s", name, exc)
+        except Exception as exc:
+            logger.warning("Not profiling %s: %s", name, exc)
+        return None
+
+    def _dump(self, name, profile, before, after):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if profile is not None:
+                path = self._path(name, '.prof')
+                profile.dump_stats(path)
+                logger.debug("CPU profile of %s written to %s", name, path)
+            if before is not None:
+                path = self._path(name, '.alloc.txt')
+                self._write_allocations(path, name, before, after)
+                logger.debug("Allocations of %s written to %s", name, path)
+        except Exception as exc:
+            logger.warning("Failed to write profile of %s: %s", name, exc)
+
+
+_profiler = Profiler.from_environment()
+
+
+def set_profiler(profiler):
+    """
+    :param profiler: Profiler, None to disable profiling
+    """
+    global _profiler
+    _profiler = profiler
+
+
+def get_profiler():
+    return _profiler
+
+
+@contextmanager
+def profile(name):
+    """
+    Profile the block with the profiler set by set_profiler(), if any
+
+    :param name: str, name of the profiled call
+    """
+    profiler = _profiler
+    if profiler is None:
+        yield
+        return
+    with profiler.profile(name):
+        yield
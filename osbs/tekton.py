@@ -5,19 +5,32 @@ This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
 import json
+import math
 import time
 import logging
 import base64
 import os
+import queue
+import random
 import requests
+import collections.abc
 import copy
-from typing import Dict, Tuple, Callable, Any
+import gzip
+import heapq
+import lzma
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Callable
 
 
-from osbs.exceptions import OsbsResponseException, OsbsAuthException, OsbsException
+from osbs.exceptions import (OsbsResponseException, OsbsAuthException, OsbsException,
+                             OsbsValidationException, OsbsTimeoutException)
 from osbs.constants import (DEFAULT_NAMESPACE, SERVICEACCOUNT_SECRET, SERVICEACCOUNT_TOKEN,
                             SERVICEACCOUNT_CACRT)
-from osbs.osbs_http import HttpSession
+from osbs import metrics, tracing
+from osbs.accounting import RequestAccounting, propagate
+from osbs.osbs_http import HttpCapture, HttpReplay, HttpSession
+from osbs.timings import PhaseTimings
 from osbs.kerberos_ccache import kerberos_ccache_init
 from osbs.utils import retry_on_conflict
 from urllib.parse import urljoin, urlencode, urlparse, parse_qs
@@ -25,8 +38,14 @@ from requests.utils import guess_json_utf
 
 logger = logging.getLogger(__name__)
 
-# Retry each connection attempt after 5 seconds, for a maximum of 20 times
-WATCH_RETRY_SECS = 5
+# Ask the server to close watch connections after 5 minutes, so they end cleanly
+# before HTTP_REQUEST_TIMEOUT; cleanly closed watches are reopened immediately
+WATCH_TIMEOUT_SECS = 300
+
+# Retry failed connection attempts with decorrelated jitter backoff between
+# 1 and 30 seconds, for a maximum of 20 times
+WATCH_RETRY_SECS = 1
+WATCH_RETRY_MAX_SECS = 30
 WATCH_RETRY = 20
 MAX_BAD_RESPONSES = 20
 
@@ -35,8 +54,39 @@ WAIT_RETRY_SECS = 5
 WAIT_RETRY_HOURS = 5
 WAIT_RETRY = (WAIT_RETRY_HOURS * 3600) // WAIT_RETRY_SECS
 
+# Coalesce bursts of watch events arriving within 1 second
+WATCH_COALESCE_SECS = 1
+
+# Number of objects fetched in one page when listing resources
+LIST_PAGE_SIZE = 500
+
+# Number of log lines fetched from the end of each failed step
+FAILED_STEP_TAIL_LINES = 200
+
+# Lines of concurrently streamed logs buffered to restore their time order
+LOG_REORDER_WINDOW = 64
+# Buffered lines are released after 2 seconds at most, also when fewer are buffered
+LOG_REORDER_MAX_DELAY_SECS = 2
+
+# Download at most 8 container logs at the same time
+LOG_DOWNLOAD_WORKERS = 8
+
+# Compression of downloaded log files: (file opener, file name suffix)
+LOG_COMPRESSION = {
+    None: (open, ''),
+    'gzip': (gzip.open, '.gz'),
+    'xz': (lzma.open, '.xz'),
+}
+
 API_VERSION = "tekton.dev/v1beta1"
 
+# Ask for metadata only (name, labels, ...) without spec and status,
+# servers not supporting it respond with full objects
+PARTIAL_OBJECT_METADATA_ACCEPT = \
+    'application/json;as=PartialObjectMetadata;g=meta.k8s.io;v=v1,application/json'
+PARTIAL_OBJECT_METADATA_LIST_ACCEPT = \
+    'application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,application/json'
+
 
 def check_response(response, log_level=logging.INFO):
     if response.status_code not in (
@@ -65,21 +115,284 @@ def check_response_json(response, cmd):
     return run_json
 
 
+class WatchStop(object):
+    """
+    Stop Openshift.watch_resource() from another thread
+
+    The watch checks it for every event and before reconnecting; the connection
+    it reads is shut down when stopping, so the watch doesn't wait for the next
+    event, which may never come for objects which don't change anymore.
+    """
+
+    def __init__(self):
+        self._stopped = threading.Event()
+        self._response = None
+        self._lock = threading.Lock()
+
+    def is_set(self):
+        return self._stopped.is_set()
+
+    def set(self):
+        with self._lock:
+            self._stopped.set()
+            response = self._response
+        if response is not None:
+            response.abort()
+
+    def attach(self, response):
+        """
+        :param response: HttpStream, watch response to shut down when stopping
+        """
+        with self._lock:
+            self._response = response
+            stopped = self._stopped.is_set()
+        if stopped:
+            response.abort()
+
+    def detach(self):
+        with self._lock:
+            self._response = None
+
+
+def _coalesce(watch, coalesce_secs, stop=None):
+    """
+    Read objects from watch in a background thread, yield the first object of a burst
+    right away and only the latest object of the rest of the burst, when it ends
+
+    :param stop: WatchStop the watch was created with, set when the consumer stops,
+                 so the background thread ends together with the watch connection
+    """
+    events = queue.Queue()
+    stop = stop if stop is not None else threading.Event()
+    finished = object()
+    nothing = object()
+
+    def read_watch():
+        try:
+            for obj in watch:
+                events.put((obj, None))
+                if stop.is_set():
+                    break
+        except Exception as exc:  # pylint: disable=broad-except
+            events.put((finished, exc))
+        else:
+            events.put((finished, None))
+        finally:
+            close = getattr(watch, 'close', None)
+            if close:
+                close()
+
+    reader = threading.Thread(target=tracing.propagate(propagate(read_watch)),
+                              name='osbs-watch', daemon=True)
+    reader.start()
+
+    pending = nothing
+    last_yielded = None
+    try:
+        while True:
+            timeout = None
+            if pending is not nothing:
+                timeout = max(0, last_yielded + coalesce_secs - time.monotonic())
+            try:
+                obj, exc = events.get(timeout=timeout)
+            except queue.Empty:
+                last_yielded = time.monotonic()
+                yield pending
+                pending = nothing
+                continue
+
+            if obj is finished:
+                if pending is not nothing:
+                    yield pending
+                if exc:
+                    raise exc
+                return
+
+            if pending is nothing and (last_yielded is None or
+                                       time.monotonic() - last_yielded >= coalesce_secs):
+                last_yielded = time.monotonic()
+                yield obj
+            else:
+                pending = obj
+    finally:
+        stop.set()
+
+
+def watch_changes(watch, projection, coalesce_secs=0, stop=None):
+    """
+    Filter objects from watch, yield only those whose projection changed
+
+    Empty objects are always yielded, watch_resource uses them to signal connection
+    problems, so that consumers can check whether the object still exists.
+
+    :param watch: iterable of objects, e.g. Openshift.watch_resource()
+    :param projection: callable, returns comparable part of an object the caller cares about
+    :param coalesce_secs: number, when set, bursts of objects arriving within this many
+                          seconds are coalesced and only the latest object is considered
+    :param stop: WatchStop passed to Openshift.watch_resource(), used when coalescing
+    """
+    if coalesce_secs:
+        watch = _coalesce(watch, coalesce_secs, stop=stop)
+
+    unset = object()
+    last_projection = unset
+    for obj in watch:
+        if not obj:
+            yield obj
+            continue
+
+        current_projection = projection(obj)
+        if current_projection == last_projection:
+            logger.debug("Skipping watch event, no relevant change: %s", current_projection)
+            continue
+
+        last_projection = current_projection
+        yield obj
+
+
+def _condition_projection(obj):
+    try:
+        condition = obj['status']['conditions'][0]
+    except (KeyError, IndexError):
+        return None
+    return condition.get('status'), condition.get('reason')
+
+
+def _pipeline_run_progress_projection(pipeline_run):
+    child_references = pipeline_run.get('status', {}).get('childReferences', [])
+    return (_condition_projection(pipeline_run),
+            frozenset(child['name'] for child in child_references))
+
+
+def _pod_phase_projection(pod):
+    return pod.get('status', {}).get('phase')
+
+
+def _watch_retry_delay(retry_delay):
+    # https://aws.amazon.com/blogs/architecture/exponential-backoff-and-jitter/
+    return min(WATCH_RETRY_MAX_SECS, random.uniform(WATCH_RETRY_SECS, retry_delay * 3))
+
+
+def _pipeline_run_finished(pipeline_run):
+    condition_status = _condition_projection(pipeline_run)
+    return condition_status is not None and condition_status[0] in ('True', 'False')
+
+
+def _run_completed(run):
+    """
+    Pipeline or task run will not change anymore, e.g. can be cached for good
+
+    The condition is set final before Tekton finishes updating the run, only
+    runs with completionTime are complete.
+    """
+    return _pipeline_run_finished(run) and bool(run.get('status', {}).get('completionTime'))
+
+
+def _log_query(tail_lines=None, limit_bytes=None, timestamps=False):
+    """
+    Query parameters of the Kubernetes pod log API limiting the size of logs
+    and prefixing lines with timestamps
+    """
+    query = {}
+    if timestamps:
+        query['timestamps'] = 'true'
+    if tail_lines is not None:
+        query['tailLines'] = tail_lines
+    if limit_bytes is not None:
+        query['limitBytes'] = limit_bytes
+    return query
+
+
+def _log_timestamp_key(timestamp):
+    """
+    Sortable key of RFC3339Nano timestamp, e.g. 2022-04-26T15:58:42.12345Z
+
+    Trailing zeros of fractional seconds are omitted in RFC3339Nano, pad them
+    so keys compare correctly as strings.
+    """
+    timestamp = timestamp.rstrip('Z')
+    seconds, _, fraction = timestamp.partition('.')
+    return f"{seconds}.{fraction:0<9}"
+
+
+def merge_timestamped_logs(logs, window=LOG_REORDER_WINDOW,
+                           max_delay=LOG_REORDER_MAX_DELAY_SECS):
+    """
+    Order interleaved log streams by time, using a bounded reorder window
+
+    Each line is expected to start with a timestamp, as returned by the pod log
+    API with timestamps=true. Lines are kept in a heap of at most window lines
+    and the earliest one is released when the heap is full, so lines which are
+    late by less than window lines are put in order without buffering whole logs.
+
+    Slowly produced logs would fill the window only after a long time, so
+    earliest lines are also released until no line is buffered for longer than
+    max_delay seconds. This is checked whenever a line arrives, lines buffered
+    while all streams are stalled are released with the next line.
+
+    :param logs: iterable of (task name, line with timestamp) pairs
+    :param window: int, maximum number of buffered lines
+    :param max_delay: float, maximum number of seconds a line is buffered for
+    :return: iterator of (task name, line without timestamp)
+    """
+    heap = []
+    # {seq: time queued} of buffered lines, in the order they arrived
+    queued = {}
+    last_key = ''
+    for seq, (task_name, line) in enumerate(logs):
+        now = time.monotonic()
+        timestamp, _, text = line.partition(' ')
+        if timestamp[:1].isdigit():
+            last_key = _log_timestamp_key(timestamp)
+        else:
+            # not timestamped, keep it next to the previous line
+            text = line
+        heapq.heappush(heap, (last_key, seq, task_name, text))
+        queued[seq] = now
+        while heap and (len(heap) > window or
+                        now - next(iter(queued.values())) > max_delay):
+            _, released, task_name, text = heapq.heappop(heap)
+            del queued[released]
+            yield task_name, text
+
+    while heap:
+        _, _, task_name, text = heapq.heappop(heap)
+        yield task_name, text
+
+
+def _task_run_failed(status, reason, has_completion_time):
+    return status == 'False' and reason != 'TaskRunCancelled' and has_completion_time
+
+
+def _check_log_compression(compress):
+    if compress not in LOG_COMPRESSION:
+        raise OsbsValidationException(
+            f"Unsupported log compression '{compress}', "
+            f"use one of: {', '.join(str(c) for c in LOG_COMPRESSION)}"
+        )
+
+
 class Openshift(object):
     def __init__(self, openshift_api_url, openshift_oauth_url,
                  k8s_api_url=None,
                  verbose=False, username=None, password=None, use_kerberos=False,
                  kerberos_keytab=None, kerberos_principal=None, kerberos_ccache=None,
                  client_cert=None, client_key=None, verify_ssl=True, use_auth=None,
-                 token=None, namespace=DEFAULT_NAMESPACE):
+                 token=None, namespace=DEFAULT_NAMESPACE, capture_dir=None,
+                 replay_dir=None):
         self.os_api_url = openshift_api_url
         self.k8s_api_url = k8s_api_url
         self._os_oauth_url = openshift_oauth_url
         self.namespace = namespace
         self.verbose = verbose
         self.verify_ssl = verify_ssl
-        self._con = HttpSession(verbose=self.verbose)
+        self._con = HttpSession(
+            verbose=self.verbose,
+            capture=HttpCapture(capture_dir) if capture_dir else None,
+            replay=HttpReplay(replay_dir) if replay_dir else None,
+        )
         self.retries_enabled = True
+        self.request_accounting = RequestAccounting()
 
         # auth stuff
         self.use_kerberos = use_kerberos
@@ -178,30 +491,35 @@ class Openshift(object):
 
     def post(self, url, with_auth=True, **kwargs):
         headers, kwargs = self._request_args(with_auth, **kwargs)
+        self.request_accounting.record('post', url)
         return self._con.post(
             url, headers=headers, verify_ssl=self.verify_ssl,
             retries_enabled=self.retries_enabled, **kwargs)
 
     def get(self, url, with_auth=True, **kwargs):
         headers, kwargs = self._request_args(with_auth, **kwargs)
+        self.request_accounting.record('get', url)
         return self._con.get(
             url, headers=headers, verify_ssl=self.verify_ssl,
             retries_enabled=self.retries_enabled, **kwargs)
 
     def put(self, url, with_auth=True, **kwargs):
         headers, kwargs = self._request_args(with_auth, **kwargs)
+        self.request_accounting.record('put', url)
         return self._con.put(
             url, headers=headers, verify_ssl=self.verify_ssl,
             retries_enabled=self.retries_enabled, **kwargs)
 
     def patch(self, url, with_auth=True, **kwargs):
         headers, kwargs = self._request_args(with_auth, **kwargs)
+        self.request_accounting.record('patch', url)
         return self._con.patch(
             url, headers=headers, verify_ssl=self.verify_ssl,
             retries_enabled=self.retries_enabled, **kwargs)
 
     def delete(self, url, with_auth=True, **kwargs):
         headers, kwargs = self._request_args(with_auth, **kwargs)
+        self.request_accounting.record('delete', url)
         return self._con.delete(
             url, headers=headers, verify_ssl=self.verify_ssl,
             retries_enabled=self.retries_enabled, **kwargs)
@@ -299,15 +617,210 @@ class Openshift(object):
 
         return result
 
+    def get_metadata(self, url):
+        """
+        Get only metadata of a resource, much smaller than the full object
+
+        :param url: str, url of the resource
+        :return: dict, object with 'metadata' key; None if the resource does not exist
+        """
+        response = self.get(url, headers={'Accept': PARTIAL_OBJECT_METADATA_ACCEPT})
+        return check_response_json(response, 'get_metadata')
+
+    def list_resources(self, api_path, api_version, resource_type, label_selector=None,
+                       field_selector=None, page_size=LIST_PAGE_SIZE, metadata_only=False):
+        """
+        List resources of a type in the namespace, page by page
+
+        Pages are requested lazily using limit and continue, so only one page
+        of objects is held in memory at a time.
+
+        :param label_selector: str, e.g. 'app=osbs,koji-task-id=123'
+        :param field_selector: str, e.g. 'metadata.name=my-build'
+        :param page_size: int, maximum number of objects requested at once
+        :param metadata_only: bool, list only metadata of objects, see get_metadata
+        :return: iterator of resource objects (dicts)
+        :raises OsbsResponseException: if a page can't be listed, including 404
+        """
+        kwargs = {}
+        if metadata_only:
+            kwargs['headers'] = {'Accept': PARTIAL_OBJECT_METADATA_LIST_ACCEPT}
+        query = {'limit': page_size}
+        if label_selector:
+            query['labelSelector'] = label_selector
+        if field_selector:
+            query['fieldSelector'] = field_selector
+
+        while True:
+            url = self.build_url(api_path, api_version, resource_type, **query)
+            response = self.get(url, **kwargs)
+            check_response(response)
+            resource_list = response.json()
+
+            yield from resource_list.get('items') or []
+
+            continue_token = resource_list.get('metadata', {}).get('continue')
+            if not continue_token:
+                return
+            logger.debug("Fetching next page of %s", resource_type)
+            query['continue'] = continue_token
+
+    def get_resource_version(self, api_path, api_version, resource_type):
+        """
+        Get current resourceVersion of resources of a type, to start watching from
+
+        Only metadata of a single object is requested, so the response is tiny.
+        """
+        url = self.build_url(api_path, api_version, resource_type, limit=1)
+        response = self.get(url, headers={'Accept': PARTIAL_OBJECT_METADATA_LIST_ACCEPT})
+        check_response(response)
+        return response.json()['metadata']['resourceVersion']
+
+    def watch_collection(self, api_path, api_version, resource_type, resource_version,
+                         label_selector=None, timeout=None):
+        """
+        Watch changes of all resources of a type in the namespace
+
+        The watch starts after resource_version and is resumed from the last seen
+        resourceVersion when the server closes it. Failed connections are retried
+        with backoff, like in watch_resource.
+
+        :param resource_version: str, report changes made after this version
+        :param label_selector: str, watch only resources matching the selector
+        :param timeout: float, stop watching after this many seconds
+        :return: iterator of (event type, object), event type is one of
+                 'ADDED', 'MODIFIED', 'DELETED'
+        :raises OsbsResponseException: with status code 410 (Gone) when
+                resource_version is too old and the state has to be fetched again
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        query = {'allowWatchBookmarks': 'true'}
+        if label_selector:
+            query['labelSelector'] = label_selector
+        watch_path = f"watch/namespaces/{self.namespace}/{resource_type}/"
+
+        retry_delay = WATCH_RETRY_SECS
+        retries = 0
+        connections = 0
+        while retries < WATCH_RETRY:
+            if connections:
+                metrics.WATCH_RECONNECTS.inc(resource=resource_type)
+            connections += 1
+            timeout_secs = WATCH_TIMEOUT_SECS
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                timeout_secs = min(timeout_secs, math.ceil(remaining))
+
+            watch_url = self.build_url(api_path, api_version, watch_path,
+                                       _prepend_namespace=False,
+                                       resourceVersion=resource_version,
+                                       timeoutSeconds=timeout_secs, **query)
+            logger.debug("Watching for updates for %s from version %s",
+                         resource_type, resource_version)
+            received_events = False
+            watch_span = tracing.get_tracer().start_span(
+                'watch', {'osbs.resource': resource_type, 'osbs.resource_version': resource_version,
+                          'osbs.reconnects': connections - 1}, current=False)
+            try:
+                response = self.get(watch_url, stream=True, headers={'Connection': 'close'})
+                check_response(response)
+
+                for line in response.iter_lines():
+                    try:
+                        event = json.loads(line.decode(guess_json_utf(line)))
+                    except ValueError:
+                        logger.warning("Cannot decode watch event: %s", line)
+                        metrics.WATCH_BAD_RESPONSES.inc(resource=resource_type)
+                        continue
+                    event_type = event.get('type')
+                    obj = event.get('object') or {}
+                    metrics.WATCH_EVENTS.inc(resource=resource_type, type=event_type)
+
+                    if event_type == 'ERROR':
+                        # watch failed, e.g. resource version expired, obj is Status
+                        raise OsbsResponseException(message=json.dumps(obj),
+                                                    status_code=obj.get('code'))
+
+                    received_events = True
+                    resource_version = (obj.get('metadata', {})
+                                        .get('resourceVersion', resource_version))
+                    if event_type == 'BOOKMARK':
+                        continue
+                    yield event_type, obj
+
+            except OsbsResponseException as exc:
+                metrics.WATCH_BAD_RESPONSES.inc(resource=resource_type)
+                if exc.status_code == requests.codes.gone:
+                    raise
+                logger.debug("Watch for %s failed: %s", resource_type, exc)
+            except OsbsException as exc:
+                if (not isinstance(exc.cause, requests.ConnectionError) and
+                        not isinstance(exc.cause, requests.Timeout)):
+                    raise
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                logger.debug("Connection error while watching %s", resource_type)
+            else:
+                # closed by the server after timeoutSeconds, also when idle
+                retries = 0
+                retry_delay = WATCH_RETRY_SECS
+                continue
+            finally:
+                watch_span.set_attribute('osbs.received_events', received_events)
+                tracing.get_tracer().end_span(watch_span)
+
+            retries += 1
+            if retries < WATCH_RETRY:
+                retry_delay = _watch_retry_delay(retry_delay)
+                logger.debug("Connection closed, reconnecting in %.1fs", retry_delay)
+                time.sleep(retry_delay)
+
+    def delete_collection(self, api_path, api_version, resource_type, label_selector):
+        """
+        Delete all resources of a type matching the label selector in one request
+
+        :param label_selector: str, e.g. 'koji-task-id=123', must not be empty
+        :return: list of deleted objects (dicts)
+        """
+        if not label_selector:
+            raise OsbsValidationException("Label selector is required to delete resources")
+
+        url = self.build_url(api_path, api_version, resource_type,
+                             labelSelector=label_selector)
+        response = self.delete(
+            url,
+            headers={"Content-Type": "application/json", "Accept": "application/json"},
+        )
+        deleted = check_response_json(response, f'delete {resource_type}')
+        return (deleted or {}).get('items') or []
+
     def watch_resource(self, api_path, api_version, resource_type, resource_name,
-                       **request_args):
+                       stop=None, **request_args):
         """
         Watch for changes in openshift object and return it's json representation
         after each update to the object
+
+        The server closes the watch after WATCH_TIMEOUT_SECS, it is reopened right away,
+        also when no events were received. Connections which failed and watches which
+        reported an error event are retried with decorrelated jitter backoff.
+
+        :param stop: WatchStop, ends the watch when set, e.g. by the consumer of
+                     the watch read in another thread
         """
+        def stopped():
+            return stop is not None and stop.is_set()
+
+        retry_delay = WATCH_RETRY_SECS
+
         def log_and_sleep():
-            logger.debug("Connection closed, reconnecting in %ds", WATCH_RETRY_SECS)
-            time.sleep(WATCH_RETRY_SECS)
+            nonlocal retry_delay
+            retry_delay = _watch_retry_delay(retry_delay)
+            logger.debug("Connection closed, reconnecting in %.1fs", retry_delay)
+            time.sleep(retry_delay)
+
+        request_args.setdefault('timeoutSeconds', WATCH_TIMEOUT_SECS)
+        request_args.setdefault('allowWatchBookmarks', 'true')
 
         watch_path = f"watch/namespaces/{self.namespace}/{resource_type}/{resource_name}/"
         watch_url = self.build_url(
@@ -317,25 +830,56 @@ class Openshift(object):
                                  f"{resource_type}/{resource_name}")
 
         bad_responses = 0
-        for _ in range(WATCH_RETRY):
+        retries = 0
+        connections = 0
+        while retries < WATCH_RETRY and not stopped():
+            if connections:
+                metrics.WATCH_RECONNECTS.inc(resource=resource_type)
+            connections += 1
             logger.debug("Watching for updates for %s, %s", resource_type, resource_name)
+            received_events = False
+            failed = False
+            watch_span = tracing.get_tracer().start_span(
+                'watch', {'osbs.resource': resource_type, 'osbs.name': resource_name,
+                          'osbs.reconnects': connections - 1}, current=False)
             try:
                 response = self.get(watch_url, stream=True,
                                     headers={'Connection': 'close'})
+                if stop is not None:
+                    stop.attach(response)
                 check_response(response)
 
                 for line in response.iter_lines():
+                    if stopped():
+                        return
                     encoding = guess_json_utf(line)
                     try:
                         j = json.loads(line.decode(encoding))
                     except ValueError:
                         logger.warning("Cannot decode watch event: %s", line)
+                        metrics.WATCH_BAD_RESPONSES.inc(resource=resource_type)
                         continue
                     if 'object' not in j:
                         logger.warning("Watch event has no 'object': %s", j)
+                        metrics.WATCH_BAD_RESPONSES.inc(resource=resource_type)
                         continue
                     if 'type' not in j:
                         logger.warning("Watch event has no 'type': %s", j)
+                        metrics.WATCH_BAD_RESPONSES.inc(resource=resource_type)
+                        continue
+                    metrics.WATCH_EVENTS.inc(resource=resource_type, type=j['type'])
+
+                    if j['type'] == 'ERROR':
+                        # the server ends the watch after an error, obj is Status
+                        logger.warning("Watch for %s, %s failed: %s",
+                                       resource_type, resource_name, j['object'])
+                        metrics.WATCH_BAD_RESPONSES.inc(resource=resource_type)
+                        failed = True
+                        break
+
+                    received_events = True
+                    if j['type'] == 'BOOKMARK':
+                        # bookmarks only keep the watch alive, the object didn't change
                         continue
 
                     # Avoid races. We've already asked the server to tell us
@@ -350,6 +894,7 @@ class Openshift(object):
 
             # we're already retrying, so there's no need to panic just because of a bad response
             except OsbsResponseException as exc:
+                metrics.WATCH_BAD_RESPONSES.inc(resource=resource_type)
                 bad_responses += 1
                 if bad_responses > MAX_BAD_RESPONSES:
                     raise exc
@@ -359,23 +904,339 @@ class Openshift(object):
                         not isinstance(exc.cause, requests.Timeout)):
                     raise
             except requests.exceptions.ConnectionError:
+                if stopped():
+                    return
                 # resource might have been already removed, so yield None
                 # and check if resource still exists
                 logger.debug("Got Connection exception while watching resource %s", resource_name)
                 yield {}
             except requests.exceptions.Timeout:
+                if stopped():
+                    return
                 # resource might have been already removed, so yield None
                 # and check if resource still exists
                 logger.debug("Got Timeout exception while watching resource %s", resource_name)
                 yield {}
+            else:
+                if stopped():
+                    return
+                if not failed:
+                    # watch timed out on the server side, even an idle one is
+                    # healthy, no reason to wait
+                    logger.debug("Watch for %s, %s closed by server, reconnecting",
+                                 resource_type, resource_name)
+                    retries = 0
+                    retry_delay = WATCH_RETRY_SECS
+                    continue
+            finally:
+                if stop is not None:
+                    stop.detach()
+                watch_span.set_attribute('osbs.received_events', received_events)
+                tracing.get_tracer().end_span(watch_span)
+
+            retries += 1
+            if retries < WATCH_RETRY and not stopped():
+                log_and_sleep()
 
-            log_and_sleep()
+
+def _decode_result(name, raw_value):
+    try:
+        return json.loads(raw_value)
+    # TypeError is returned when value is list
+    except (json.JSONDecodeError, TypeError):
+        logger.info("pipeline result '%s' is not json '%s'", name, raw_value)
+        return raw_value
+
+
+class RunResults(collections.abc.Mapping):
+    """
+    Results of a pipeline run or task run by name
+
+    Values are JSON-decoded on first access, values which are not JSON are
+    returned as they are. Raw strings are available in the raw attribute.
+    """
+    __slots__ = ('raw', '_decoded')
+
+    def __init__(self, results):
+        """
+        :param results: list of {'name': str, 'value': str}, as in run status
+        """
+        self.raw = {result['name']: result['value'] for result in results}
+        self._decoded = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._decoded[name]
+        except KeyError:
+            value = self._decoded[name] = _decode_result(name, self.raw[name])
+            return value
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __len__(self):
+        return len(self.raw)
+
+
+class RunStatus(object):
+    """
+    Compact view of status of a pipeline run or task run
+
+    Keeps only the fields used by the client, without the embedded pipeline
+    and task specs, so it's cheap to hold many of them.
+    """
+    __slots__ = ('name', 'pipeline_task', 'resource_version', 'has_conditions', 'status',
+                 'reason', 'message', 'start_time', 'completion_time', 'task_run_names',
+                 'pod_name', 'steps', 'has_results', 'results')
+
+    def __init__(self, run):
+        """
+        :param run: dict, pipeline run or task run object
+        """
+        metadata = run.get('metadata', {})
+        status = run.get('status', {})
+        conditions = status.get('conditions')
+        condition = conditions[0] if conditions else {}
+
+        self.name = metadata.get('name')
+        self.pipeline_task = metadata.get('labels', {}).get('tekton.dev/pipelineTask')
+        self.resource_version = metadata.get('resourceVersion')
+        self.has_conditions = bool(conditions)
+        self.status = condition.get('status')
+        self.reason = condition.get('reason')
+        self.message = condition.get('message')
+        self.start_time = status.get('startTime')
+        self.completion_time = status.get('completionTime')
+        # names of child references which are task runs
+        self.task_run_names = tuple(child['name'] for child
+                                    in status.get('childReferences', [])
+                                    if child['kind'] == 'TaskRun')
+        self.pod_name = status.get('podName')
+        self.steps = tuple(status.get('steps', []))
+        # results may be reported and empty
+        self.has_results = 'pipelineResults' in status or 'taskResults' in status
+        self.results = RunResults(status.get('pipelineResults') or
+                                  status.get('taskResults') or [])
+
+    @property
+    def finished(self):
+        return self.status in ('True', 'False')
+
+    @property
+    def failed_step_containers(self):
+        """
+        Containers of steps which terminated with non-zero exit code
+        """
+        return [step['container'] for step in self.steps
+                if step.get('terminated', {}).get('exitCode', 0) != 0]
+
+
+BuildReport = collections.namedtuple('BuildReport', [
+    'name', 'info', 'status', 'reason', 'succeeded', 'cancelled', 'finished',
+    'any_task_failed', 'any_task_cancelled', 'error_message', 'final_platforms',
+    'task_results', 'pipeline_results', 'task_times',
+])
+
+
+def _task_run_cancelled(status, reason, has_completion_time):
+    return reason == 'TaskRunCancelled'
+
+
+def _filter_task_runs(task_statuses, state_name, match_state):
+    """
+    :param task_statuses: list of RunStatus
+    :param state_name: str, name of the state, for logging
+    :param match_state: callable, (status, reason, has_completion_time) -> bool
+    :return: list of RunStatus matching the state
+    """
+
+    def matches_state(task_status):
+        task_name = task_status.pipeline_task
+
+        if not task_status.has_conditions:
+            logger.debug('conditions are missing from status in task %s', task_name)
+            return False
+
+        status = task_status.status
+        reason = task_status.reason
+        completion_time = task_status.completion_time
+
+        if match_state(status, reason, completion_time is not None):
+            logger.debug(
+                'Found %s task: name=%s; status=%s; reason=%s; completionTime=%s',
+                state_name, task_name, status, reason, completion_time,
+            )
+            return True
+
+        return False
+
+    return [task_status for task_status in task_statuses if matches_state(task_status)]
+
+
+def _task_results(task_statuses):
+    return {task_status.pipeline_task: dict(task_status.results.raw)
+            for task_status in task_statuses if task_status.has_results}
+
+
+def _task_times(task_statuses):
+    return {task_status.pipeline_task or task_status.name:
+            {'start_time': task_status.start_time,
+             'completion_time': task_status.completion_time}
+            for task_status in task_statuses}
+
+
+def _final_platforms(task_results):
+    if 'binary-container-prebuild' not in task_results:
+        return None
+
+    if 'platforms_result' in task_results['binary-container-prebuild']:
+        platforms = json.loads(task_results['binary-container-prebuild']['platforms_result'])
+        return platforms['platforms']
+
+    return None
+
+
+def _error_message(status, task_statuses):
+    plugin_errors = None
+    annotations_str = None
+    task_results = _task_results(task_statuses)
+
+    for task_name in ('binary-container-exit', 'source-container-exit'):
+        if task_name not in task_results:
+            continue
+
+        if 'annotations' in task_results[task_name]:
+            annotations_str = task_results[task_name]['annotations']
+            break
+
+    if annotations_str:
+        plugins_metadata = json.loads(annotations_str).get('plugins-metadata')
+
+        if plugins_metadata:
+            plugin_errors = plugins_metadata.get('errors')
+
+    err_message = ""
+
+    if plugin_errors:
+        for plugin, error in plugin_errors.items():
+            err_message += f"Error in plugin {plugin}: {error};\n"
+
+    pipeline_error = status.message
+
+    for task_status in task_statuses:
+        task_name = task_status.pipeline_task
+        got_task_error = False
+        if task_status.reason in ['Succeeded', 'None']:
+            # tekton: "None" reason means skipped task; yes string
+            continue
+
+        if task_status.steps:
+            for step in task_status.steps:
+                if 'terminated' in step:
+                    exit_code = step['terminated']['exitCode']
+                    if exit_code == 0:
+                        continue
+
+                    if 'message' in step['terminated']:
+                        try:
+                            message_json = json.loads(step['terminated']['message'])
+                            for message in message_json:
+                                if message['key'] == 'task_result':
+                                    err_message += f"Error in {task_name}: " \
+                                                   f"{message['value']};\n"
+                            got_task_error = True
+                            continue
+                        except Exception as e:
+                            logger.info("failed to get error message: %s", repr(e))
+                            continue
+
+        if not got_task_error:
+            err_message += f"Error in {task_name}: " \
+                           f"{task_status.message};\n"
+
+    if not err_message:
+        if pipeline_error:
+            err_message = f"{pipeline_error};"
+        else:
+            err_message = "pipeline run failed;"
+
+    return err_message
+
+
+def _pipeline_run_succeeded(reason):
+    # tekton: completed means succeeded with a skipped task
+    return reason in ['Succeeded', 'Completed']
+
+
+def _pipeline_run_cancelled(reason):
+    return reason == 'PipelineRunCancelled'
+
+
+def wait_for_pipeline_runs(os, pipeline_run_names, timeout=None):
+    """
+    Wait for pipeline runs to finish, yield them as they finish
+
+    All pipeline runs are tracked through a single watch of the namespace instead
+    of watching or polling each of them.
+
+    :param os: Openshift
+    :param pipeline_run_names: list of str, names of pipeline runs
+    :param timeout: float, seconds to wait for all pipeline runs to finish
+    :return: iterator of (name, final pipeline run info) in completion order;
+             info is None for pipeline runs which do not exist
+    :raises OsbsTimeoutException: when some pipeline runs did not finish in time
+    """
+    pending = set(pipeline_run_names)
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    while pending:
+        # take resource version first, changes made while checking the current
+        # state of pipeline runs will be reported by the watch
+        resource_version = os.get_resource_version('apis', API_VERSION, 'pipelineruns')
+        for name in [name for name in pipeline_run_names if name in pending]:
+            pipeline_run = PipelineRun(os, name).get_info()
+            if not pipeline_run or _pipeline_run_finished(pipeline_run):
+                pending.discard(name)
+                yield name, pipeline_run
+        if not pending:
+            return
+
+        remaining = None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+        try:
+            for event_type, pipeline_run in os.watch_collection('apis', API_VERSION,
+                                                                'pipelineruns',
+                                                                resource_version,
+                                                                timeout=remaining):
+                name = pipeline_run.get('metadata', {}).get('name')
+                if name not in pending:
+                    continue
+                if event_type == 'DELETED' or _pipeline_run_finished(pipeline_run):
+                    pending.discard(name)
+                    yield name, pipeline_run
+                    if not pending:
+                        return
+        except OsbsResponseException as exc:
+            if exc.status_code != requests.codes.gone:
+                raise
+            logger.info("Watched resource version expired, checking pipeline runs again")
+            continue
+
+        if deadline is not None and time.monotonic() >= deadline:
+            raise OsbsTimeoutException(
+                f"Pipeline runs did not finish in {timeout}s: {', '.join(sorted(pending))}"
+            )
 
 
 class PipelineRun():
-    def __init__(self, os, pipeline_run_name, pipeline_run_data=None):
+    def __init__(self, os, pipeline_run_name, pipeline_run_data=None, cache=None, timings=None):
         self.os = os
         self.pipeline_run_name = pipeline_run_name
+        # optional ObjectCache shared with task runs
+        self.cache = cache
+        # client-side timings of the build, filled while it's created and watched
+        self.timings = timings if timings is not None else PhaseTimings()
         self.api_path = 'apis'
         self.api_version = API_VERSION
         self.input_data = pipeline_run_data
@@ -418,14 +1279,18 @@ class PipelineRun():
             self.api_version,
             "pipelineruns"
         )
-        response = self.os.post(
-            url,
-            data=json.dumps(self.input_data),
-            headers={"Content-Type": "application/json", "Accept": "application/json"},
-        )
+        with self.timings.phase('create'):
+            response = self.os.post(
+                url,
+                data=json.dumps(self.input_data),
+                headers={"Content-Type": "application/json", "Accept": "application/json"},
+            )
+        self.timings.mark('created')
         return response.json()
 
     def remove_pipeline_run(self):
+        if self.cache is not None:
+            self.cache.invalidate('PipelineRun', self.pipeline_run_name)
         url = self.os.build_url(
             self.api_path,
             self.api_version,
@@ -439,6 +1304,8 @@ class PipelineRun():
 
     @retry_on_conflict
     def cancel_pipeline_run(self):
+        if self.cache is not None:
+            self.cache.invalidate('PipelineRun', self.pipeline_run_name)
         data = copy.deepcopy(self.minimal_data)
         data['spec']['status'] = 'CancelledRunFinally'
 
@@ -462,105 +1329,50 @@ class PipelineRun():
     def get_info(self, wait=False):
         if wait:
             self.wait_for_start()
+        if self.cache is not None:
+            return self.cache.get('PipelineRun', self.pipeline_run_name, self._fetch_info,
+                                  self.get_metadata, is_final=_run_completed)
+        return self._fetch_info()
+
+    def _fetch_info(self):
         response = self.os.get(self.pipeline_run_url)
 
         return check_response_json(response, 'get_info')
 
-    def get_task_results(self):
-        data = self.data
-        task_results = {}
-
-        if not data:
-            return task_results
+    def get_metadata(self):
+        """
+        Get metadata of the pipeline run, cheap check whether it exists
 
-        for task_run in self.child_references:
-            task_info = TaskRun(os=self.os, task_run_name=task_run['name']).get_info()
+        :return: dict, object with 'metadata' key; None if it does not exist
+        """
+        return self.os.get_metadata(self.pipeline_run_url)
 
-            task_name = task_info['metadata']['labels']['tekton.dev/pipelineTask']
-            results = {}
+    def get_status(self):
+        """
+        :return: RunStatus; None if the pipeline run does not exist
+        """
+        data = self.data
+        return RunStatus(data) if data else None
 
-            if 'taskResults' not in task_info['status']:
-                continue
+    def _task_run_statuses(self, status):
+        return [TaskRun(os=self.os, task_run_name=task_run_name, cache=self.cache).get_status()
+                for task_run_name in status.task_run_names]
 
-            for result in task_info['status']['taskResults']:
-                results[result['name']] = result['value']
+    def get_task_results(self):
+        status = self.get_status()
 
-            task_results[task_name] = results
+        if not status:
+            return {}
 
-        return task_results
+        return _task_results(self._task_run_statuses(status))
 
     def get_error_message(self):
-        data = self.data
+        status = self.get_status()
 
-        if not data:
+        if not status:
             return "pipeline run removed;"
 
-        plugin_errors = None
-        annotations_str = None
-        task_results = self.get_task_results()
-
-        for task_name in ('binary-container-exit', 'source-container-exit'):
-            if task_name not in task_results:
-                continue
-
-            if 'annotations' in task_results[task_name]:
-                annotations_str = task_results[task_name]['annotations']
-                break
-
-        if annotations_str:
-            plugins_metadata = json.loads(annotations_str).get('plugins-metadata')
-
-            if plugins_metadata:
-                plugin_errors = plugins_metadata.get('errors')
-
-        err_message = ""
-
-        if plugin_errors:
-            for plugin, error in plugin_errors.items():
-                err_message += f"Error in plugin {plugin}: {error};\n"
-
-        pipeline_error = data['status']['conditions'][0].get('message')
-
-        for task_run in self.child_references:
-            task_info = TaskRun(os=self.os, task_run_name=task_run['name']).get_info()
-
-            task_name = task_info['metadata']['labels']['tekton.dev/pipelineTask']
-            got_task_error = False
-            if task_info['status']['conditions'][0]['reason'] in ['Succeeded', 'None']:
-                # tekton: "None" reason means skipped task; yes string
-                continue
-
-            if 'steps' in task_info['status']:
-                for step in task_info['status']['steps']:
-                    if 'terminated' in step:
-                        exit_code = step['terminated']['exitCode']
-                        if exit_code == 0:
-                            continue
-
-                        if 'message' in step['terminated']:
-                            try:
-                                message_json = json.loads(step['terminated']['message'])
-                                for message in message_json:
-                                    if message['key'] == 'task_result':
-                                        err_message += f"Error in {task_name}: " \
-                                                       f"{message['value']};\n"
-                                got_task_error = True
-                                continue
-                            except Exception as e:
-                                logger.info("failed to get error message: %s", repr(e))
-                                continue
-
-            if not got_task_error:
-                err_message += f"Error in {task_name}: " \
-                               f"{task_info['status']['conditions'][0]['message']};\n"
-
-        if not err_message:
-            if pipeline_error:
-                err_message = f"{pipeline_error};"
-            else:
-                err_message = "pipeline run failed;"
-
-        return err_message
+        return _error_message(status, self._task_run_statuses(status))
 
     def get_final_platforms(self):
         data = self.data
@@ -568,22 +1380,59 @@ class PipelineRun():
         if not data:
             return None
 
-        task_results = self.get_task_results()
+        return _final_platforms(self.get_task_results())
 
-        if 'binary-container-prebuild' not in task_results:
-            return None
+    def build_report(self):
+        """
+        Get post-mortem report of the pipeline run
 
-        if 'platforms_result' in task_results['binary-container-prebuild']:
-            platforms = json.loads(task_results['binary-container-prebuild']['platforms_result'])
-            return platforms['platforms']
+        The pipeline run and its task runs are fetched only once, all values are
+        derived from this snapshot, so they are consistent with each other.
 
-        return None
+        :return: BuildReport, error_message is None for succeeded and unfinished runs
+        """
+        info = self.data
+        if not info:
+            logger.info("Pipeline run removed '%s'", self.pipeline_run_name)
+            return BuildReport(
+                name=self.pipeline_run_name, info=None, status=None, reason=None,
+                succeeded=False, cancelled=False, finished=True, any_task_failed=False,
+                any_task_cancelled=False, error_message="pipeline run removed;",
+                final_platforms=None, task_results={}, pipeline_results={}, task_times={},
+            )
+
+        status = RunStatus(info)
+        task_statuses = self._task_run_statuses(status)
+        task_results = _task_results(task_statuses)
+        succeeded = _pipeline_run_succeeded(status.reason)
+        cancelled = _pipeline_run_cancelled(status.reason)
+        # runs without conditions have not started yet
+        finished = status.status in ('True', 'False') or cancelled
+
+        return BuildReport(
+            name=self.pipeline_run_name,
+            info=info,
+            status=status.status,
+            reason=status.reason,
+            succeeded=succeeded,
+            cancelled=cancelled,
+            finished=finished,
+            any_task_failed=bool(_filter_task_runs(task_statuses, 'failed', _task_run_failed)),
+            any_task_cancelled=bool(_filter_task_runs(task_statuses, 'cancelled',
+                                                      _task_run_cancelled)),
+            error_message=(_error_message(status, task_statuses)
+                           if finished and not succeeded else None),
+            final_platforms=_final_platforms(task_results),
+            task_results=task_results,
+            pipeline_results={name: value for name, value in status.results.items()
+                              if value is not None},
+            task_times=_task_times(task_statuses),
+        )
 
     def has_succeeded(self):
         status_reason = self.status_reason
         logger.info("Pipeline run info: '%s'", self.data)
-        # tekton: completed means succeeded with a skipped task
-        return status_reason in ['Succeeded', 'Completed']
+        return _pipeline_run_succeeded(status_reason)
 
     def has_not_finished(self):
         data = self.data
@@ -591,10 +1440,10 @@ class PipelineRun():
             logger.info("Pipeline run removed '%s'", self.pipeline_run_name)
             return False
 
-        return self.status_status == 'Unknown' and self.status_reason != 'PipelineRunCancelled'
+        return self.status_status == 'Unknown' and not _pipeline_run_cancelled(self.status_reason)
 
     def was_cancelled(self):
-        return self.status_reason == 'PipelineRunCancelled'
+        return _pipeline_run_cancelled(self.status_reason)
 
     def any_task_failed(self) -> bool:
         """
@@ -602,12 +1451,7 @@ class PipelineRun():
 
         See table in https://tekton.dev/docs/pipelines/taskruns/#monitoring-execution-status
         """
-        return self._any_task_run_in_state(
-            'failed',
-            lambda status, reason, has_completion_time: (
-                status == 'False' and reason != 'TaskRunCancelled' and has_completion_time
-            ),
-        )
+        return self._any_task_run_in_state('failed', _task_run_failed)
 
     def any_task_was_cancelled(self) -> bool:
         """
@@ -615,73 +1459,59 @@ class PipelineRun():
 
         See table in https://tekton.dev/docs/pipelines/taskruns/#monitoring-execution-status
         """
-        return self._any_task_run_in_state(
-            'cancelled',
-            lambda status, reason, has_completion_time: reason == 'TaskRunCancelled',
-        )
+        return self._any_task_run_in_state('cancelled', _task_run_cancelled)
 
     def _any_task_run_in_state(
         self, state_name: str, match_state: Callable[[str, str, bool], bool]
     ) -> bool:
+        return bool(self._task_runs_in_state(state_name, match_state))
 
-        def matches_state(task_run: Dict[str, Any]) -> bool:
-            task_run_status = task_run['status']
-            task_name = task_run['metadata']['labels']['tekton.dev/pipelineTask']
-
-            if 'conditions' not in task_run_status:
-                logger.debug('conditions are missing from status in task %s : %s',
-                             task_name, task_run_status)
-                return False
-
-            status = task_run_status['conditions'][0]['status']
-            reason = task_run_status['conditions'][0]['reason']
-            completion_time = task_run_status.get('completionTime')
-
-            if match_state(status, reason, completion_time is not None):
-                logger.debug(
-                    'Found %s task: name=%s; status=%s; reason=%s; completionTime=%s',
-                    state_name, task_name, status, reason, completion_time,
-                )
-                return True
-
-            return False
+    def _task_runs_in_state(
+        self, state_name: str, match_state: Callable[[str, str, bool], bool]
+    ) -> List['RunStatus']:
+        """
+        Get status of all task runs matching the state
 
-        task_runs = []
-        for task_run in self.child_references:
-            task_info = TaskRun(os=self.os, task_run_name=task_run['name']).get_info()
-            task_runs.append(task_info)
+        :param state_name: str, name of the state, for logging
+        :param match_state: callable, (status, reason, has_completion_time) -> bool
+        :return: list of RunStatus
+        """
+        status = self.get_status()
+        if not status:
+            return []
 
-        return any(matches_state(tr) for tr in task_runs)
+        return _filter_task_runs(self._task_run_statuses(status), state_name, match_state)
 
     def wait_for_finish(self):
         """
         use this method after reading logs finished, to ensure that pipeline run finished,
         as pipeline run status doesn't change immediately when logs finished
         """
-        for _ in range(WAIT_RETRY):
-            if self.has_not_finished():
-                logger.info("Waiting for pipeline run '%s' to finish, sleep for %ss",
-                            self.pipeline_run_name, WAIT_RETRY_SECS)
-                time.sleep(WAIT_RETRY_SECS)
-            else:
-                logger.info("Pipeline run '%s' finished", self.pipeline_run_name)
-                break
+        with tracing.span('wait for finish', **{'osbs.pipeline_run': self.pipeline_run_name}):
+            for _ in range(WAIT_RETRY):
+                if self.has_not_finished():
+                    logger.info("Waiting for pipeline run '%s' to finish, sleep for %ss",
+                                self.pipeline_run_name, WAIT_RETRY_SECS)
+                    time.sleep(WAIT_RETRY_SECS)
+                else:
+                    logger.info("Pipeline run '%s' finished", self.pipeline_run_name)
+                    break
 
     @property
     def status_reason(self):
-        data = self.data
+        status = self.get_status()
 
-        if not data:
+        if not status:
             return None
-        return data['status']['conditions'][0]['reason']
+        return status.reason
 
     @property
     def status_status(self):
-        data = self.data
+        status = self.get_status()
 
-        if not data:
+        if not status:
             return None
-        return data['status']['conditions'][0]['status']
+        return status.status
 
     @property
     def child_references(self):
@@ -702,40 +1532,26 @@ class PipelineRun():
         Converts the results array to a dict of {name: <JSON-decoded value>} and filters out
         results with null values.
         """
-        data = self.data
-        if not data:
+        status = self.get_status()
+        if not status:
             return {}
 
-        def load_result(result: Dict[str, str]) -> Tuple[str, Any]:
-            name = result['name']
-            raw_value = result['value']
-            try:
-                value = json.loads(raw_value)
-            # TypeError is returned when value is list
-            except (json.JSONDecodeError, TypeError):
-                logger.info("pipeline result '%s' is not json '%s'", name, raw_value)
-                value = raw_value
-            return name, value
-
-        pipeline_results = data['status'].get('pipelineResults', [])
-
-        return {
-            name: value for name, value in map(load_result, pipeline_results) if value is not None
-        }
+        return {name: value for name, value in status.results.items() if value is not None}
 
     def wait_for_start(self):
         """
         https://tekton.dev/docs/pipelines/pipelineruns/#monitoring-execution-status
         """
         logger.info("Waiting for pipeline run '%s' to start", self.pipeline_run_name)
-        for pipeline_run in self.os.watch_resource(
-                self.api_path,
-                self.api_version,
-                resource_type="pipelineruns",
-                resource_name=self.pipeline_run_name,
-        ):
+        watch = self.os.watch_resource(
+            self.api_path,
+            self.api_version,
+            resource_type="pipelineruns",
+            resource_name=self.pipeline_run_name,
+        )
+        for pipeline_run in watch_changes(watch, _condition_projection):
             # failed because connection or timeout and pipeline was removed
-            if not pipeline_run and not self.data:
+            if not pipeline_run and not self.get_metadata():
                 logger.info("Pipeline run '%s' does not exist", self.pipeline_run_name)
                 return
 
@@ -750,6 +1566,7 @@ class PipelineRun():
             # pipeline run finished successfully or failed, or is still running
             if status in ['True', 'False'] or (status == 'Unknown' and reason == 'Running'):
                 logger.info("Pipeline run '%s' started", self.pipeline_run_name)
+                self.timings.record_since('time_to_start', 'created')
                 return pipeline_run
             else:
                 # (Unknown, Started), (Unknown, PipelineRunCancelled)
@@ -765,14 +1582,19 @@ class PipelineRun():
         sequential tasks.
         """
         watched_task_runs = set()
-        for pipeline_run in self.os.watch_resource(
-                self.api_path,
-                self.api_version,
-                resource_type="pipelineruns",
-                resource_name=self.pipeline_run_name,
-        ):
+        # the watch is read in a background thread, see _coalesce
+        stop = WatchStop()
+        watch = self.os.watch_resource(
+            self.api_path,
+            self.api_version,
+            resource_type="pipelineruns",
+            resource_name=self.pipeline_run_name,
+            stop=stop,
+        )
+        for pipeline_run in watch_changes(watch, _pipeline_run_progress_projection,
+                                          coalesce_secs=WATCH_COALESCE_SECS, stop=stop):
             # failed because connection or timeout and pipeline was removed
-            if not pipeline_run and not self.data:
+            if not pipeline_run and not self.get_metadata():
                 logger.info("Pipeline run '%s' does not exist", self.pipeline_run_name)
                 return []
 
@@ -789,7 +1611,7 @@ class PipelineRun():
                 if task_run['kind'] != 'TaskRun':
                     continue
                 task_run_name = task_run['name']
-                task_info = TaskRun(os=self.os, task_run_name=task_run_name).get_info()
+                task_info = TaskRun(os=self.os, task_run_name=task_run_name).get_metadata()
                 task_name = task_info['metadata']['labels']['tekton.dev/pipelineTask']
 
                 if task_run_name not in watched_task_runs:
@@ -807,9 +1629,9 @@ class PipelineRun():
             if status in ['True', 'False']:
                 return
 
-    def _get_logs(self):
+    def _get_logs(self, tail_lines=None, limit_bytes=None):
         logs = {}
-        pipeline_run = self.data
+        pipeline_run = self.get_metadata()
 
         if not pipeline_run:
             return None
@@ -817,21 +1639,25 @@ class PipelineRun():
         for task_run in self.child_references:
 
             task_run_object = TaskRun(os=self.os, task_run_name=task_run['name'])
-            task_info = task_run_object.get_info()
+            task_info = task_run_object.get_metadata()
             pipeline_task_name = task_info['metadata']['labels']['tekton.dev/pipelineTask']
 
-            logs[pipeline_task_name] = task_run_object.get_logs()
+            logs[pipeline_task_name] = task_run_object.get_logs(tail_lines=tail_lines,
+                                                                limit_bytes=limit_bytes)
 
         return logs
 
-    def _get_logs_stream(self):
+    def _get_logs_stream(self, tail_lines=None, limit_bytes=None, timestamps=False):
         self.wait_for_start()
         streaming_task_runs = {}
         for task_runs in self.wait_for_taskruns():
             for pipeline_task_name, task_run_name in task_runs:
                 streaming_task_runs[pipeline_task_name] = (TaskRun(os=self.os,
                                                                    task_run_name=task_run_name)
-                                                           .get_logs(follow=True, wait=True))
+                                                           .get_logs(follow=True, wait=True,
+                                                                     tail_lines=tail_lines,
+                                                                     limit_bytes=limit_bytes,
+                                                                     timestamps=timestamps))
             while streaming_task_runs:
                 tasks = list(streaming_task_runs.items())
                 for pipeline_task_name, task_run in tasks:
@@ -844,24 +1670,131 @@ class PipelineRun():
                     except StopIteration:
                         del streaming_task_runs[pipeline_task_name]
 
-    def get_logs(self, follow=False, wait=False):
+    def get_logs(self, follow=False, wait=False, tail_lines=None, limit_bytes=None,
+                 merged=False):
+        """
+        Get logs of all task runs
+
+        :param follow: bool, stream logs line by line as they are produced
+        :param wait: bool, wait for the pipeline run to start, implies streaming
+        :param tail_lines: int, get only this many lines from the end of each step log
+        :param limit_bytes: int, get at most this many bytes of each step log
+        :param merged: bool, when streaming, order lines of concurrently running tasks
+                       by time, see merge_timestamped_logs
+        """
         if wait or follow:
-            return self._get_logs_stream()
+            if merged:
+                return merge_timestamped_logs(self._get_logs_stream(tail_lines=tail_lines,
+                                                                    limit_bytes=limit_bytes,
+                                                                    timestamps=True))
+            return self._get_logs_stream(tail_lines=tail_lines, limit_bytes=limit_bytes)
         else:
-            return self._get_logs()
+            return self._get_logs(tail_lines=tail_lines, limit_bytes=limit_bytes)
+
+    def get_failed_steps_logs(self, tail_lines=FAILED_STEP_TAIL_LINES, limit_bytes=None):
+        """
+        Get ends of logs of failed steps, for summarizing build failures
+
+        Only containers of steps which terminated with non-zero exit code in failed
+        task runs are fetched, and only their last lines.
+
+        :param tail_lines: int, get only this many lines from the end of each step log
+        :param limit_bytes: int, get at most this many bytes of each step log
+        :return: dict, {pipeline task name: {container: log}};
+                 None if the pipeline run does not exist
+        """
+        if not self.get_metadata():
+            return None
+
+        logs = {}
+        for task_status in self._task_runs_in_state('failed', _task_run_failed):
+            failed_containers = task_status.failed_step_containers
+            if not failed_containers:
+                continue
+
+            pod = Pod(os=self.os, pod_name=task_status.pod_name,
+                      containers=failed_containers)
+            logs[task_status.pipeline_task] = pod.get_logs(tail_lines=tail_lines,
+                                                           limit_bytes=limit_bytes)
+
+        return logs
+
+    def download_logs(self, directory, compress=None, max_workers=LOG_DOWNLOAD_WORKERS):
+        """
+        Download logs of all task runs into files, one file per step container
+
+        Logs are streamed straight into files named <pipeline task>-<container>.log
+        (with .gz or .xz suffix when compressed), so memory usage does not depend on
+        the size of the logs. Task runs and their containers are processed concurrently.
+
+        :param directory: str, directory to write log files into, created if missing
+        :param compress: str, 'gzip', 'xz' or None for no compression
+        :param max_workers: int, maximum number of logs downloaded at the same time
+        :return: dict, {pipeline task name: {container: {'path': str, 'bytes': int,
+                 'lines': int}}}, bytes are counted before compression; task runs
+                 which do not exist anymore (by task run name) or have no pod yet
+                 have no containers; None if the pipeline run does not exist
+        """
+        _check_log_compression(compress)
+
+        if not self.get_metadata():
+            return None
+
+        os.makedirs(directory, exist_ok=True)
+        task_runs = [TaskRun(os=self.os, task_run_name=task_run['name'])
+                     for task_run in self.child_references]
+        manifest = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            task_infos = executor.map(
+                tracing.propagate(propagate(lambda task_run: task_run.get_info())), task_runs)
+
+            downloads = []
+            for task_run, task_info in zip(task_runs, task_infos):
+                if not task_info:
+                    logger.warning("Task run '%s' does not exist, no logs downloaded",
+                                   task_run.task_run_name)
+                    manifest[task_run.task_run_name] = {}
+                    continue
+                pipeline_task_name = (task_info['metadata'].get('labels', {})
+                                      .get('tekton.dev/pipelineTask', task_run.task_run_name))
+                manifest[pipeline_task_name] = {}
+                if not task_info.get('status', {}).get('podName'):
+                    logger.warning("Task run '%s' has no pod yet, no logs downloaded",
+                                   task_run.task_run_name)
+                    continue
+                pod = task_run.get_pod(task_info)
+                for container in pod.containers:
+                    path = pod.log_file_path(directory, container, compress,
+                                             prefix=pipeline_task_name)
+                    future = executor.submit(
+                        tracing.propagate(propagate(pod.download_container_log)),
+                        container, path, compress)
+                    downloads.append((pipeline_task_name, container, future))
+
+            for pipeline_task_name, container, future in downloads:
+                manifest[pipeline_task_name][container] = future.result()
+
+        return manifest
 
 
 class TaskRun():
-    def __init__(self, os, task_run_name):
+    def __init__(self, os, task_run_name, cache=None):
         self.os = os
         self.task_run_name = task_run_name
+        self.cache = cache
         self.api_path = 'apis'
         self.api_version = API_VERSION
 
     def get_info(self, wait=False):
         if wait:
             self.wait_for_start()
+        if self.cache is not None:
+            return self.cache.get('TaskRun', self.task_run_name, self._fetch_info,
+                                  self.get_metadata, is_final=_run_completed)
+        return self._fetch_info()
 
+    def _fetch_info(self):
         url = self.os.build_url(
             self.api_path,
             self.api_version,
@@ -870,33 +1803,94 @@ class TaskRun():
         response = self.os.get(url)
         return check_response_json(response, 'get_info')
 
-    def get_logs(self, follow=False, wait=False):
+    def get_metadata(self):
+        """
+        Get metadata (name, labels) of the task run, cheap check whether it exists
+
+        :return: dict, object with 'metadata' key; None if it does not exist
+        """
+        url = self.os.build_url(
+            self.api_path,
+            self.api_version,
+            f"taskruns/{self.task_run_name}"
+        )
+        return self.os.get_metadata(url)
+
+    def get_status(self):
+        """
+        :return: RunStatus; None if the task run does not exist
+        """
+        task_run = self.get_info()
+        return RunStatus(task_run) if task_run else None
+
+    def get_logs(self, follow=False, wait=False, tail_lines=None, limit_bytes=None,
+                 timestamps=False):
+        """
+        Get logs of task run steps, see Pod.get_logs
+        """
         if follow or wait:
             task_run = self.wait_for_start()
         else:
             task_run = self.get_info()
 
-        if not task_run and not self.get_info():
+        if not task_run and not self.get_metadata():
             return
 
+        return self.get_pod(task_run).get_logs(follow=follow, wait=wait,
+                                               tail_lines=tail_lines, limit_bytes=limit_bytes,
+                                               timestamps=timestamps)
+
+    def get_pod(self, task_run):
+        """
+        Get pod running the steps of this task run
+
+        :param task_run: dict, task run info
+        :return: Pod, with step containers
+        """
         pod_name = task_run['status']['podName']
         containers = [step['container'] for step in task_run['status']['steps']]
-        pod = Pod(os=self.os, pod_name=pod_name, containers=containers)
-        return pod.get_logs(follow=follow, wait=wait)
+        return Pod(os=self.os, pod_name=pod_name, containers=containers,
+                   started=self._pod_has_started(task_run),
+                   build_name=(task_run.get('metadata', {}).get('labels', {})
+                               .get('tekton.dev/pipelineRun')))
+
+    def download_logs(self, directory, compress=None, max_workers=LOG_DOWNLOAD_WORKERS):
+        """
+        Download logs of the task run into files, one file per step container
+
+        See PipelineRun.download_logs; file names are prefixed with the task run name.
+
+        :return: dict, {container: {'path': str, 'bytes': int, 'lines': int}}
+        """
+        pod = self.get_pod(self.get_info())
+        return pod.download_logs(directory, compress=compress, max_workers=max_workers,
+                                 prefix=self.task_run_name)
+
+    @staticmethod
+    def _pod_has_started(task_run):
+        """
+        Check if the task run pod is already running, based on the task run status
+
+        Step states mirror the states of pod containers, so once any step is running
+        or terminated, the pod has started and its logs can be streamed right away.
+        """
+        steps = task_run.get('status', {}).get('steps', [])
+        return any('running' in step or 'terminated' in step for step in steps)
 
     def wait_for_start(self):
         """
         https://tekton.dev/docs/pipelines/taskruns/#monitoring-execution-status
         """
         logger.info("Waiting for task run '%s' to start", self.task_run_name)
-        for task_run in self.os.watch_resource(
-                self.api_path,
-                self.api_version,
-                resource_type="taskruns",
-                resource_name=self.task_run_name,
-        ):
+        watch = self.os.watch_resource(
+            self.api_path,
+            self.api_version,
+            resource_type="taskruns",
+            resource_name=self.task_run_name,
+        )
+        for task_run in watch_changes(watch, _condition_projection):
             # failed because connection or timeout and task was removed
-            if not task_run and not self.get_info():
+            if not task_run and not self.get_metadata():
                 logger.info("Task run '%s' does not exist", self.task_run_name)
                 return
 
@@ -916,10 +1910,15 @@ class TaskRun():
 
 
 class Pod():
-    def __init__(self, os, pod_name, containers=None):
+    def __init__(self, os, pod_name, containers=None, started=False, build_name=None):
         self.os = os
         self.pod_name = pod_name
         self.containers = containers
+        # pipeline run the pod belongs to, for metrics
+        self.build_name = build_name or pod_name
+        # pod is known to be running already (e.g. from task run status),
+        # there is no need to watch it before streaming logs
+        self.started = started
         self.api_version = 'v1'
         self.api_path = 'api'
 
@@ -934,20 +1933,35 @@ class Pod():
         response = self.os.get(url)
         return check_response_json(response, 'get_info')
 
-    def _get_logs_no_container(self):
+    def get_metadata(self):
+        """
+        Get metadata of the pod, cheap check whether it exists
+
+        :return: dict, object with 'metadata' key; None if it does not exist
+        """
+        url = self.os.build_url(
+            self.api_path,
+            self.api_version,
+            f"pods/{self.pod_name}"
+        )
+        return self.os.get_metadata(url)
+
+    def _get_logs_no_container(self, tail_lines=None, limit_bytes=None, timestamps=False):
         url = self.os.build_url(
             self.api_path,
             self.api_version,
-            f"pods/{self.pod_name}/log"
+            f"pods/{self.pod_name}/log",
+            **_log_query(tail_lines, limit_bytes, timestamps)
         )
         r = self.os.get(url)
         check_response(r)
         return r.content.decode('utf-8')
 
-    def _get_logs(self):
+    def _get_logs(self, tail_lines=None, limit_bytes=None, timestamps=False):
         logs = {}
         for container in self.containers:
-            kwargs = {'container': container}
+            kwargs = {'container': container,
+                      **_log_query(tail_lines, limit_bytes, timestamps)}
             logger.debug("Getting log for container %s", container)
             url = self.os.build_url(
                 self.api_path,
@@ -960,25 +1974,119 @@ class Pod():
             logs[container] = r.content.decode('utf-8')
         return logs
 
-    def _get_logs_stream(self):
-        pod = self.wait_for_start()
+    def log_file_path(self, directory, container, compress=None, prefix=None):
+        _, suffix = LOG_COMPRESSION[compress]
+        return os.path.join(directory, f"{prefix or self.pod_name}-{container}.log{suffix}")
 
-        if not pod and not self.get_info():
-            return
+    def download_container_log(self, container, path, compress=None):
+        """
+        Stream log of a finished or running container into a file
+
+        :param container: str, container name
+        :param path: str, path of the log file
+        :param compress: str, 'gzip', 'xz' or None for no compression
+        :return: dict, {'path': str, 'bytes': int, 'lines': int}, bytes are counted
+                 before compression, an unterminated last line is counted too
+        """
+        opener, _ = LOG_COMPRESSION[compress]
+        url = self.os.build_url(
+            self.api_path,
+            self.api_version,
+            f"pods/{self.pod_name}/log",
+            container=container
+        )
+        logger.debug("Downloading log for container %s into %s", container, path)
+        response = self.os.get(url, stream=True)
+        check_response(response)
+
+        size = lines = 0
+        last_chunk = b''
+        with response, opener(path, 'wb') as f:
+            for chunk in response.iter_chunks():
+                if not chunk:
+                    continue
+                f.write(chunk)
+                size += len(chunk)
+                lines += chunk.count(b'\n')
+                last_chunk = chunk
+
+        if last_chunk and not last_chunk.endswith(b'\n'):
+            lines += 1
+        metrics.LOG_BYTES.inc(size, build=self.build_name)
+        metrics.LOG_LINES.inc(lines, build=self.build_name)
+        return {'path': path, 'bytes': size, 'lines': lines}
+
+    def download_logs(self, directory, compress=None, max_workers=LOG_DOWNLOAD_WORKERS,
+                      prefix=None):
+        """
+        Download logs of all containers into files, concurrently
+
+        :param directory: str, directory to write log files into, created if missing
+        :param compress: str, 'gzip', 'xz' or None for no compression
+        :param max_workers: int, maximum number of logs downloaded at the same time
+        :param prefix: str, prefix of file names, pod name by default
+        :return: dict, {container: {'path': str, 'bytes': int, 'lines': int}}
+        """
+        _check_log_compression(compress)
+        os.makedirs(directory, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                container: executor.submit(
+                    tracing.propagate(propagate(self.download_container_log)),
+                    container,
+                    self.log_file_path(directory, container, compress, prefix=prefix),
+                    compress,
+                )
+                for container in self.containers
+            }
+            return {container: future.result() for container, future in futures.items()}
+
+    def _get_logs_stream(self, decode=True, tail_lines=None, limit_bytes=None,
+                         timestamps=False):
+        if not self.started:
+            pod = self.wait_for_start()
+
+            if not pod and not self.get_metadata():
+                return
 
         for container in self.containers:
-            yield from self._stream_logs(container)
+            try:
+                yield from self._stream_logs(container, decode=decode, tail_lines=tail_lines,
+                                             limit_bytes=limit_bytes, timestamps=timestamps)
+            except OsbsResponseException as exc:
+                # existence of started pods is not checked, they may be removed already
+                if not self.started or exc.status_code != requests.codes.not_found:
+                    raise
+                logger.info("Pod '%s' does not exist", self.pod_name)
+                return
 
-    def get_logs(self, follow=False, wait=False):
+    def get_logs(self, follow=False, wait=False, decode=True, tail_lines=None,
+                 limit_bytes=None, timestamps=False):
+        """
+        Get logs of pod containers
+
+        :param follow: bool, stream logs line by line as they are produced
+        :param wait: bool, wait for the pod to start, implies streaming
+        :param decode: bool, when streaming, yield lines decoded as text; otherwise yield
+                       raw bytes lines including line endings (e.g. for writing to a file)
+        :param tail_lines: int, get only this many lines from the end of each container log
+        :param limit_bytes: int, get at most this many bytes of each container log
+        :param timestamps: bool, prefix every line with RFC3339Nano timestamp
+        """
         if follow or wait:
-            return self._get_logs_stream()
+            return self._get_logs_stream(decode=decode, tail_lines=tail_lines,
+                                         limit_bytes=limit_bytes, timestamps=timestamps)
         if self.containers:
-            return self._get_logs()
+            return self._get_logs(tail_lines=tail_lines, limit_bytes=limit_bytes,
+                                  timestamps=timestamps)
         else:
-            return self._get_logs_no_container()
+            return self._get_logs_no_container(tail_lines=tail_lines, limit_bytes=limit_bytes,
+                                               timestamps=timestamps)
 
-    def _stream_logs(self, container):
-        kwargs = {'follow': True}
+    def _stream_logs(self, container, decode=True, tail_lines=None, limit_bytes=None,
+                     timestamps=False):
+        kwargs = {'follow': True, **_log_query(tail_lines, limit_bytes, timestamps)}
         if container:
             kwargs['container'] = container
 
@@ -997,15 +2105,30 @@ class Pod():
                 f"pods/{self.pod_name}/log",
                 **kwargs
             )
+            log_span = tracing.get_tracer().start_span(
+                'stream logs', {'osbs.pipeline_run': self.build_name, 'osbs.pod': self.pod_name,
+                                'osbs.container': container}, current=False)
             try:
                 logger.debug('Streaming logs for container %s', container)
                 response = self.os.get(url, stream=True,
                                        headers={'Connection': 'close'})
                 check_response(response)
 
-                for line in response.iter_lines():
-                    connected = time.time()
-                    yield line.decode('utf-8')
+                if decode:
+                    lines = response.iter_text_lines()
+                else:
+                    lines = response.iter_lines(keepends=True)
+
+                # counted locally, updating the metric for every line is too slow
+                line_count = 0
+                try:
+                    for line in lines:
+                        connected = time.time()
+                        line_count += 1
+                        yield line
+                finally:
+                    metrics.LOG_LINES.inc(line_count, build=self.build_name)
+                    metrics.LOG_BYTES.inc(response.received_bytes, build=self.build_name)
             # NOTE1: If self.get causes ChunkedEncodingError, ConnectionError,
             # or IncompleteRead to be raised, they'll be wrapped in
             # OsbsNetworkException or OsbsException
@@ -1023,6 +2146,8 @@ class Pod():
                 pass
             except requests.exceptions.Timeout:
                 pass
+            finally:
+                tracing.get_tracer().end_span(log_span)
 
             idle = time.time() - connected
             logger.debug("Connection closed after %ds", idle)
@@ -1033,14 +2158,17 @@ class Pod():
             since = int(idle - 1)
             logger.debug("Fetching logs starting from %ds ago", since)
             kwargs['sinceSeconds'] = since
+            # lines already streamed must not be limited again
+            kwargs.pop('tailLines', None)
 
     def wait_for_start(self):
         logger.info("Waiting for pod to start '%s'", self.pod_name)
-        for pod in self.os.watch_resource(
-                self.api_path, self.api_version, resource_type="pods", resource_name=self.pod_name
-        ):
+        watch = self.os.watch_resource(
+            self.api_path, self.api_version, resource_type="pods", resource_name=self.pod_name
+        )
+        for pod in watch_changes(watch, _pod_phase_projection):
             # failed because connection or timeout and pod was removed
-            if not pod and not self.get_info():
+            if not pod and not self.get_metadata():
                 logger.info("Pod '%s' does not exist", self.pod_name)
                 return
 
@@ -0,0 +1,75 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Client-side timings of build phases, exported in build metadata
+"""
+from contextlib import contextmanager
+import threading
+import time
+
+
+class PhaseTimings(object):
+    """
+    Durations of phases of a build as seen by the client, in seconds
+
+    Phases are measured with a monotonic clock. Durations of a phase entered
+    several times add up; intervals are measured from a marked point in time.
+    """
+
+    def __init__(self):
+        self._durations = {}
+        self._marks = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Add the time spent in the block to the phase, also when it raises
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._durations[name] = self._durations.get(name, 0.0) + elapsed
+
+    def mark(self, name):
+        """
+        Remember the current time as the point intervals are measured from
+        """
+        with self._lock:
+            self._marks[name] = time.monotonic()
+
+    def record_since(self, name, mark):
+        """
+        Record time elapsed since the mark as the phase, only the first time
+
+        Nothing is recorded when the mark was not set, e.g. for pipeline runs
+        which were not created by this client.
+
+        :param name: str, name of the phase
+        :param mark: str, name of the mark
+        """
+        now = time.monotonic()
+        with self._lock:
+            if mark in self._marks and name not in self._durations:
+                self._durations[name] = now - self._marks[mark]
+
+    def get(self, name):
+        """
+        :return: float, duration of the phase; None if it was not recorded
+        """
+        with self._lock:
+            return self._durations.get(name)
+
+    def as_dict(self):
+        """
+        :return: dict, {phase: seconds}, rounded to milliseconds
+        """
+        with self._lock:
+            return {name: round(duration, 3) for name, duration in self._durations.items()}
@@ -0,0 +1,240 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Tracing spans of build submission and monitoring
+
+The client reports spans through the tracer set by set_tracer(). By default it
+is OpenTelemetryTracer when the opentelemetry API is installed, spans are then
+exported by whatever SDK the application configures (none at all when it does
+not), otherwise the no-op Tracer.
+"""
+from contextlib import contextmanager
+from functools import wraps
+import logging
+
+try:
+    from opentelemetry import context as otel_context, trace as otel_trace
+except ImportError:
+    otel_context = otel_trace = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class Span(object):
+    """
+    Span which records nothing, base class of spans of other tracers
+    """
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def record_exception(self, exception):
+        pass
+
+    def is_recording(self):
+        """
+        :return: bool, False when the span is not reported anywhere
+        """
+        return False
+
+    def end(self):
+        pass
+
+
+class Tracer(object):
+    """
+    Tracer which records nothing; implement start_span() to report spans elsewhere
+    """
+
+    def start_span(self, name, attributes=None, current=True):
+        """
+        Start a span, it has to be ended by calling its end()
+
+        :param name: str, name of the span
+        :param attributes: dict, initial attributes
+        :param current: bool, make the span the parent of spans started until
+                        it ends; must be False for spans kept open across yields
+                        of a generator, the consumer would become their child
+        :return: Span
+        """
+        return Span()
+
+    def end_span(self, span):
+        span.end()
+
+    def activate(self, span):
+        """
+        Make the span the parent of spans started until deactivate() is called
+
+        :param span: Span, started with current=False
+        :return: token to pass to deactivate()
+        """
+        return None
+
+    def deactivate(self, token):
+        pass
+
+    def propagate(self, func):
+        """
+        Make the current span the parent of spans started by func, even when
+        it runs in another thread
+        """
+        return func
+
+
+class _OpenTelemetrySpan(Span):
+    def __init__(self, span, token=None):
+        self.span = span
+        self.token = token
+        # context with the span current, created when it's activated first
+        self.context = None
+
+    def set_attribute(self, key, value):
+        if value is not None:
+            self.span.set_attribute(key, value)
+
+    def record_exception(self, exception):
+        self.span.record_exception(exception)
+        self.span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, str(exception)))
+
+    def is_recording(self):
+        return self.span.is_recording()
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    Adapter reporting spans to OpenTelemetry
+    """
+
+    def __init__(self, tracer_provider=None):
+        if otel_trace is None:
+            raise RuntimeError('opentelemetry is not installed')
+        self.tracer = otel_trace.get_tracer('osbs', tracer_provider=tracer_provider)
+
+    def start_span(self, name, attributes=None, current=True):
+        attributes = {key: value for key, value in (attributes or {}).items()
+                      if value is not None}
+        span = self.tracer.start_span(name, attributes=attributes)
+        token = None
+        if current:
+            token = otel_context.attach(otel_trace.set_span_in_context(span))
+        return _OpenTelemetrySpan(span, token)
+
+    def end_span(self, span):
+        if span.token is not None:
+            otel_context.detach(span.token)
+        span.span.end()
+
+    def activate(self, span):
+        if span.context is None:
+            span.context = otel_trace.set_span_in_context(span.span)
+        return otel_context.attach(span.context)
+
+    def deactivate(self, token):
+        otel_context.detach(token)
+
+    def propagate(self, func):
+        context = otel_context.get_current()
+
+        @wraps(func)
+        def with_context(*args, **kwargs):
+            token = otel_context.attach(context)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                otel_context.detach(token)
+
+        return with_context
+
+
+_tracer = OpenTelemetryTracer() if otel_trace is not None else Tracer()
+
+
+def set_tracer(tracer):
+    """
+    :param tracer: Tracer, None for the no-op one
+    """
+    global _tracer
+    _tracer = tracer or Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+@contextmanager
+def span(name, current=True, **attributes):
+    """
+    Trace the block as a span, exceptions raised from it are recorded
+
+    :param name: str, name of the span
+    :param current: bool, see Tracer.start_span
+    :param attributes: initial attributes, None values are left out
+    :return: Span, to set more attributes
+    """
+    tracer = _tracer
+    started = tracer.start_span(name, attributes, current=current)
+    try:
+        yield started
+    except BaseException as exc:
+        if not isinstance(exc, GeneratorExit):
+            started.record_exception(exc)
+        raise
+    finally:
+        tracer.end_span(started)
+
+
+def trace_generator(name, generator, **attributes):
+    """
+    Trace consuming the generator as a span, until it is exhausted or closed
+
+    The span starts with the first item. It is the parent of spans started
+    while producing items only, spans of the consumer are not its children.
+    Generators of log lines produce many items, items are passed through
+    untouched when the span is not recorded, e.g. without a tracing SDK.
+
+    :param name: str, name of the span
+    :param generator: generator to consume
+    :param attributes: initial attributes, None values are left out
+    """
+    tracer = _tracer
+    started = tracer.start_span(name, attributes, current=False)
+    if not started.is_recording():
+        tracer.end_span(started)
+        yield from generator
+        return
+
+    try:
+        while True:
+            token = tracer.activate(started)
+            try:
+                item = next(generator)
+            except StopIteration:
+                return
+            finally:
+                tracer.deactivate(token)
+            yield item
+    except BaseException as exc:
+        if not isinstance(exc, GeneratorExit):
+            started.record_exception(exc)
+        raise
+    finally:
+        generator.close()
+        tracer.end_span(started)
+
+
+def propagate(func):
+    """
+    Make the current span the parent of spans started by func, even when it
+    runs in another thread
+    """
+    return _tracer.propagate(func)
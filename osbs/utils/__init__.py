@@ -22,6 +22,7 @@ import time
 from collections import namedtuple
 from datetime import datetime
 from hashlib import sha256
+from osbs import metrics
 from osbs.repo_utils import RepoConfiguration, RepoInfo, AdditionalTagsConfig
 from osbs.constants import (OS_CONFLICT_MAX_RETRIES, OS_CONFLICT_WAIT,
                             GIT_MAX_RETRIES, GIT_BACKOFF_FACTOR, GIT_FETCH_RETRY,
@@ -30,10 +31,9 @@ from osbs.constants import (OS_CONFLICT_MAX_RETRIES, OS_CONFLICT_WAIT,
 # This was moved to a separate file - import here for external API compatibility
 from osbs.utils.labels import Labels  # noqa: F401
 
-from six.moves import http_client
+from http import HTTPStatus
 from six.moves.urllib.parse import urlparse
 
-from dockerfile_parse import DockerfileParser
 from osbs.exceptions import (OsbsException, OsbsResponseException,
                              OsbsValidationException, OsbsCommitNotFound, OsbsLocallyModified)
 
@@ -69,6 +69,18 @@ class RegistryURI(object):
         return self.uri
 
 
+@contextlib.contextmanager
+def _git_operation_metrics(operation):
+    started = time.monotonic()
+    try:
+        yield
+    except Exception:
+        metrics.GIT_OPERATION_FAILURES.inc(operation=operation)
+        raise
+    finally:
+        metrics.GIT_OPERATION_DURATION.observe(time.monotonic() - started, operation=operation)
+
+
 @contextlib.contextmanager
 def checkout_git_repo(git_url, target_dir=None, commit=None, retry_times=GIT_MAX_RETRIES,
                       branch=None, depth=None):
@@ -130,7 +142,8 @@ def clone_git_repo(git_url, target_dir=None, commit=None, retry_times=GIT_MAX_RE
         try:
             # we are using check_output, even though we aren't using
             # the return value, but we will get 'output' in exception
-            subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+            with _git_operation_metrics('clone'):
+                subprocess.check_output(cmd, stderr=subprocess.STDOUT)
             try:
                 repo_commit, repo_depth = reset_git_repo(target_dir, commit, depth)
             except OsbsCommitNotFound as exc:
@@ -173,7 +186,8 @@ def reset_git_repo(target_dir, git_reference, retry_depth=None):
                 base_commit_depth = int(subprocess.check_output(cmd, cwd=target_dir)) - 1
             cmd = ["git", "reset", "--hard", git_reference]
             logger.debug("Resetting current HEAD: '%s'", cmd)
-            subprocess.check_call(cmd, cwd=target_dir)
+            with _git_operation_metrics('reset'):
+                subprocess.check_call(cmd, cwd=target_dir)
             break
         except subprocess.CalledProcessError:
             if not deepen:
@@ -181,7 +195,8 @@ def reset_git_repo(target_dir, git_reference, retry_depth=None):
                                          git_reference, target_dir))
             deepen *= 2
             cmd = ["git", "fetch", "--depth", str(deepen)]
-            subprocess.check_call(cmd, cwd=target_dir)
+            with _git_operation_metrics('fetch'):
+                subprocess.check_call(cmd, cwd=target_dir)
             logger.debug("Couldn't find commit %s, increasing depth with '%s'", git_reference,
                          cmd)
     else:
@@ -207,6 +222,8 @@ def get_commit_id(repo_dir: str) -> str:
 
 
 def get_repo_info(git_uri, git_ref, git_branch=None, depth=None):
+    from dockerfile_parse import DockerfileParser
+
     with checkout_git_repo(git_uri, commit=git_ref, branch=git_branch,
                            depth=depth) as code_dir_info:
         code_dir = code_dir_info.repo_path
@@ -325,7 +342,7 @@ def retry_on_conflict(func):
     def retry(*args, **kwargs):
         # Only retry when OsbsResponseException was raised due to a conflict
         def should_retry_cb(ex):
-            return ex.status_code == http_client.CONFLICT
+            return ex.status_code == HTTPStatus.CONFLICT
 
         retry_func = RetryFunc(OsbsResponseException, should_retry_cb=should_retry_cb)
         return retry_func.go(func, *args, **kwargs)
@@ -486,30 +503,39 @@ class ImageName(object):
 
 
 class UserWarningsStore(object):
+    # (asctime (platform:arch)? - name) - levelname - message
+    regex = re.compile(r' - '.join((r'^.+', USER_WARNING_LEVEL_NAME, r'(\{.*\})$')))
+
     def __init__(self):
-        # (asctime (platform:arch)? - name) - levelname - message
-        self.regex = r' - '.join((r'^.+', USER_WARNING_LEVEL_NAME, r'(\{.*\})$'))
         self._user_warnings = set()
 
     def is_user_warning(self, line):
-        return re.match(self.regex, line)
+        if USER_WARNING_LEVEL_NAME not in line:
+            return None
+        return self.regex.match(line)
 
     def store(self, line):
         """
         Extract data from given log record with USER_WARNING level
         and store an understandable message in set
         """
-        data_search = re.search(self.regex, line)
+        data_search = self.regex.search(line)
         if not data_search:
             message = 'Incorrect given logline for storing user warnings: %s'
             logger.error(message, line)
             return
 
+        self.store_message(data_search.group(1))
+
+    def store_message(self, data):
+        """
+        Store an understandable message from JSON data of a user warning
+        """
         try:
-            data = json.loads(data_search.group(1))
+            data = json.loads(data)
         except ValueError:
             message = 'Incorrect JSON data input for a user warning: %s'
-            logger.error(message, data_search.group(1))
+            logger.error(message, data)
             return
 
         message = data['message']
@@ -0,0 +1,98 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+from collections import namedtuple
+from datetime import datetime
+import re
+
+from osbs.constants import USER_WARNING_LEVEL_NAME
+
+
+# ATOMIC_REACTOR_LOGGING_FMT, atomic-reactor appends the platform to asctime:
+# 2021-11-25 23:17:49,886 platform:x86_64 - atomic_reactor.inner - INFO - message
+LOG_LINE_REGEX = re.compile(
+    r'(?P<timestamp>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3})'
+    r'(?: platform:(?P<platform>\S+))?'
+    r' - (?P<logger>\S+)'
+    r' - (?P<level>[A-Z_]+)'
+    r' - (?P<message>.*)\Z',
+    re.DOTALL
+)
+# every formatted line contains the separator, cheap check before matching
+LOG_LINE_SEPARATOR = ' - '
+# user warnings are recognized with any prefix, like UserWarningsStore does
+USER_WARNING_SEPARATOR = f' - {USER_WARNING_LEVEL_NAME} - '
+USER_WARNING_LINE_REGEX = re.compile(
+    r'.+' + re.escape(USER_WARNING_SEPARATOR) + r'(?P<message>\{.*\})\Z',
+    re.DOTALL
+)
+LOG_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S,%f'
+
+
+class LogRecord(namedtuple('LogRecord', ['task', 'timestamp', 'platform', 'logger',
+                                         'level', 'message', 'line'])):
+    """
+    Parsed atomic-reactor log line
+
+    Lines not matching the logging format have only task, message and line set.
+    """
+    __slots__ = ()
+
+    @property
+    def time(self):
+        """
+        :return: datetime of the record, None if the line has no timestamp
+        """
+        if self.timestamp is None:
+            return None
+        return datetime.strptime(self.timestamp, LOG_TIMESTAMP_FORMAT)
+
+    @property
+    def is_user_warning(self):
+        return (self.level == USER_WARNING_LEVEL_NAME and
+                self.message.startswith('{') and self.message.endswith('}'))
+
+
+def parse_log_line(line, task=None):
+    """
+    Parse a single log line
+
+    :param line: str, log line
+    :param task: str, name of the task which produced the line
+    :return: LogRecord
+    """
+    match = LOG_LINE_SEPARATOR in line and LOG_LINE_REGEX.match(line)
+    if not match:
+        match = USER_WARNING_SEPARATOR in line and USER_WARNING_LINE_REGEX.match(line)
+        if match:
+            return LogRecord(task, None, None, None, USER_WARNING_LEVEL_NAME,
+                             match.group('message'), line)
+        return LogRecord(task, None, None, None, None, line, line)
+
+    platform = match.group('platform')
+    if platform == '-':
+        platform = None
+    return LogRecord(task, match.group('timestamp'), platform, match.group('logger'),
+                     match.group('level'), match.group('message'), line)
+
+
+def classify_logs(logs, user_warnings_store=None):
+    """
+    Parse streamed build logs into records
+
+    :param logs: iterable of (task name, line) pairs, as returned by
+                 OSBS.get_build_logs(follow=True)
+    :param user_warnings_store: UserWarningsStore, when given, user warnings are
+                                stored in it instead of being yielded
+    :return: iterator of LogRecord
+    """
+    for task, line in logs:
+        record = parse_log_line(line, task=task)
+        if user_warnings_store is not None and record.is_user_warning:
+            user_warnings_store.store_message(record.message)
+            continue
+        yield record
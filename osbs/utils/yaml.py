@@ -9,14 +9,11 @@ of the BSD license. See the LICENSE file for details.
 
 from __future__ import absolute_import, unicode_literals
 
-from pkg_resources import resource_stream
 from osbs.exceptions import OsbsValidationException
 
-import codecs
 import json
-import jsonschema
 import logging
-import yaml
+import pkgutil
 
 
 logger = logging.getLogger(__name__)
@@ -39,6 +36,8 @@ def read_yaml(yaml_data, schema, package=None):
     :param schema: string, file path to the JSON schema
     :package: string, package name containing the schema
     """
+    import yaml
+
     data = yaml.safe_load(yaml_data)
     package = package or 'osbs'
     schema = load_schema(package, schema)
@@ -53,8 +52,10 @@ def load_schema(package, schema):
     """
     # Read schema from file
     try:
-        resource = resource_stream(package, schema)
-        schema = codecs.getreader('utf-8')(resource)
+        resource = pkgutil.get_data(package, schema)
+        if resource is None:
+            # pkgutil doesn't raise when the package does not exist
+            raise ImportError(f"No package named {package}")
     except ImportError:
         logger.error('Unable to find package %s', package)
         raise
@@ -64,7 +65,7 @@ def load_schema(package, schema):
 
     # Load schema into Dict
     try:
-        schema = json.load(schema)
+        schema = json.loads(resource.decode('utf-8'))
     except ValueError:
         logger.error('unable to decode JSON schema, cannot validate')
         raise
@@ -76,6 +77,9 @@ def validate_with_schema(data, schema):
     :param data: dict, data to be validated
     :param schema: dict, schema to validate with
     """
+    # jsonschema is slow to import, only code paths validating data need it
+    import jsonschema
+
     validator = jsonschema.Draft4Validator(schema=schema)
     try:
         jsonschema.Draft4Validator.check_schema(schema)
@@ -0,0 +1,107 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Micro-benchmarks of client hot paths, see docs/development-setup.md
+"""
+import json
+import logging
+
+import pytest
+
+from osbs.constants import USER_WARNING_LEVEL_NAME
+from osbs.tekton import API_VERSION
+from tests.constants import TEST_OCP_NAMESPACE
+
+PIPELINE_RUNS = 500
+LOG_LINES = 20000
+
+
+@pytest.fixture(autouse=True)
+def quiet_logging():
+    """
+    Debug logging set up by tests/__init__.py would dominate the measurements
+    """
+    logger = logging.getLogger('osbs')
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    yield
+    logger.setLevel(level)
+
+
+def pipeline_run(number):
+    name = f'component-main-{number:05d}'
+    task_runs = ['binary-container-prebuild', 'binary-container-build',
+                 'binary-container-postbuild']
+    return {
+        'apiVersion': API_VERSION,
+        'kind': 'PipelineRun',
+        'metadata': {
+            'name': name,
+            'namespace': TEST_OCP_NAMESPACE,
+            'resourceVersion': str(1000 + number),
+            'labels': {'koji-task-id': str(number), 'user': 'bench'},
+            'annotations': {'plugins-metadata': json.dumps({
+                'durations': {f'plugin{plugin}': plugin * 0.5 for plugin in range(20)},
+                'errors': {},
+                'timestamps': {f'plugin{plugin}': '2022-01-01T00:00:00' for plugin in range(20)},
+            })},
+        },
+        'spec': {'params': [{'name': 'user-params', 'value': '{"user": "bench"}'}]},
+        'status': {
+            'conditions': [{'type': 'Succeeded', 'status': 'True', 'reason': 'Succeeded'}],
+            'childReferences': [{'kind': 'TaskRun', 'name': f'{name}-{task}',
+                                 'pipelineTaskName': task} for task in task_runs],
+            'pipelineResults': [{'name': 'repositories',
+                                 'value': '{"primary": ["registry/image:1"]}'}],
+        },
+    }
+
+
+@pytest.fixture(scope='session')
+def pipeline_run_list():
+    """
+    :return: bytes, JSON list of pipeline runs, as returned by the API
+    """
+    return json.dumps({
+        'apiVersion': API_VERSION,
+        'kind': 'PipelineRunList',
+        'metadata': {'resourceVersion': '99999'},
+        'items': [pipeline_run(number) for number in range(PIPELINE_RUNS)],
+    }).encode('utf-8')
+
+
+@pytest.fixture(scope='session')
+def watch_events():
+    """
+    :return: list of bytes, watch event lines, terminated by an expired resourceVersion
+    """
+    lines = []
+    for number in range(PIPELINE_RUNS):
+        event_type = 'BOOKMARK' if number % 10 == 9 else 'MODIFIED'
+        lines.append(json.dumps({'type': event_type, 'object': pipeline_run(number)})
+                     .encode('utf-8'))
+    lines.append(json.dumps({'type': 'ERROR', 'object': {'kind': 'Status', 'code': 410}})
+                 .encode('utf-8'))
+    return lines
+
+
+@pytest.fixture(scope='session')
+def log_lines():
+    """
+    :return: list of str, build log lines with some user warnings and non-ASCII text
+    """
+    lines = []
+    for number in range(LOG_LINES):
+        prefix = f'2022-01-01 00:00:{number % 60:02d},000 platform:x86_64 - atomic_reactor'
+        if number % 100 == 0:
+            message = json.dumps({'message': f'user warning {number % 7}'})
+            lines.append(f'{prefix} - {USER_WARNING_LEVEL_NAME} - {message}')
+        elif number % 10 == 0:
+            lines.append(f'{prefix} - INFO - stažení balíčku číslo {number} – hotovo ✓')
+        else:
+            lines.append(f'{prefix} - DEBUG - running step {number} of the build')
+    return lines
@@ -0,0 +1,70 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+import pytest
+
+from osbs.api import _load_pipeline_from_template
+from osbs.build.user_params import BuildUserParams
+from osbs.conf import Configuration
+from osbs.repo_utils import RepoInfo, RepoConfiguration
+from tests.constants import (TEST_COMPONENT, TEST_GIT_BRANCH, TEST_GIT_REF, TEST_GIT_URI,
+                             TEST_KOJI_TASK_ID, TEST_PIPELINE_RUN_TEMPLATE, TEST_USER)
+
+
+pytest.importorskip('pytest_benchmark')
+
+
+def make_params_kwargs():
+    repo_conf = RepoConfiguration(git_uri=TEST_GIT_URI, git_ref=TEST_GIT_REF,
+                                  git_branch=TEST_GIT_BRANCH)
+    return {
+        'base_image': 'registry.example.com/fedora:latest',
+        'build_conf': Configuration(build_from='image:buildroot:latest',
+                                    reactor_config_map='rcm'),
+        'component': TEST_COMPONENT,
+        'koji_target': 'target',
+        'koji_task_id': TEST_KOJI_TASK_ID,
+        'name_label': 'namespace/name',
+        'platform': 'x86_64',
+        'repo_info': RepoInfo(configuration=repo_conf),
+        'user': TEST_USER,
+        'userdata': {'custom': {'key': 'value'}},
+    }
+
+
+def test_make_params(benchmark):
+    kwargs = make_params_kwargs()
+    user_params = benchmark(BuildUserParams.make_params, **kwargs)
+    assert user_params.component == TEST_COMPONENT
+
+
+def test_user_params_to_json(benchmark):
+    user_params = BuildUserParams.make_params(**make_params_kwargs())
+    assert '"component": "component"' in benchmark(user_params.to_json)
+
+
+def test_user_params_from_json(benchmark):
+    user_params_json = BuildUserParams.make_params(**make_params_kwargs()).to_json()
+
+    def load():
+        return BuildUserParams.from_json(user_params_json)
+
+    assert benchmark(load).component == TEST_COMPONENT
+
+
+def test_load_pipeline_from_template(benchmark):
+    user_params = BuildUserParams.make_params(**make_params_kwargs())
+    substitutions = {
+        'osbs_buildtime_limit': '3600s',
+        'osbs_configmap_name': 'rcm',
+        'osbs_namespace': 'namespace',
+        'osbs_pipeline_run_name': 'component-main-12345',
+        'osbs_user_params_json': user_params.to_json(),
+    }
+    pipeline_run = benchmark(_load_pipeline_from_template, TEST_PIPELINE_RUN_TEMPLATE,
+                             substitutions)
+    assert pipeline_run['metadata']['name'] == 'component-main-12345'
@@ -0,0 +1,72 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+import http
+import json
+
+from flexmock import flexmock
+import pytest
+
+from osbs.exceptions import OsbsResponseException
+from osbs.osbs_http import HttpResponse, LineFramer
+from osbs.tekton import Openshift, API_VERSION
+from tests.constants import TEST_OCP_NAMESPACE, TEST_OCP_URL
+
+
+pytest.importorskip('pytest_benchmark')
+
+
+def test_response_json(benchmark, pipeline_run_list):
+    def parse():
+        return HttpResponse(http.client.OK, {}, pipeline_run_list).json()
+
+    assert benchmark(parse) == json.loads(pipeline_run_list)
+
+
+def test_watch_collection_events(benchmark, watch_events):
+    openshift = Openshift(openshift_api_url=TEST_OCP_URL, openshift_oauth_url=TEST_OCP_URL,
+                          use_auth=False, namespace=TEST_OCP_NAMESPACE)
+    stream = flexmock(status_code=http.client.OK)
+    stream.should_receive('iter_lines').replace_with(lambda: iter(watch_events))
+    flexmock(openshift).should_receive('get').and_return(stream)
+
+    def watch():
+        events = []
+        with pytest.raises(OsbsResponseException):
+            for event in openshift.watch_collection('apis', API_VERSION, 'pipelineruns', '1'):
+                events.append(event)
+        return events
+
+    # neither bookmarks nor the final error are reported
+    bookmarks = sum(b'"BOOKMARK"' in line for line in watch_events)
+    assert len(benchmark(watch)) == len(watch_events) - bookmarks - 1
+
+
+def _log_chunks(log_lines, size):
+    data = ''.join(f'{line}\n' for line in log_lines).encode('utf-8')
+    # chunk boundaries split lines and multibyte characters
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize('chunk_size', [1024, 64 * 1024])
+def test_log_framing(benchmark, log_lines, chunk_size):
+    chunks = _log_chunks(log_lines, chunk_size)
+
+    def frame():
+        return list(LineFramer(iter(chunks)).iter_lines())
+
+    assert len(benchmark(frame)) == len(log_lines)
+
+
+@pytest.mark.parametrize('chunk_size', [1024, 64 * 1024])
+def test_log_text_lines(benchmark, log_lines, chunk_size):
+    chunks = _log_chunks(log_lines, chunk_size)
+
+    def decode():
+        return list(LineFramer(iter(chunks)).iter_text_lines())
+
+    assert benchmark(decode) == log_lines
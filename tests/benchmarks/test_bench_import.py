@@ -0,0 +1,47 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+pytest.importorskip('pytest_benchmark')
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def import_time(module):
+    """
+    Import the module in a new interpreter with -X importtime
+
+    :return: int, cumulative import time of the module in microseconds
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, check=True, stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    cumulative = None
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            cumulative = int(fields[1])
+    assert cumulative is not None, f"{module} is missing in -X importtime output"
+    return cumulative
+
+
+@pytest.mark.parametrize('module', ['osbs', 'osbs.cli.main', 'osbs.api'])
+def test_import_time(benchmark, module):
+    """
+    Wall time includes interpreter startup, the import time of the module
+    alone is in extra_info of the saved results
+    """
+    times = []
+    benchmark.pedantic(lambda: times.append(import_time(module)), rounds=5, iterations=1)
+    benchmark.extra_info['importtime_us'] = min(times)
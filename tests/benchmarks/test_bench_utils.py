@@ -0,0 +1,87 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+from textwrap import dedent
+
+import pytest
+
+from osbs.utils import UserWarningsStore, make_name_from_git, sanitize_strings_for_openshift
+from osbs.utils.yaml import read_yaml
+
+
+pytest.importorskip('pytest_benchmark')
+
+
+CONTAINER_YAML = dedent("""\
+    platforms:
+      only: [x86_64, aarch64, ppc64le, s390x]
+      not: [i686]
+    compose:
+      packages: [bash, coreutils, python3]
+      pulp_repos: true
+      modules:
+        - nodejs:12
+        - perl:5.30:8030020200313080146
+      signing_intent: release
+      inherit: true
+    autorebuild:
+      from_latest: true
+      add_timestamp_to_release: true
+    buildtime_limit: 7200
+    tags: [latest, '{version}', '{version}-{release}']
+    version: 1
+    remote_sources_version: 2
+    remote_sources:
+      - name: backend
+        remote_source:
+          repo: https://git.example.com/team/backend.git
+          ref: b55c00f45ec3dfee0c766cea3d395d6e21cc2e5a
+          pkg_managers: [gomod]
+          flags: [gomod-vendor]
+      - name: frontend
+        remote_source:
+          repo: https://git.example.com/team/frontend.git
+          ref: b55c00f45ec3dfee0c766cea3d395d6e21cc2e5a
+          pkg_managers: [npm]
+          packages:
+            npm:
+              - path: client
+    """)
+
+
+def test_user_warnings_store(benchmark, log_lines):
+    def classify():
+        store = UserWarningsStore()
+        for line in log_lines:
+            if store.is_user_warning(line):
+                store.store(line)
+        return store
+
+    assert len(benchmark(classify)) == 7
+
+
+@pytest.mark.parametrize(('repo', 'branch'), [
+    ('https://git.example.com/containers/component.git', 'main'),
+    ('https://git.example.com/a/very/long/path/to/some-container-image-with-a-long-name.git',
+     'rhel-8.6.0-z-stream-feature-branch-with-a-long-name'),
+])
+def test_make_name_from_git(benchmark, repo, branch):
+    name = benchmark(make_name_from_git, repo, branch)
+    assert name.split('-')[0] in repo
+
+
+def test_sanitize_strings_for_openshift(benchmark):
+    def sanitize():
+        return sanitize_strings_for_openshift('Registry.Example.COM/namespace/repo_name',
+                                              'Feature/Branch_Name' * 4)
+
+    assert len(benchmark(sanitize)) <= 63
+
+
+def test_read_yaml_container(benchmark):
+    data = benchmark(read_yaml, CONTAINER_YAML, 'schemas/container.json')
+    assert len(data['remote_sources']) == 2
@@ -7,6 +7,8 @@ of the BSD license. See the LICENSE file for details.
 """
 import json
 import os
+import subprocess
+import sys
 import time
 from textwrap import dedent
 
@@ -14,7 +16,7 @@ from flexmock import flexmock
 import pytest
 
 from osbs.cli.main import print_output
-from osbs.tekton import PipelineRun
+from osbs.tekton import BuildReport, PipelineRun
 
 
 def test_print_output(tmpdir, capsys):
@@ -23,6 +25,7 @@ def test_print_output(tmpdir, capsys):
     Tests:
       * if STDOUT is correct
       * if JSON exported metadata are correct
+      * if client and task timings are exported
     """
     test_metadata = {
             'status': {
@@ -34,12 +37,26 @@ def test_print_output(tmpdir, capsys):
             'metadata': {}
         }
     flexmock(time).should_receive('sleep').and_return(None)
+    task_times = {
+        'binary-container-prebuild': {'start_time': '2021-11-25T23:17:40Z',
+                                      'completion_time': '2021-11-25T23:17:55Z'},
+        'binary-container-build': {'start_time': '2021-11-25T23:17:56Z',
+                                   'completion_time': None},
+    }
     ppln_run = flexmock(PipelineRun(flexmock(), 'test_ppln'))
+    # as if the pipeline run was created by this client
+    ppln_run.timings.mark('created')
     (ppln_run
-     .should_receive('get_info')
-     .and_return(test_metadata))
-    ppln_run.should_receive('has_succeeded').and_return(True)
-    ppln_run.should_receive('status_reason').and_return('complete')
+     .should_receive('build_report')
+     .and_return(BuildReport(
+         name='test_ppln', info=test_metadata, status='True', reason='complete',
+         succeeded=True, cancelled=False, finished=True, any_task_failed=False,
+         any_task_cancelled=False, error_message=None, final_platforms=None,
+         task_results={}, pipeline_results={'repositories': json.loads(
+             test_metadata['status']['pipelineResults'][0]['value'])},
+         task_times=task_times,
+     ))
+     .once())
     ppln_run.should_receive('has_not_finished').and_return(False)
 
     log_entries = [
@@ -96,7 +113,12 @@ def test_print_output(tmpdir, capsys):
 
     with open(export_metadata_file, 'r') as f:
         metadata = json.load(f)
+    timings = metadata.pop('timings')
     assert metadata == expected_metadata
+    assert timings['tasks'] == task_times
+    assert set(timings['client']) == {'time_to_first_log_line', 'log_streaming',
+                                      'wait_for_finish', 'post_mortem'}
+    assert all(duration >= 0 for duration in timings['client'].values())
 
 
 @pytest.mark.parametrize('get_logs_failed', [True, False])
@@ -110,9 +132,15 @@ def test_print_output_failure(tmpdir, capsys, get_logs_failed, build_not_finishe
     """
     flexmock(time).should_receive('sleep').and_return(None)
     ppln_run = flexmock(PipelineRun(flexmock(), 'test_ppln'))
-    ppln_run.should_receive('has_succeeded').and_return(False)
-    ppln_run.should_receive('status_reason').and_return('failed')
-    ppln_run.should_receive('get_error_message').and_return('Build failed ...')
+    (ppln_run
+     .should_receive('build_report')
+     .and_return(BuildReport(
+         name='test_ppln', info={}, status='False', reason='failed',
+         succeeded=False, cancelled=False, finished=True, any_task_failed=True,
+         any_task_cancelled=False, error_message='Build failed ...', final_platforms=None,
+         task_results={}, pipeline_results={}, task_times={},
+     ))
+     .once())
 
     log_entries = [
         '2021-11-25 23:17:49,886 platform:- - atomic_reactor.inner - INFO - YOLO 1',
@@ -168,4 +196,23 @@ def test_print_output_failure(tmpdir, capsys, get_logs_failed, build_not_finishe
 
     with open(export_metadata_file, 'r') as f:
         metadata = json.load(f)
+    timings = metadata.pop('timings')
     assert metadata == expected_metadata
+    assert timings['tasks'] == {}
+    # not created by this client, no time to the first log line
+    assert set(timings['client']) == {'log_streaming', 'wait_for_finish', 'post_mortem'}
+
+
+def test_cli_import_defers_heavy_modules():
+    """Test that importing the CLI doesn't import modules only some commands need
+
+    Imported in a new interpreter, modules imported by other tests are there already.
+    """
+    heavy = ['pkg_resources', 'jsonschema', 'dockerfile_parse', 'yaml', 'requests',
+             'requests_kerberos']
+    code = ('import sys, osbs.cli.main; '
+            f'print(",".join(m for m in {heavy!r} if m in sys.modules))')
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=root,
+                                     universal_newlines=True)
+    assert output.strip() == ''
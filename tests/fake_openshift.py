@@ -0,0 +1,837 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Fake Tekton and Kubernetes API server
+
+Implements the PipelineRun, TaskRun and Pod endpoints used by osbs.tekton,
+including chunked watch streams, followed log streams, resourceVersion
+semantics, pagination and metadata-only responses. Created pipeline runs go
+through a simulated lifecycle (task runs, pods, step logs), so the client can
+be exercised end to end, and under load, without a cluster.
+
+    with FakeOpenshift(lifecycle=PipelineLifecycle(task_duration=0.1)) as server:
+        os = Openshift(server.url, server.url + 'oauth/authorize', use_auth=False)
+"""
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+import copy
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+
+try:
+    from http.server import ThreadingHTTPServer
+except ImportError:
+    # Python < 3.7
+    class ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+
+
+NAMESPACE = 'default'
+RESOURCE_KINDS = {
+    'pipelineruns': ('tekton.dev/v1beta1', 'PipelineRun'),
+    'taskruns': ('tekton.dev/v1beta1', 'TaskRun'),
+    'pods': ('v1', 'Pod'),
+}
+# number of watch events kept, older resource versions are answered with 410 Gone
+EVENT_HISTORY = 1000
+
+_RESOURCE_RE = re.compile(
+    r'^/(?P<api>apis/tekton\.dev/v1beta1|api/v1)/'
+    r'(?P<watch>watch/)?namespaces/(?P<namespace>[^/]+)/'
+    r'(?P<resource_type>pipelineruns|taskruns|pods)'
+    r'(?:/(?P<name>[^/]+))?(?P<log>/log)?/?$'
+)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _timestamp(when):
+    return when.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _nano_timestamp(when):
+    return when.strftime('%Y-%m-%dT%H:%M:%S.%f000Z')
+
+
+def _matches_labels(obj, label_selector):
+    if not label_selector:
+        return True
+    labels = obj['metadata'].get('labels') or {}
+    for requirement in label_selector.split(','):
+        key, _, value = requirement.partition('=')
+        if labels.get(key) != value:
+            return False
+    return True
+
+
+def _matches_fields(obj, field_selector):
+    if not field_selector:
+        return True
+    for requirement in field_selector.split(','):
+        key, _, value = requirement.partition('=')
+        if key == 'metadata.name' and obj['metadata']['name'] != value:
+            return False
+    return True
+
+
+def _metadata_only(obj):
+    return {
+        'apiVersion': 'meta.k8s.io/v1',
+        'kind': 'PartialObjectMetadata',
+        'metadata': copy.deepcopy(obj['metadata']),
+    }
+
+
+class PipelineLifecycle(object):
+    """
+    Simulated lifecycle of created pipeline runs
+
+    Tasks run one after another, or all at the same time with parallel_tasks,
+    in a single pod each; every step writes log_lines lines evenly over
+    task_duration seconds.
+    """
+
+    def __init__(self, tasks=('binary-container-prebuild', 'binary-container-build',
+                              'binary-container-exit'),
+                 steps=('step-run',), start_delay=0.0, pod_start_delay=0.0,
+                 task_duration=0.1, log_lines=10, fail_task=None, pipeline_results=None,
+                 task_results=None, parallel_tasks=False):
+        """
+        :param tasks: sequence of str, pipeline task names
+        :param steps: sequence of str, step container names of every task
+        :param start_delay: float, seconds before the pipeline run starts running
+        :param pod_start_delay: float, seconds a task pod is pending
+        :param task_duration: float, seconds each task runs
+        :param log_lines: int, number of log lines written by each step
+        :param fail_task: str, task which fails, its last step exits with 1
+        :param pipeline_results: dict, {name: str value} set on success
+        :param task_results: dict, {task name: {name: str value}}
+        :param parallel_tasks: bool, run all tasks at the same time, like tasks
+                               of a pipeline which don't depend on each other
+        """
+        self.tasks = tuple(tasks)
+        self.steps = tuple(steps)
+        self.start_delay = start_delay
+        self.pod_start_delay = pod_start_delay
+        self.task_duration = task_duration
+        self.log_lines = log_lines
+        self.fail_task = fail_task
+        self.pipeline_results = pipeline_results or {}
+        self.task_results = task_results or {}
+        self.parallel_tasks = parallel_tasks
+
+
+class _ContainerLog(object):
+    __slots__ = ('lines', 'finished')
+
+    def __init__(self):
+        # (datetime, bytes line including newline)
+        self.lines = []
+        self.finished = False
+
+
+class _Fault(object):
+    __slots__ = ('method', 'path_re', 'status', 'count')
+
+    def __init__(self, method, path_re, status, count):
+        self.method = method
+        self.path_re = path_re
+        self.status = status
+        self.count = count
+
+
+class FakeOpenshift(object):
+    """
+    In-process HTTP server faking the Tekton and Kubernetes API
+
+    :ivar requests: Counter of (method, endpoint) handled, endpoint is e.g.
+                    'pipelineruns', 'pipelineruns/name', 'pods/name/log',
+                    watches are counted with method 'WATCH'
+    """
+
+    def __init__(self, lifecycle=None, latency=0.0, fault_rate=0.0,
+                 bookmark_interval=None, event_history=EVENT_HISTORY, host='127.0.0.1',
+                 port=0):
+        """
+        :param lifecycle: PipelineLifecycle of created pipeline runs
+        :param latency: float, seconds added before every response
+        :param fault_rate: float, probability of answering a request with 500
+        :param bookmark_interval: float, send BOOKMARK events to idle watches this often
+        :param event_history: int, number of watch events kept for resuming watches
+        """
+        self.lifecycle = lifecycle or PipelineLifecycle()
+        self.latency = latency
+        self.fault_rate = fault_rate
+        self.bookmark_interval = bookmark_interval
+        self.requests = Counter()
+
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._resource_version = 0
+        self._objects = {resource_type: {} for resource_type in RESOURCE_KINDS}
+        self._events = deque(maxlen=event_history)
+        self._logs = {}
+        self._cancelled = set()
+        self._faults = []
+        self._stopping = False
+        self._lifecycle_threads = []
+
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+        for thread in self._lifecycle_threads:
+            thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def inject_fault(self, path_pattern, status=500, count=1, method=None):
+        """
+        Fail the next count requests to paths matching path_pattern
+
+        :param path_pattern: str, regex searched in the request path
+        :param status: int, response status; None closes the connection
+                       without any response
+        :param count: int, number of requests to fail
+        :param method: str, fail only requests with this method, e.g. 'GET'
+        """
+        with self._lock:
+            self._faults.append(_Fault(method, re.compile(path_pattern), status, count))
+
+    # objects
+
+    def get_object(self, resource_type, name):
+        with self._lock:
+            obj = self._objects[resource_type].get(name)
+            return copy.deepcopy(obj)
+
+    def wait_for_pipeline_runs(self, timeout=None):
+        """
+        Wait until lifecycles of all created pipeline runs finish
+        """
+        for thread in list(self._lifecycle_threads):
+            thread.join(timeout)
+
+    @property
+    def resource_version(self):
+        with self._lock:
+            return str(self._resource_version)
+
+    def _emit(self, event_type, resource_type, obj):
+        # caller holds the lock
+        self._resource_version += 1
+        obj['metadata']['resourceVersion'] = str(self._resource_version)
+        if event_type == 'DELETED':
+            self._objects[resource_type].pop(obj['metadata']['name'], None)
+        else:
+            self._objects[resource_type][obj['metadata']['name']] = obj
+        self._events.append((self._resource_version, resource_type, event_type,
+                             copy.deepcopy(obj)))
+        self._changed.notify_all()
+
+    def _new_object(self, resource_type, name, labels=None, spec=None):
+        api_version, kind = RESOURCE_KINDS[resource_type]
+        return {
+            'apiVersion': api_version,
+            'kind': kind,
+            'metadata': {
+                'name': name,
+                'namespace': NAMESPACE,
+                'labels': dict(labels or {}),
+                'creationTimestamp': _timestamp(_now()),
+            },
+            'spec': spec or {},
+            'status': {},
+        }
+
+    def _update(self, resource_type, name, update):
+        """
+        Apply update(obj) to a copy of the object and emit MODIFIED event
+
+        :return: bool, False if the object does not exist anymore
+        """
+        with self._lock:
+            obj = self._objects[resource_type].get(name)
+            if obj is None:
+                return False
+            obj = copy.deepcopy(obj)
+            update(obj)
+            self._emit('MODIFIED', resource_type, obj)
+            return True
+
+    def _delete(self, resource_type, name):
+        with self._lock:
+            obj = self._objects[resource_type].get(name)
+            if obj is None:
+                return None
+            self._emit('DELETED', resource_type, copy.deepcopy(obj))
+            if resource_type == 'pipelineruns':
+                self._cancelled.add(name)
+                self._changed.notify_all()
+            return obj
+
+    def create_pipeline_run(self, pipeline_run):
+        """
+        Create pipeline run and start its simulated lifecycle
+
+        :return: dict, created object; None if it already exists
+        """
+        name = pipeline_run['metadata']['name']
+        with self._lock:
+            if name in self._objects['pipelineruns']:
+                return None
+            obj = self._new_object('pipelineruns', name,
+                                   labels=pipeline_run['metadata'].get('labels'),
+                                   spec=pipeline_run.get('spec'))
+            self._emit('ADDED', 'pipelineruns', obj)
+            thread = threading.Thread(target=self._run_pipeline, args=(name, self.lifecycle),
+                                      daemon=True)
+            self._lifecycle_threads.append(thread)
+        thread.start()
+        return copy.deepcopy(obj)
+
+    def cancel_pipeline_run(self, name):
+        with self._lock:
+            if name not in self._objects['pipelineruns']:
+                return None
+            self._cancelled.add(name)
+            self._update('pipelineruns', name,
+                         lambda obj: obj['spec'].update(status='CancelledRunFinally'))
+            return copy.deepcopy(self._objects['pipelineruns'][name])
+
+    # lifecycle simulation
+
+    def _sleep(self, name, seconds):
+        """
+        Sleep unless the pipeline run is cancelled or the server stops
+
+        :return: bool, True when the pipeline run should stop
+        """
+        deadline = time.monotonic() + seconds
+        with self._changed:
+            while True:
+                if self._stopping or name in self._cancelled:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+
+    def _run_pipeline(self, name, lifecycle):
+        def set_condition(status, reason, message=None, finished=False):
+            def update(obj):
+                condition = {'type': 'Succeeded', 'status': status, 'reason': reason}
+                if message:
+                    condition['message'] = message
+                obj['status']['conditions'] = [condition]
+                obj['status'].setdefault('startTime', _timestamp(_now()))
+                if finished:
+                    obj['status']['completionTime'] = _timestamp(_now())
+            return update
+
+        if self._sleep(name, lifecycle.start_delay):
+            self._finish_cancelled(name)
+            return
+        self._update('pipelineruns', name, set_condition('Unknown', 'Running'))
+
+        failed_task = self._run_tasks(name, lifecycle)
+        if failed_task:
+            if name in self._cancelled:
+                self._finish_cancelled(name)
+            else:
+                self._update('pipelineruns', name,
+                             set_condition('False', 'Failed', f'Task {failed_task} failed',
+                                           finished=True))
+            return
+
+        def succeed(obj):
+            set_condition('True', 'Succeeded', finished=True)(obj)
+            obj['status']['pipelineResults'] = [
+                {'name': result_name, 'value': value}
+                for result_name, value in lifecycle.pipeline_results.items()
+            ]
+        self._update('pipelineruns', name, succeed)
+
+    def _run_tasks(self, name, lifecycle):
+        """
+        :return: str, first task which didn't succeed, None if all succeeded
+        """
+        if not lifecycle.parallel_tasks:
+            for task in lifecycle.tasks:
+                if not self._run_task(name, task, lifecycle):
+                    return task
+            return None
+
+        succeeded = {}
+
+        def run(task):
+            succeeded[task] = self._run_task(name, task, lifecycle)
+
+        threads = [threading.Thread(target=run, args=(task,), daemon=True)
+                   for task in lifecycle.tasks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return next((task for task in lifecycle.tasks if not succeeded.get(task)), None)
+
+    def _finish_cancelled(self, name):
+        def update(obj):
+            obj['status']['conditions'] = [{'type': 'Succeeded', 'status': 'False',
+                                            'reason': 'PipelineRunCancelled'}]
+            obj['status']['completionTime'] = _timestamp(_now())
+        self._update('pipelineruns', name, update)
+
+    def _run_task(self, pipeline_run_name, task, lifecycle):
+        """
+        :return: bool, True if the task succeeded
+        """
+        task_run_name = f'{pipeline_run_name}-{task}'
+        pod_name = f'{task_run_name}-pod'
+        labels = {'tekton.dev/pipelineRun': pipeline_run_name,
+                  'tekton.dev/pipelineTask': task}
+        failed = task == lifecycle.fail_task
+
+        with self._lock:
+            task_run = self._new_object('taskruns', task_run_name, labels=labels)
+            task_run['status'] = {
+                'podName': pod_name,
+                'startTime': _timestamp(_now()),
+                'conditions': [{'type': 'Succeeded', 'status': 'Unknown',
+                                'reason': 'Pending'}],
+                'steps': [{'container': step, 'waiting': {}} for step in lifecycle.steps],
+            }
+            self._emit('ADDED', 'taskruns', task_run)
+            pod = self._new_object('pods', pod_name, labels=labels)
+            pod['status'] = {'phase': 'Pending'}
+            self._emit('ADDED', 'pods', pod)
+            for step in lifecycle.steps:
+                self._logs[(pod_name, step)] = _ContainerLog()
+
+            def add_child(obj):
+                obj['status'].setdefault('childReferences', []).append(
+                    {'apiVersion': 'tekton.dev/v1beta1', 'kind': 'TaskRun',
+                     'name': task_run_name, 'pipelineTaskName': task})
+            self._update('pipelineruns', pipeline_run_name, add_child)
+
+        stopped = self._sleep(pipeline_run_name, lifecycle.pod_start_delay)
+
+        if not stopped:
+            self._update('pods', pod_name, lambda obj: obj['status'].update(phase='Running'))
+
+            def running(obj):
+                obj['status']['conditions'] = [{'type': 'Succeeded', 'status': 'Unknown',
+                                                'reason': 'Running'}]
+                obj['status']['steps'] = [{'container': step, 'running': {}}
+                                          for step in lifecycle.steps]
+            self._update('taskruns', task_run_name, running)
+
+            lines = lifecycle.log_lines * len(lifecycle.steps)
+            interval = lifecycle.task_duration / lines if lines else lifecycle.task_duration
+            for step in lifecycle.steps:
+                for number in range(lifecycle.log_lines):
+                    if self._sleep(pipeline_run_name, interval):
+                        stopped = True
+                        break
+                    self._write_log(pod_name, step,
+                                    f'{_now():%Y-%m-%d %H:%M:%S,%f}'[:-3] +
+                                    f' platform:- - atomic_reactor.{task} - INFO - '
+                                    f'{step} line {number + 1}')
+                if stopped:
+                    break
+            if not lines:
+                stopped = self._sleep(pipeline_run_name, interval)
+
+        cancelled = stopped and pipeline_run_name in self._cancelled
+        with self._lock:
+            for step in lifecycle.steps:
+                self._logs[(pod_name, step)].finished = True
+
+            def terminated(obj):
+                steps = []
+                for index, step in enumerate(lifecycle.steps):
+                    exit_code = 1 if (failed and index == len(lifecycle.steps) - 1) else 0
+                    steps.append({'container': step,
+                                  'terminated': {'exitCode': exit_code, 'reason': 'Completed'}})
+                obj['status']['steps'] = steps
+                obj['status']['completionTime'] = _timestamp(_now())
+                if cancelled:
+                    condition = {'status': 'False', 'reason': 'TaskRunCancelled',
+                                 'message': 'TaskRun was cancelled'}
+                elif failed:
+                    condition = {'status': 'False', 'reason': 'Failed',
+                                 'message': f'{task} failed'}
+                else:
+                    condition = {'status': 'True', 'reason': 'Succeeded'}
+                    # like Tekton, taskResults are omitted when there are none
+                    if lifecycle.task_results.get(task):
+                        obj['status']['taskResults'] = [
+                            {'name': result_name, 'value': value}
+                            for result_name, value in lifecycle.task_results[task].items()
+                        ]
+                obj['status']['conditions'] = [{'type': 'Succeeded', **condition}]
+            self._update('taskruns', task_run_name, terminated)
+            phase = 'Failed' if (failed or cancelled) else 'Succeeded'
+            self._update('pods', pod_name, lambda obj: obj['status'].update(phase=phase))
+
+        return not (failed or stopped)
+
+    def _write_log(self, pod_name, container, line):
+        with self._changed:
+            self._logs[(pod_name, container)].lines.append((_now(), line.encode() + b'\n'))
+            self._changed.notify_all()
+
+    # request handling helpers
+
+    def _take_fault(self, method, path):
+        with self._lock:
+            for fault in self._faults:
+                if fault.count <= 0:
+                    continue
+                if fault.method and fault.method != method:
+                    continue
+                if fault.path_re.search(path):
+                    fault.count -= 1
+                    return fault
+        if self.fault_rate and random.random() < self.fault_rate:
+            return _Fault(method, None, 500, 1)
+        return None
+
+    def _list(self, resource_type, query, metadata_only):
+        label_selector = query.get('labelSelector')
+        field_selector = query.get('fieldSelector')
+        limit = int(query.get('limit') or 0)
+        start = int(query.get('continue') or 0)
+        with self._lock:
+            objects = [obj for _, obj in sorted(self._objects[resource_type].items())
+                       if _matches_labels(obj, label_selector) and
+                       _matches_fields(obj, field_selector)]
+            resource_version = str(self._resource_version)
+        end = start + limit if limit else len(objects)
+        items = objects[start:end]
+        metadata = {'resourceVersion': resource_version}
+        if end < len(objects):
+            metadata['continue'] = str(end)
+        if metadata_only:
+            return {'apiVersion': 'meta.k8s.io/v1', 'kind': 'PartialObjectMetadataList',
+                    'metadata': metadata, 'items': [_metadata_only(obj) for obj in items]}
+        _, kind = RESOURCE_KINDS[resource_type]
+        return {'apiVersion': RESOURCE_KINDS[resource_type][0], 'kind': f'{kind}List',
+                'metadata': metadata, 'items': copy.deepcopy(items)}
+
+    def _watch_events(self, resource_type, name, query):
+        """
+        Generate watch events as JSON-serializable dicts until timeout
+        """
+        label_selector = query.get('labelSelector')
+        timeout = float(query.get('timeoutSeconds') or 0) or None
+        bookmarks = query.get('allowWatchBookmarks') == 'true' and self.bookmark_interval
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def matches(obj):
+            if name is not None and obj['metadata']['name'] != name:
+                return False
+            return _matches_labels(obj, label_selector)
+
+        with self._lock:
+            resource_version = query.get('resourceVersion')
+            if resource_version in (None, '', '0'):
+                # like the API server, start with the current state
+                initial = [copy.deepcopy(obj) for obj in self._objects[resource_type].values()
+                           if matches(obj)]
+                last_seen = self._resource_version
+            else:
+                last_seen = int(resource_version)
+                oldest = self._events[0][0] if self._events else self._resource_version + 1
+                if last_seen < oldest - 1 and last_seen < self._resource_version:
+                    yield {'type': 'ERROR', 'object': {
+                        'kind': 'Status', 'apiVersion': 'v1', 'status': 'Failure',
+                        'message': f'too old resource version: {last_seen}',
+                        'reason': 'Expired', 'code': 410}}
+                    return
+                initial = []
+
+        for obj in initial:
+            yield {'type': 'ADDED', 'object': obj}
+
+        last_event = time.monotonic()
+        while True:
+            with self._changed:
+                pending = [(version, event_type, obj)
+                           for version, event_resource_type, event_type, obj in self._events
+                           if version > last_seen and event_resource_type == resource_type]
+                if not pending:
+                    if self._stopping:
+                        return
+                    now = time.monotonic()
+                    wait = None if deadline is None else deadline - now
+                    if wait is not None and wait <= 0:
+                        return
+                    if bookmarks:
+                        until_bookmark = last_event + self.bookmark_interval - now
+                        if until_bookmark <= 0:
+                            pending = None
+                        else:
+                            wait = until_bookmark if wait is None else min(wait, until_bookmark)
+                    if pending is not None:
+                        self._changed.wait(wait)
+                        continue
+                else:
+                    last_seen = pending[-1][0]
+
+            if pending is None:
+                last_event = time.monotonic()
+                yield {'type': 'BOOKMARK', 'object': {
+                    'kind': RESOURCE_KINDS[resource_type][1],
+                    'metadata': {'resourceVersion': str(last_seen)}}}
+                continue
+
+            for _, event_type, obj in pending:
+                if matches(obj):
+                    last_event = time.monotonic()
+                    yield {'type': event_type, 'object': copy.deepcopy(obj)}
+
+    def _log_lines(self, pod_name, container, query):
+        """
+        Generate log lines (bytes) of a container, following it if requested
+        """
+        follow = query.get('follow') in ('true', 'True', '1')
+        timestamps = query.get('timestamps') in ('true', 'True', '1')
+        tail_lines = query.get('tailLines')
+        since_seconds = query.get('sinceSeconds')
+        limit_bytes = query.get('limitBytes')
+        limit_bytes = int(limit_bytes) if limit_bytes is not None else None
+
+        with self._lock:
+            log = self._logs.get((pod_name, container))
+            if log is None:
+                return
+            lines = list(log.lines)
+            position = len(lines)
+        if since_seconds is not None:
+            since = _now() - timedelta(seconds=int(since_seconds))
+            lines = [(when, line) for when, line in lines if when >= since]
+        if tail_lines is not None:
+            lines = lines[-int(tail_lines):] if int(tail_lines) else []
+
+        sent = 0
+        while True:
+            for when, line in lines:
+                if timestamps:
+                    line = _nano_timestamp(when).encode() + b' ' + line
+                if limit_bytes is not None:
+                    line = line[:limit_bytes - sent]
+                    if not line:
+                        return
+                sent += len(line)
+                yield line
+            if not follow:
+                return
+            with self._changed:
+                while position == len(log.lines) and not log.finished and not self._stopping:
+                    self._changed.wait()
+                lines = log.lines[position:]
+                position = len(log.lines)
+                if not lines:
+                    return
+
+
+def _make_handler(server):
+    class Handler(_FakeOpenshiftHandler):
+        fake = server
+    return Handler
+
+
+class _FakeOpenshiftHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    fake = None
+
+    def log_message(self, *args):
+        # keep test output clean
+        pass
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _handle(self, method):
+        split = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(split.query).items()}
+        body = self._read_body()
+
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+
+        match = _RESOURCE_RE.match(split.path)
+        if not match or match.group('namespace') != NAMESPACE:
+            self._send_json(404, self._status(404, 'NotFound', f'{split.path} not found'))
+            return
+
+        resource_type = match.group('resource_type')
+        name = match.group('name')
+        watch = match.group('watch')
+        log = match.group('log')
+        endpoint = resource_type
+        if name:
+            endpoint += '/name'
+        if log:
+            endpoint += '/log'
+        self.fake.requests[('WATCH' if watch else method, endpoint)] += 1
+
+        fault = self.fake._take_fault(method, split.path)
+        if fault is not None:
+            if fault.status is None:
+                self.close_connection = True
+                self.connection.shutdown(2)
+                return
+            self._send_json(fault.status,
+                            self._status(fault.status, 'InternalError', 'injected fault'))
+            return
+
+        if watch:
+            if method != 'GET' or log:
+                self._send_json(405, self._status(405, 'MethodNotAllowed', method))
+                return
+            self._send_stream(json.dumps(event).encode() + b'\n' for event
+                              in self.fake._watch_events(resource_type, name, query))
+        elif log:
+            if method != 'GET' or resource_type != 'pods':
+                self._send_json(405, self._status(405, 'MethodNotAllowed', method))
+                return
+            self._get_log(name, query)
+        elif name:
+            self._handle_object(method, resource_type, name, body)
+        else:
+            self._handle_collection(method, resource_type, query, body)
+
+    def _handle_object(self, method, resource_type, name, body):
+        if method == 'GET':
+            obj = self.fake.get_object(resource_type, name)
+            if obj is not None and self._metadata_only():
+                obj = _metadata_only(obj)
+        elif method == 'PATCH' and resource_type == 'pipelineruns':
+            patch = json.loads(body or b'{}')
+            if patch.get('spec', {}).get('status', '').startswith('Cancelled'):
+                obj = self.fake.cancel_pipeline_run(name)
+            else:
+                obj = self.fake.get_object(resource_type, name)
+        elif method == 'DELETE':
+            obj = self.fake._delete(resource_type, name)
+        else:
+            self._send_json(405, self._status(405, 'MethodNotAllowed', method))
+            return
+
+        if obj is None:
+            self._send_json(404, self._status(404, 'NotFound',
+                                              f'{resource_type} "{name}" not found'))
+        else:
+            self._send_json(200, obj)
+
+    def _handle_collection(self, method, resource_type, query, body):
+        if method == 'GET':
+            self._send_json(200, self.fake._list(resource_type, query, self._metadata_only()))
+        elif method == 'POST' and resource_type == 'pipelineruns':
+            obj = self.fake.create_pipeline_run(json.loads(body))
+            if obj is None:
+                self._send_json(409, self._status(409, 'AlreadyExists', 'already exists'))
+            else:
+                self._send_json(201, obj)
+        elif method == 'DELETE':
+            deleted = self.fake._list(resource_type, query, False)
+            for obj in deleted['items']:
+                self.fake._delete(resource_type, obj['metadata']['name'])
+            self._send_json(200, deleted)
+        else:
+            self._send_json(405, self._status(405, 'MethodNotAllowed', method))
+
+    def _get_log(self, pod_name, query):
+        if self.fake.get_object('pods', pod_name) is None:
+            self._send_json(404, self._status(404, 'NotFound', f'pods "{pod_name}" not found'))
+            return
+        container = query.get('container')
+        if container is None:
+            with self.fake._lock:
+                containers = sorted(c for pod, c in self.fake._logs if pod == pod_name)
+            container = containers[0] if containers else None
+        lines = self.fake._log_lines(pod_name, container, query)
+        if query.get('follow') in ('true', 'True', '1'):
+            self._send_stream(lines, content_type='text/plain')
+        else:
+            self._send(200, b''.join(lines), content_type='text/plain')
+
+    def _metadata_only(self):
+        return 'as=PartialObjectMetadata' in (self.headers.get('Accept') or '')
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    @staticmethod
+    def _status(code, reason, message):
+        return {'kind': 'Status', 'apiVersion': 'v1', 'status': 'Failure',
+                'message': message, 'reason': reason, 'code': code}
+
+    def _send(self, status, data, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status, obj):
+        self._send(status, json.dumps(obj).encode())
+
+    def _send_stream(self, chunks, content_type='application/json'):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                self.wfile.flush()
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
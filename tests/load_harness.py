@@ -0,0 +1,331 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Offline load test harness
+
+Runs concurrent builds with OSBS.create_binary_container_pipeline_run against
+local git repositories and the fake API server (tests/fake_openshift.py),
+streams their logs like `osbs build` does and reports client-side throughput,
+latency percentiles per phase, API request counts and CPU and memory usage.
+No cluster, koji or remote git repository is needed:
+
+    python -m tests.load_harness --builds 50 --concurrency 10 --task-duration 0.5
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import logging
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from osbs import set_logging
+from osbs.api import OSBS
+from osbs.conf import Configuration
+from tests.constants import TEST_PIPELINE_RUN_TEMPLATE
+from tests.fake_openshift import FakeOpenshift, PipelineLifecycle, NAMESPACE
+
+
+logger = logging.getLogger('osbs.load_harness')
+
+# per thread CPU time needs Python 3.7, fall back to CPU time of the whole process
+thread_time = getattr(time, 'thread_time', time.process_time)
+
+PHASES = ('create', 'first_log', 'logs', 'finish', 'total')
+PERCENTILES = (50, 95, 99)
+RSS_SAMPLE_SECS = 0.05
+
+DOCKERFILE = """\
+FROM fedora:latest
+LABEL com.redhat.component="{component}" name="load/{component}" version="1.0" \\
+      release="{release}"
+"""
+
+BuildSample = namedtuple('BuildSample', ['name', 'phases', 'log_lines', 'cpu_secs',
+                                         'succeeded', 'error'])
+
+
+def create_git_repos(directory, count):
+    """
+    Create local git repositories with a buildable Dockerfile
+
+    :param directory: str, directory to create repositories in
+    :param count: int, number of repositories
+    :return: list of dicts with git_uri, git_ref and git_branch build arguments
+    """
+    env = dict(os.environ, GIT_AUTHOR_NAME='load', GIT_AUTHOR_EMAIL='load@example.com',
+               GIT_COMMITTER_NAME='load', GIT_COMMITTER_EMAIL='load@example.com')
+    repos = []
+    for number in range(count):
+        path = os.path.join(directory, f'repo{number}')
+        component = f'component{number}'
+        os.makedirs(path)
+        with open(os.path.join(path, 'Dockerfile'), 'w') as f:
+            f.write(DOCKERFILE.format(component=component, release=number + 1))
+
+        def git(*args):
+            return subprocess.run(('git',) + args, cwd=path, env=env, check=True,
+                                  stdout=subprocess.PIPE, universal_newlines=True).stdout
+
+        git('init', '--quiet')
+        git('checkout', '--quiet', '-b', 'main')
+        git('add', 'Dockerfile')
+        git('commit', '--quiet', '--message', f'{component} 1.0')
+        repos.append({'git_uri': f'file://{path}',
+                      'git_ref': git('rev-parse', 'HEAD').strip(),
+                      'git_branch': 'main'})
+    return repos
+
+
+def create_osbs(openshift_url, directory):
+    conf_path = os.path.join(directory, 'osbs.conf')
+    with open(conf_path, 'w') as f:
+        f.write(f"""
+[default]
+openshift_url = {openshift_url}
+namespace = {NAMESPACE}
+use_auth = false
+pipeline_run_path = {TEST_PIPELINE_RUN_TEMPLATE}
+reactor_config_map = rcm
+""")
+    return OSBS(Configuration(conf_path, conf_section='default'))
+
+
+def run_build(osbs, repo, merged_logs=False):
+    """
+    Create a build, stream its logs and wait for the result
+
+    :param merged_logs: bool, order lines of concurrently running tasks by time
+    :return: BuildSample, phases are durations in seconds
+    """
+    cpu_start = thread_time()
+    started = time.monotonic()
+    phases = {}
+    log_lines = 0
+    name = None
+    try:
+        pipeline_run = osbs.create_binary_container_pipeline_run(
+            user='load-test',
+            target='target',
+            default_buildtime_limit=osbs.os_conf.get_default_buildtime_limit(),
+            max_buildtime_limit=osbs.os_conf.get_max_buildtime_limit(),
+            **repo
+        )
+        name = pipeline_run.pipeline_run_name
+        created = time.monotonic()
+        phases['create'] = created - started
+
+        for _ in pipeline_run.get_logs(follow=True, wait=True, merged=merged_logs):
+            if not log_lines:
+                phases['first_log'] = time.monotonic() - created
+            log_lines += 1
+        logs_done = time.monotonic()
+        phases['logs'] = logs_done - created
+
+        pipeline_run.wait_for_finish()
+        report = pipeline_run.build_report()
+        finished = time.monotonic()
+        phases['finish'] = finished - logs_done
+        phases['total'] = finished - started
+        return BuildSample(name, phases, log_lines, thread_time() - cpu_start,
+                           report.succeeded, report.error_message)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.exception("Build %s failed", name)
+        return BuildSample(name, phases, log_lines, thread_time() - cpu_start,
+                           False, repr(exc))
+
+
+def percentile(values, percent):
+    """
+    Nearest-rank percentile
+
+    :return: float, None for no values
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _current_rss():
+    """
+    :return: int, resident set size of this process in bytes
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        # not Linux, peak RSS is the best we have; ru_maxrss is KiB on Linux, bytes on macOS
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class _RssSampler(object):
+    def __init__(self):
+        self.baseline = _current_rss()
+        self.peak = self.baseline
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_SECS):
+            self.peak = max(self.peak, _current_rss())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+def run_load(builds, concurrency, lifecycle=None, latency=0.0, fault_rate=0.0, repos=1):
+    """
+    Run builds against the fake API server and collect statistics
+
+    CPU time is measured per build thread, so it covers only client work done
+    by the build itself (on Python 3.6 it is CPU time of the whole process);
+    process CPU time includes the fake server too.
+    Memory per build is the growth of process RSS over the run divided by the
+    number of builds running at the same time.
+
+    :param builds: int, number of builds
+    :param concurrency: int, number of builds running at the same time
+    :param lifecycle: PipelineLifecycle of the simulated builds
+    :param latency: float, seconds added to every API response
+    :param fault_rate: float, probability of API requests failing with 500
+    :param repos: int, number of git repositories the builds are spread over
+    :return: dict, report, see format_report
+    """
+    lifecycle = lifecycle or PipelineLifecycle()
+    with tempfile.TemporaryDirectory() as directory, \
+            FakeOpenshift(lifecycle=lifecycle, latency=latency,
+                          fault_rate=fault_rate) as server:
+        git_repos = create_git_repos(directory, repos)
+        osbs = create_osbs(server.url, directory)
+
+        with _RssSampler() as rss, ThreadPoolExecutor(max_workers=concurrency) as executor:
+            started = time.monotonic()
+            cpu_start = time.process_time()
+            samples = list(executor.map(
+                lambda number: run_build(osbs, git_repos[number % repos],
+                                         merged_logs=lifecycle.parallel_tasks),
+                range(builds)))
+            wall_time = time.monotonic() - started
+            process_cpu = time.process_time() - cpu_start
+        requests = dict(server.requests)
+
+    succeeded = [sample for sample in samples if sample.succeeded]
+    log_lines = sum(sample.log_lines for sample in samples)
+    in_flight = min(concurrency, builds) or 1
+    return {
+        'builds': builds,
+        'concurrency': concurrency,
+        'succeeded': len(succeeded),
+        'errors': sorted({sample.error for sample in samples if sample.error}),
+        'wall_secs': wall_time,
+        'builds_per_sec': builds / wall_time if wall_time else None,
+        'log_lines_per_sec': log_lines / wall_time if wall_time else None,
+        'phases': {
+            phase: {f'p{percent}': percentile([sample.phases[phase] for sample in samples
+                                               if phase in sample.phases], percent)
+                    for percent in PERCENTILES}
+            for phase in PHASES
+        },
+        'requests': {f'{method} {endpoint}': count
+                     for (method, endpoint), count in sorted(requests.items())},
+        'requests_per_build': sum(requests.values()) / builds if builds else None,
+        'cpu_secs_per_build': {f'p{percent}': percentile([sample.cpu_secs for sample in samples],
+                                                         percent)
+                               for percent in PERCENTILES},
+        'process_cpu_secs': process_cpu,
+        'rss_bytes': {'baseline': rss.baseline, 'peak': rss.peak,
+                      'per_build': (rss.peak - rss.baseline) / in_flight},
+    }
+
+
+def format_report(report):
+    """
+    :param report: dict, as returned by run_load
+    :return: str, human readable report
+    """
+    def secs(value):
+        return '-' if value is None else f'{value * 1000:.1f}ms'
+
+    lines = [
+        f"builds: {report['succeeded']}/{report['builds']} succeeded, "
+        f"concurrency {report['concurrency']}",
+        f"wall time: {report['wall_secs']:.2f}s, {report['builds_per_sec']:.2f} builds/s, "
+        f"{report['log_lines_per_sec']:.0f} log lines/s",
+        "latency per phase:",
+    ]
+    for phase, values in report['phases'].items():
+        percentiles = ' '.join(f"{name} {secs(value):>10}" for name, value in values.items())
+        lines.append(f"\t{phase:<10}{percentiles}")
+    lines.append(f"requests: {report['requests_per_build']:.1f} per build")
+    for endpoint, count in report['requests'].items():
+        lines.append(f"\t{endpoint:<30} {count}")
+    lines.append("client CPU per build: " + ' '.join(
+        f"{name} {secs(value)}" for name, value in report['cpu_secs_per_build'].items()))
+    lines.append(f"process CPU (with fake server): {report['process_cpu_secs']:.2f}s")
+    rss = report['rss_bytes']
+    lines.append(f"RSS: baseline {rss['baseline'] / 2**20:.1f}MiB, "
+                 f"peak {rss['peak'] / 2**20:.1f}MiB, "
+                 f"{rss['per_build'] / 2**10:.0f}KiB per build in flight")
+    for error in report['errors']:
+        lines.append(f"error: {error}")
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="OSBS offline load test harness",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--builds", metavar="N", type=int, default=20,
+                        help="number of builds to run")
+    parser.add_argument("--concurrency", metavar="N", type=int, default=10,
+                        help="number of builds running at the same time")
+    parser.add_argument("--repos", metavar="N", type=int, default=1,
+                        help="number of local git repositories to build from")
+    parser.add_argument("--tasks", type=int, default=3, help="number of tasks per build")
+    parser.add_argument("--steps", type=int, default=2, help="number of steps per task")
+    parser.add_argument("--parallel-tasks", action="store_true",
+                        help="run tasks of a build at the same time and merge their logs")
+    parser.add_argument("--task-duration", metavar="SECONDS", type=float, default=0.5,
+                        help="duration of each task")
+    parser.add_argument("--log-lines", metavar="N", type=int, default=100,
+                        help="number of log lines written by each step")
+    parser.add_argument("--latency", metavar="SECONDS", type=float, default=0.0,
+                        help="latency added to every API response")
+    parser.add_argument("--fault-rate", metavar="RATIO", type=float, default=0.0,
+                        help="probability of API requests failing with 500")
+    parser.add_argument("--json", action="store_true", help="print report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="log client debug messages")
+    args = parser.parse_args(args)
+
+    set_logging(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    lifecycle = PipelineLifecycle(tasks=[f'task{number}' for number in range(args.tasks)],
+                                  steps=[f'step-{number}' for number in range(args.steps)],
+                                  task_duration=args.task_duration, log_lines=args.log_lines,
+                                  parallel_tasks=args.parallel_tasks)
+    report = run_load(args.builds, args.concurrency, lifecycle=lifecycle, latency=args.latency,
+                      fault_rate=args.fault_rate, repos=args.repos)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0 if report['succeeded'] == report['builds'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import responses
+
+from osbs.accounting import (RequestAccounting, RequestKey, charge_generator,
+                             current_operation, endpoint, operation, propagate)
+from osbs.api import osbsapi
+from osbs.tekton import Openshift, PipelineRun
+from tests.constants import TEST_OCP_NAMESPACE, TEST_OCP_URL
+from tests.util import assert_request_budget
+
+
+@pytest.mark.parametrize(('method', 'url', 'expected'), [
+    ('get', f'{TEST_OCP_URL}apis/tekton.dev/v1beta1/namespaces/ns/pipelineruns/build-1',
+     ('GET', 'pipelineruns/{name}')),
+    ('post', f'{TEST_OCP_URL}apis/tekton.dev/v1beta1/namespaces/ns/pipelineruns',
+     ('POST', 'pipelineruns')),
+    ('get', f'{TEST_OCP_URL}api/v1/namespaces/ns/pods/pod-1/log?follow=true',
+     ('GET', 'pods/{name}/log')),
+    ('get', f'{TEST_OCP_URL}apis/tekton.dev/v1beta1/watch/namespaces/ns/taskruns/run-1/',
+     ('WATCH', 'taskruns/{name}')),
+    ('get', f'{TEST_OCP_URL}apis/tekton.dev/v1beta1/watch/namespaces/ns/pipelineruns/'
+            '?resourceVersion=1',
+     ('WATCH', 'pipelineruns')),
+    ('get', f'{TEST_OCP_URL}oauth/authorize?response_type=token',
+     ('GET', 'oauth/authorize')),
+])
+def test_endpoint(method, url, expected):
+    assert endpoint(method, url) == expected
+
+
+def test_operation_nesting():
+    assert current_operation() is None
+    with operation('outer'):
+        with operation('inner'):
+            assert current_operation() == 'outer'
+    assert current_operation() is None
+
+
+def test_propagate_to_threads():
+    with operation('op'):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert list(executor.map(propagate(lambda _: current_operation()), range(2))) == \
+                ['op', 'op']
+            assert executor.submit(current_operation).result() is None
+
+
+def test_charge_generator():
+    def generator():
+        yield current_operation()
+        yield current_operation()
+
+    operations = []
+    for item in charge_generator('op', generator()):
+        operations.append((item, current_operation()))
+    assert operations == [('op', None), ('op', None)]
+
+    # consumed by another operation, which is the outermost one
+    with operation('outer'):
+        assert list(charge_generator('op', generator())) == ['outer', 'outer']
+
+
+def test_osbsapi_charges_requests():
+    accounting = RequestAccounting()
+
+    class Api(object):
+        @osbsapi
+        def fetch(self, url):
+            accounting.record('get', url)
+            return self.fetch_more(url)
+
+        @osbsapi
+        def fetch_more(self, url):
+            accounting.record('get', url)
+
+        @osbsapi
+        def follow(self, url):
+            for _ in range(3):
+                accounting.record('get', url)
+                yield
+
+    url = f'{TEST_OCP_URL}api/v1/namespaces/ns/pods/pod-1'
+    Api().fetch(url)
+    Api().fetch_more(url)
+    list(Api().follow(url))
+    accounting.record('get', url)
+
+    assert accounting.counts() == {
+        RequestKey('fetch', 'GET', 'pods/{name}'): 2,
+        RequestKey('fetch_more', 'GET', 'pods/{name}'): 1,
+        RequestKey('follow', 'GET', 'pods/{name}'): 3,
+        RequestKey(None, 'GET', 'pods/{name}'): 1,
+    }
+    assert accounting.total() == 7
+    assert accounting.total('follow') == 3
+    assert accounting.format('fetch') == '     2 fetch GET pods/{name}'
+
+    accounting.reset()
+    assert accounting.total() == 0
+
+
+@responses.activate
+def test_request_budget():
+    openshift = Openshift(openshift_api_url=TEST_OCP_URL, openshift_oauth_url=TEST_OCP_URL,
+                          use_auth=False, namespace=TEST_OCP_NAMESPACE)
+    pipeline_run = PipelineRun(openshift, 'build-1')
+    responses.add(responses.GET, pipeline_run.pipeline_run_url, json={})
+
+    with assert_request_budget(openshift, 2):
+        pipeline_run.get_info()
+        pipeline_run.get_info()
+
+    with pytest.raises(AssertionError) as exc_info:
+        with assert_request_budget(openshift, 1):
+            pipeline_run.get_info()
+            pipeline_run.get_info()
+    assert 'GET pipelineruns/{name}' in str(exc_info.value)
@@ -15,15 +15,17 @@ import copy
 import sys
 import datetime
 import random
+import responses
 from tempfile import NamedTemporaryFile
 
-from osbs.api import OSBS, osbsapi
+from osbs.api import OSBS, osbsapi, BuildOperationResult
+from osbs.cache import ObjectCache
 from osbs.conf import Configuration
 from osbs.exceptions import (OsbsValidationException, OsbsException, OsbsResponseException)
 from osbs.constants import (REPO_CONTAINER_CONFIG, PRUN_TEMPLATE_USER_PARAMS,
                             PRUN_TEMPLATE_REACTOR_CONFIG_WS, PRUN_TEMPLATE_BUILD_DIR_WS,
                             PRUN_TEMPLATE_CONTEXT_DIR_WS)
-from osbs import utils
+from osbs import api, utils
 from osbs.utils.labels import Labels
 from osbs.repo_utils import RepoInfo, RepoConfiguration, ModuleSpec
 from osbs.build.user_params import BuildUserParams, SourceContainerUserParams
@@ -31,8 +33,8 @@ from osbs.build.user_params import BuildUserParams, SourceContainerUserParams
 from tests.constants import (TEST_COMPONENT, TEST_GIT_BRANCH, TEST_GIT_REF, TEST_GIT_URI,
                              TEST_TARGET, TEST_USER, TEST_KOJI_TASK_ID, TEST_VERSION,
                              TEST_PIPELINE_RUN_TEMPLATE, TEST_PIPELINE_REPLACEMENTS_TEMPLATE,
-                             TEST_OCP_NAMESPACE)
-from osbs.tekton import PipelineRun, TaskRun
+                             TEST_OCP_NAMESPACE, TEST_OCP_URL)
+from osbs.tekton import PipelineRun, TaskRun, FAILED_STEP_TAIL_LINES
 
 
 REQUIRED_BUILD_ARGS = {
@@ -756,6 +758,9 @@ class TestOSBS(object):
         assert isinstance(pipeline_run, PipelineRun)
 
         assert pipeline_run.input_data['metadata']['name'] == pipeline_run_name
+        # start_pipeline_run is mocked, the POST isn't timed
+        assert set(pipeline_run.timings.as_dict()) == {'repo_fetch', 'validation',
+                                                       'template_render'}
 
         for ws in pipeline_run.input_data['spec']['workspaces']:
             if ws['name'] == PRUN_TEMPLATE_REACTOR_CONFIG_WS:
@@ -952,6 +957,19 @@ class TestOSBS(object):
 
         assert reason == osbs_binary.get_build_reason('run_name')
 
+    def test_get_build_report(self, osbs_binary):
+        resp = {'metadata': {'name': 'run_name'},
+                'status': {'conditions': [{'status': 'True', 'reason': 'Succeeded'}],
+                           'pipelineResults': [{'name': 'result', 'value': '"value"'}]}}
+
+        flexmock(PipelineRun).should_receive('get_info').and_return(resp).once()
+
+        report = osbs_binary.get_build_report('run_name')
+
+        assert report.succeeded
+        assert report.reason == 'Succeeded'
+        assert report.pipeline_results == {'result': 'value'}
+
     @pytest.mark.parametrize(('reason', 'output'), [
         ('Succeeded', True),
         ('Failed', False),
@@ -1007,6 +1025,96 @@ class TestOSBS(object):
 
         assert resp == osbs_binary.cancel_build('run_name')
 
+    @responses.activate
+    def test_get_build_cached(self, osbs_source):
+        url = (f'{TEST_OCP_URL}apis/tekton.dev/v1beta1/namespaces/{TEST_OCP_NAMESPACE}/'
+               'pipelineruns/run_name')
+        pipeline_run = {'metadata': {'name': 'run_name', 'resourceVersion': '1'},
+                        'status': {'conditions': [{'status': 'True', 'reason': 'Succeeded'}]}}
+        responses.add(responses.GET, url, json=pipeline_run)
+        osbs_source._cache = ObjectCache(ttl=60)
+
+        assert osbs_source.get_build('run_name') == pipeline_run
+        assert osbs_source.build_has_succeeded('run_name')
+        assert osbs_source.get_build_reason('run_name') == 'Succeeded'
+        assert len(responses.calls) == 1
+
+    @pytest.mark.parametrize(('completion_time', 'expected_calls'), [
+        ('2022-04-26T15:58:42Z', 1),
+        # the condition is final, but the run is still being updated
+        (None, 3),
+    ])
+    @responses.activate
+    def test_get_build_cached_completed(self, osbs_source, completion_time, expected_calls):
+        url = (f'{TEST_OCP_URL}apis/tekton.dev/v1beta1/namespaces/{TEST_OCP_NAMESPACE}/'
+               'pipelineruns/run_name')
+        pipeline_run = {'metadata': {'name': 'run_name', 'resourceVersion': '1'},
+                        'status': {'conditions': [{'status': 'False', 'reason': 'Failed'}],
+                                   'completionTime': completion_time}}
+        responses.add(responses.GET, url, json=pipeline_run)
+        # cached objects are revalidated on every access, unless they are final
+        osbs_source._cache = ObjectCache(ttl=0)
+
+        for _ in range(3):
+            assert osbs_source.get_build('run_name') == pipeline_run
+        assert len(responses.calls) == expected_calls
+
+    def test_wait_for_builds(self, osbs_binary):
+        finished = [('build-2', {'metadata': {'name': 'build-2'}}),
+                    ('build-1', {'metadata': {'name': 'build-1'}})]
+        (flexmock(api)
+            .should_receive('wait_for_pipeline_runs')
+            .with_args(osbs_binary.os, ['build-1', 'build-2'], timeout=60)
+            .and_return(iter(finished)))
+
+        assert list(osbs_binary.wait_for_builds(['build-1', 'build-2'], timeout=60)) == finished
+
+    def test_cancel_builds(self, osbs_binary):
+        error = OsbsResponseException('conflict', 409)
+        (flexmock(PipelineRun)
+            .should_receive('cancel_pipeline_run')
+            .and_return({})
+            .and_raise(error)
+            .times(2))
+
+        results = osbs_binary.cancel_builds(['build-1', 'build-2'], max_workers=1)
+
+        assert results == [BuildOperationResult('build-1', True, None),
+                           BuildOperationResult('build-2', False, error)]
+
+    def test_cancel_builds_label_selector(self, osbs_binary):
+        (flexmock(osbs_binary.os)
+            .should_receive('list_resources')
+            .with_args('apis', 'tekton.dev/v1beta1', 'pipelineruns',
+                       label_selector='koji-task-id=123', metadata_only=True)
+            .and_return(iter([{'metadata': {'name': 'build-1'}}])))
+        flexmock(PipelineRun).should_receive('cancel_pipeline_run').once().and_return({})
+
+        results = osbs_binary.cancel_builds(label_selector='koji-task-id=123')
+
+        assert results == [BuildOperationResult('build-1', True, None)]
+
+    @pytest.mark.parametrize(('build_names', 'label_selector'), [
+        (None, None),
+        (['build-1'], 'koji-task-id=123'),
+    ])
+    def test_cancel_builds_invalid_args(self, osbs_binary, build_names, label_selector):
+        with pytest.raises(OsbsValidationException):
+            osbs_binary.cancel_builds(build_names, label_selector=label_selector)
+
+    def test_remove_builds(self, osbs_binary):
+        (flexmock(osbs_binary.os)
+            .should_receive('delete_collection')
+            .with_args('apis', 'tekton.dev/v1beta1', 'pipelineruns',
+                       label_selector='koji-task-id=123')
+            .once()
+            .and_return([{'metadata': {'name': 'build-1'}}, {'metadata': {'name': 'build-2'}}]))
+
+        assert osbs_binary.remove_builds('koji-task-id=123') == [
+            BuildOperationResult('build-1', True, None),
+            BuildOperationResult('build-2', True, None),
+        ]
+
     def test_remove_build(self, osbs_binary):
         resp = {'kind': 'Status', 'apiVersion': 'v1', 'status': 'Success'}
         flexmock(PipelineRun).should_receive('remove_pipeline_run').once().and_return(resp)
@@ -1020,7 +1128,8 @@ class TestOSBS(object):
     ])
     def test_get_build_logs(self, osbs_binary, follow, wait):
         logs = ['first', 'second']
-        kwargs = {'follow': follow, 'wait': wait}
+        kwargs = {'follow': follow, 'wait': wait, 'tail_lines': None, 'limit_bytes': None,
+                  'merged': False}
 
         (flexmock(PipelineRun)
             .should_receive('get_logs')
@@ -1028,6 +1137,49 @@ class TestOSBS(object):
 
         assert logs == osbs_binary.get_build_logs('run_name', follow=follow, wait=wait)
 
+    def test_get_build_logs_tail(self, osbs_binary):
+        logs = {'binary-container-build': {'step-build': 'last line\n'}}
+
+        (flexmock(PipelineRun)
+            .should_receive('get_logs')
+            .with_args(follow=False, wait=False, tail_lines=1, limit_bytes=1024, merged=False)
+            .and_return(logs))
+
+        assert logs == osbs_binary.get_build_logs('run_name', tail_lines=1, limit_bytes=1024)
+
+    def test_get_build_failed_steps_logs(self, osbs_binary):
+        logs = {'binary-container-build': {'step-build': 'error\n'}}
+
+        (flexmock(PipelineRun)
+            .should_receive('get_failed_steps_logs')
+            .with_args(tail_lines=FAILED_STEP_TAIL_LINES, limit_bytes=None)
+            .and_return(logs))
+
+        assert logs == osbs_binary.get_build_failed_steps_logs('run_name')
+
+    def test_list_builds(self, osbs_binary):
+        builds = [{'metadata': {'name': 'build-1'}}, {'metadata': {'name': 'build-2'}}]
+
+        (flexmock(osbs_binary.os)
+            .should_receive('list_resources')
+            .with_args('apis', 'tekton.dev/v1beta1', 'pipelineruns',
+                       label_selector='koji-task-id=123', field_selector=None, page_size=50,
+                       metadata_only=False)
+            .and_return(iter(builds)))
+
+        assert list(osbs_binary.list_builds(label_selector='koji-task-id=123',
+                                            page_size=50)) == builds
+
+    def test_download_build_logs(self, osbs_binary):
+        manifest = {'binary-container-build': {'step-build': {'path': 'logs/build.log.gz',
+                                                              'bytes': 6, 'lines': 1}}}
+
+        (flexmock(PipelineRun)
+            .should_receive('download_logs')
+            .with_args('logs', compress='gzip').and_return(manifest))
+
+        assert manifest == osbs_binary.download_build_logs('run_name', 'logs')
+
     def test_get_build_error_message(self, osbs_binary):
         metadata = '{"plugins-metadata": {"errors": {"plugin1": "error1"}}}'
         message = [{'key': 'task_result', 'value': 'bad thing'}]
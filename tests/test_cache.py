@@ -0,0 +1,141 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+import time
+
+from flexmock import flexmock
+import pytest
+
+from osbs.cache import ObjectCache
+
+
+def build(resource_version, status='Unknown'):
+    return {'metadata': {'name': 'build', 'resourceVersion': resource_version},
+            'status': {'conditions': [{'status': status}]}}
+
+
+def is_final(obj):
+    return obj['status']['conditions'][0]['status'] != 'Unknown'
+
+
+class Fetcher(object):
+    def __init__(self, *objects):
+        self.objects = list(objects)
+        self.fetches = 0
+        self.metadata_fetches = 0
+
+    def fetch(self):
+        self.fetches += 1
+        return self.objects[0]
+
+    def fetch_metadata(self):
+        self.metadata_fetches += 1
+        return {'metadata': self.objects[0]['metadata']}
+
+
+@pytest.fixture
+def clock():
+    now = [1000.0]
+    flexmock(time).should_receive('monotonic').replace_with(lambda: now[0])
+    return now
+
+
+def test_cached_within_ttl(clock):
+    cache = ObjectCache(ttl=5)
+    fetcher = Fetcher(build('1'))
+
+    assert cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata) == build('1')
+    clock[0] += 4
+    assert cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata) == build('1')
+
+    assert (fetcher.fetches, fetcher.metadata_fetches) == (1, 0)
+
+
+def test_revalidated_after_ttl(clock):
+    cache = ObjectCache(ttl=5)
+    fetcher = Fetcher(build('1'))
+    cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata)
+
+    # not changed, only metadata is fetched
+    clock[0] += 6
+    assert cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata) == build('1')
+    assert (fetcher.fetches, fetcher.metadata_fetches) == (1, 1)
+
+    # revalidation restarted ttl
+    clock[0] += 4
+    cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata)
+    assert (fetcher.fetches, fetcher.metadata_fetches) == (1, 1)
+
+    # changed, fetched again
+    clock[0] += 6
+    fetcher.objects = [build('2')]
+    assert cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata) == build('2')
+    assert (fetcher.fetches, fetcher.metadata_fetches) == (2, 2)
+
+
+def test_final_never_refetched(clock):
+    cache = ObjectCache(ttl=5)
+    fetcher = Fetcher(build('1', 'True'))
+    cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata, is_final=is_final)
+
+    clock[0] += 3600
+    obj = cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata,
+                    is_final=is_final)
+
+    assert obj == build('1', 'True')
+    assert (fetcher.fetches, fetcher.metadata_fetches) == (1, 0)
+
+
+def test_returns_copies(clock):
+    cache = ObjectCache(ttl=5)
+    fetcher = Fetcher(build('1'))
+
+    cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata)['status'] = {}
+
+    assert cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata) == build('1')
+
+
+def test_missing_not_cached(clock):
+    cache = ObjectCache(ttl=5)
+    fetcher = Fetcher(None)
+    fetcher.fetch_metadata = lambda: None
+
+    assert cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata) is None
+    assert cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata) is None
+    assert fetcher.fetches == 2
+    assert len(cache) == 0
+
+
+def test_invalidate(clock):
+    cache = ObjectCache(ttl=5)
+    fetcher = Fetcher(build('1'))
+    cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata)
+
+    cache.invalidate('PipelineRun', 'build')
+    cache.get('PipelineRun', 'build', fetcher.fetch, fetcher.fetch_metadata)
+
+    assert fetcher.fetches == 2
+
+
+def test_lru_eviction(clock):
+    cache = ObjectCache(ttl=5, max_size=2)
+    fetchers = {name: Fetcher(build('1')) for name in ('a', 'b', 'c')}
+
+    def get(name):
+        cache.get('PipelineRun', name, fetchers[name].fetch, fetchers[name].fetch_metadata)
+
+    get('a')
+    get('b')
+    get('a')  # 'b' is now least recently used
+    get('c')
+    get('a')
+    get('b')
+
+    assert len(cache) == 2
+    assert {name: fetcher.fetches for name, fetcher in fetchers.items()} == {
+        'a': 1, 'b': 2, 'c': 1,
+    }
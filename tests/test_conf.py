@@ -214,6 +214,16 @@ class TestConfiguration(object):
          {},
          {'client_key': 'client_key'},
          {'get_client_key': 'client_key'}),
+
+        ({'general': {'capture_dir': '/capture'}, 'default': {}},
+         {},
+         {'replay_dir': '/replay'},
+         {'get_capture_dir': '/capture', 'get_replay_dir': '/replay'}),
+
+        ({'general': {'metrics_file': '/metrics.prom'}, 'default': {}},
+         {},
+         {},
+         {'get_metrics_file': '/metrics.prom'}),
     ])
     def test_param_retrieval(self, config, kwargs, cli_args, expected):
         with self.build_cli_args(cli_args) as args:
@@ -277,6 +287,19 @@ class TestConfiguration(object):
 
             assert conf.get_cleanup_used_resources() == expected
 
+    @pytest.mark.parametrize(('config', 'expected'), [
+        ({
+             'default': {'build_cache_ttl': '2.5'},
+         }, 2.5),
+        ({
+             'default': {},
+         }, 0),
+    ])
+    def test_build_cache_ttl(self, config, expected):
+        with self.config_file(config) as config_file:
+            conf = Configuration(conf_file=config_file, conf_section='default')
+        assert conf.get_build_cache_ttl() == expected
+
     @pytest.mark.parametrize(('config', 'expected'), [
         ({
              'default': {'default_buildtime_limit': 1500},
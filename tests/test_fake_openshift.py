@@ -0,0 +1,251 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+
+Client tests against the fake API server, over real HTTP
+"""
+import threading
+
+import pytest
+
+from osbs.exceptions import OsbsResponseException
+from osbs.tekton import (Openshift, PipelineRun, TaskRun, API_VERSION, wait_for_pipeline_runs)
+from tests.fake_openshift import FakeOpenshift, PipelineLifecycle, NAMESPACE
+from tests.load_harness import create_osbs
+from tests.util import assert_request_budget
+
+
+def pipeline_run_data(name, labels=None):
+    return {
+        'apiVersion': API_VERSION,
+        'kind': 'PipelineRun',
+        'metadata': {'name': name, 'labels': labels or {}},
+        'spec': {},
+    }
+
+
+@pytest.fixture
+def fake_openshift():
+    lifecycle = PipelineLifecycle(tasks=('prebuild', 'build'), steps=('step-a', 'step-b'),
+                                  task_duration=0.05, log_lines=3,
+                                  pipeline_results={'repositories': '{"primary": ["r"]}'},
+                                  task_results={'build': {'image': 'registry/image:1'}})
+    with FakeOpenshift(lifecycle=lifecycle) as server:
+        yield server
+
+
+@pytest.fixture
+def openshift(fake_openshift):
+    return Openshift(openshift_api_url=fake_openshift.url,
+                     openshift_oauth_url=fake_openshift.url + 'oauth/authorize',
+                     use_auth=False, namespace=NAMESPACE)
+
+
+def start_pipeline_run(openshift, name, labels=None):
+    pipeline_run = PipelineRun(openshift, name, pipeline_run_data(name, labels))
+    pipeline_run.start_pipeline_run()
+    return pipeline_run
+
+
+def test_pipeline_run_lifecycle(fake_openshift, openshift):
+    pipeline_run = start_pipeline_run(openshift, 'build-1')
+
+    logs = list(pipeline_run.get_logs(follow=True, wait=True))
+
+    assert [task for task, _ in logs] == ['prebuild'] * 6 + ['build'] * 6
+    assert logs[0][1].endswith('INFO - step-a line 1')
+    assert logs[-1][1].endswith('INFO - step-b line 3')
+
+    pipeline_run.wait_for_finish()
+    report = pipeline_run.build_report()
+    assert report.succeeded
+    assert report.pipeline_results == {'repositories': {'primary': ['r']}}
+    assert report.task_results == {'build': {'image': 'registry/image:1'}}
+
+
+def test_parallel_tasks_merged_logs():
+    lifecycle = PipelineLifecycle(tasks=('build-x86', 'build-ppc'), steps=('step-a',),
+                                  task_duration=0.2, log_lines=5, parallel_tasks=True)
+    with FakeOpenshift(lifecycle=lifecycle) as server:
+        openshift = Openshift(openshift_api_url=server.url,
+                              openshift_oauth_url=server.url + 'oauth/authorize',
+                              use_auth=False, namespace=NAMESPACE)
+        pipeline_run = start_pipeline_run(openshift, 'build-1')
+
+        logs = list(pipeline_run.get_logs(follow=True, wait=True, merged=True))
+
+        tasks = [task for task, _ in logs]
+        assert sorted(tasks) == ['build-ppc'] * 5 + ['build-x86'] * 5
+        # lines of both tasks are interleaved, in the order they were written
+        assert tasks[:5] != [tasks[0]] * 5
+        written = [line.split(' platform')[0] for _, line in logs]
+        assert written == sorted(written)
+
+        pipeline_run.wait_for_finish()
+        assert pipeline_run.build_report().succeeded
+
+
+def test_wait_for_taskruns_stops_watch(fake_openshift, openshift):
+    pipeline_run = start_pipeline_run(openshift, 'build-1')
+
+    task_runs = [task for batch in pipeline_run.wait_for_taskruns() for task, _ in batch]
+    assert task_runs == ['prebuild', 'build']
+
+    # the pipeline run doesn't change anymore, the watch must not wait for it
+    for thread in threading.enumerate():
+        if thread.name == 'osbs-watch':
+            thread.join(timeout=5)
+    assert not [thread for thread in threading.enumerate() if thread.name == 'osbs-watch']
+
+
+def test_failed_task(fake_openshift, openshift):
+    fake_openshift.lifecycle.fail_task = 'prebuild'
+    pipeline_run = start_pipeline_run(openshift, 'build-1')
+    fake_openshift.wait_for_pipeline_runs()
+
+    report = pipeline_run.build_report()
+    assert not report.succeeded
+    assert report.any_task_failed
+    assert report.error_message == 'Error in prebuild: prebuild failed;\n'
+
+    logs = pipeline_run.get_failed_steps_logs(tail_lines=1)
+    assert list(logs) == ['prebuild']
+    assert list(logs['prebuild']) == ['step-b']
+    assert logs['prebuild']['step-b'].endswith('step-b line 3\n')
+
+
+def test_cancel(fake_openshift, openshift):
+    fake_openshift.lifecycle.start_delay = 10
+    pipeline_run = start_pipeline_run(openshift, 'build-1')
+
+    pipeline_run.cancel_pipeline_run()
+    fake_openshift.wait_for_pipeline_runs()
+
+    assert pipeline_run.was_cancelled()
+    assert not pipeline_run.has_not_finished()
+
+
+def test_task_run_logs(fake_openshift, openshift):
+    start_pipeline_run(openshift, 'build-1')
+    fake_openshift.wait_for_pipeline_runs()
+
+    task_run = TaskRun(openshift, 'build-1-build')
+    logs = task_run.get_logs(tail_lines=2, timestamps=True)
+
+    assert list(logs) == ['step-a', 'step-b']
+    lines = logs['step-a'].splitlines()
+    assert len(lines) == 2
+    assert lines[1].split(' ', 1)[0].endswith('Z')
+    assert lines[1].endswith('step-a line 3')
+
+
+def test_list_and_delete_builds(fake_openshift, openshift):
+    for number in range(5):
+        start_pipeline_run(openshift, f'build-{number}', labels={'koji-task-id': str(number % 2)})
+    fake_openshift.wait_for_pipeline_runs()
+
+    names = [obj['metadata']['name'] for obj
+             in openshift.list_resources('apis', API_VERSION, 'pipelineruns', page_size=2,
+                                         metadata_only=True)]
+    assert names == [f'build-{number}' for number in range(5)]
+    assert fake_openshift.requests[('GET', 'pipelineruns')] == 3
+
+    deleted = openshift.delete_collection('apis', API_VERSION, 'pipelineruns',
+                                          label_selector='koji-task-id=1')
+    assert sorted(obj['metadata']['name'] for obj in deleted) == ['build-1', 'build-3']
+    assert PipelineRun(openshift, 'build-1').get_info() is None
+
+
+def test_wait_for_pipeline_runs(fake_openshift, openshift):
+    names = [f'build-{number}' for number in range(3)]
+    for name in names:
+        start_pipeline_run(openshift, name)
+
+    finished = dict(wait_for_pipeline_runs(openshift, names + ['missing'], timeout=30))
+
+    assert sorted(finished) == sorted(names + ['missing'])
+    assert finished['missing'] is None
+    for name in names:
+        assert finished[name]['status']['conditions'][0]['reason'] == 'Succeeded'
+    # all builds are tracked by one watch
+    assert fake_openshift.requests[('WATCH', 'pipelineruns')] == 1
+
+
+def test_watch_expired_resource_version():
+    with FakeOpenshift(event_history=2) as server:
+        openshift = Openshift(openshift_api_url=server.url,
+                              openshift_oauth_url=server.url + 'oauth/authorize',
+                              use_auth=False, namespace=NAMESPACE)
+        start_pipeline_run(openshift, 'build-1')
+        server.wait_for_pipeline_runs()
+
+        with pytest.raises(OsbsResponseException) as exc_info:
+            next(openshift.watch_collection('apis', API_VERSION, 'pipelineruns', '1'))
+        assert exc_info.value.status_code == 410
+
+
+def test_injected_faults_are_retried(fake_openshift, openshift):
+    pipeline_run = start_pipeline_run(openshift, 'build-1')
+    fake_openshift.wait_for_pipeline_runs()
+    fake_openshift.inject_fault('pipelineruns/build-1$', status=503)
+
+    assert pipeline_run.get_info()['metadata']['name'] == 'build-1'
+    assert fake_openshift.requests[('GET', 'pipelineruns/name')] == 2
+
+
+def test_watch_resource_reconnects(fake_openshift, openshift):
+    fake_openshift.lifecycle.start_delay = 0.2
+    fake_openshift.inject_fault('watch/', status=None)
+    pipeline_run = start_pipeline_run(openshift, 'build-1')
+
+    assert pipeline_run.wait_for_start() is not None
+    assert fake_openshift.requests[('WATCH', 'pipelineruns/name')] >= 2
+
+
+def test_capture_and_replay(fake_openshift, tmp_path):
+    capture_dir = str(tmp_path)
+    openshift = Openshift(openshift_api_url=fake_openshift.url,
+                          openshift_oauth_url=fake_openshift.url + 'oauth/authorize',
+                          use_auth=False, namespace=NAMESPACE, capture_dir=capture_dir)
+    pipeline_run = start_pipeline_run(openshift, 'build-1')
+    logs = list(pipeline_run.get_logs(follow=True, wait=True))
+    pipeline_run.wait_for_finish()
+    report = pipeline_run.build_report()
+    fake_openshift.stop()
+
+    replayed = Openshift(openshift_api_url=fake_openshift.url,
+                         openshift_oauth_url=fake_openshift.url + 'oauth/authorize',
+                         use_auth=False, namespace=NAMESPACE, replay_dir=capture_dir)
+    replayed._con.replay.speed = 0
+    pipeline_run = start_pipeline_run(replayed, 'build-1')
+
+    # without the recorded delays, streams of the tasks may interleave differently
+    replayed_logs = list(pipeline_run.get_logs(follow=True, wait=True))
+    for task in ('prebuild', 'build'):
+        assert [line for name, line in replayed_logs if name == task] == \
+            [line for name, line in logs if name == task]
+    pipeline_run.wait_for_finish()
+    assert pipeline_run.build_report() == report
+
+
+def test_failed_build_post_mortem_request_budget(tmp_path):
+    tasks = [f'task{number}' for number in range(6)]
+    lifecycle = PipelineLifecycle(tasks=tasks, steps=('step-a', 'step-b'), task_duration=0.01,
+                                  log_lines=3, fail_task=tasks[-1])
+    with FakeOpenshift(lifecycle=lifecycle) as server:
+        osbs = create_osbs(server.url, str(tmp_path))
+        start_pipeline_run(osbs.os, 'build-1')
+        server.wait_for_pipeline_runs()
+
+        # pipeline run and its task runs
+        with assert_request_budget(osbs.os, 1 + 6, operation='get_build_report'):
+            report = osbs.get_build_report('build-1')
+        # and the log of the failed step only
+        with assert_request_budget(osbs.os, 2 + 6 + 1):
+            logs = osbs.get_build_failed_steps_logs('build-1')
+
+    assert report.any_task_failed
+    assert list(logs) == [tasks[-1]]
@@ -7,15 +7,18 @@ of the BSD license. See the LICENSE file for details.
 """
 from __future__ import absolute_import
 
+import json
 import logging
 
 from flexmock import flexmock
 import pytest
 import requests
+import responses
 import http
 
 from urllib3.util import Retry
-from osbs.osbs_http import HttpSession, HttpStream, HttpResponse
+from osbs.osbs_http import (HttpCapture, HttpReplay, HttpSession, HttpStream, HttpResponse,
+                            LineFramer)
 from osbs.exceptions import OsbsNetworkException, OsbsException, OsbsResponseException
 from osbs.constants import HTTP_RETRIES_STATUS_FORCELIST, HTTP_REQUEST_TIMEOUT
 
@@ -231,6 +234,9 @@ class TestHttpSession(object):
             def iter_lines(self, **kwargs):
                 raise exc('')
 
+            def iter_content(self, *args, **kwargs):
+                raise exc('')
+
         url = "https://httpbin.org/stream/3"
         method = "get"
         kwargs = {
@@ -258,6 +264,9 @@ class TestHttpSession(object):
             def iter_lines(self, **kwargs):
                 raise requests.exceptions.ConnectionError
 
+            def iter_content(self, *args, **kwargs):
+                raise requests.exceptions.ConnectionError
+
         url = "https://httpbin.org/stream/3"
         method = "get"
         kwargs = {
@@ -293,3 +302,108 @@ class TestHttpResponse(object):
         with pytest.raises(OsbsResponseException) as exc_info:
             response.json()
         assert 'HtttpResponse has corrupt json' in exc_info.value.message
+
+
+class TestLineFramer(object):
+    @pytest.mark.parametrize(('chunks', 'lines'), [
+        ([], []),
+        ([b''], []),
+        ([b'one\ntwo\n'], [b'one', b'two']),
+        ([b'one\nt', b'w', b'o\nthree'], [b'one', b'two', b'three']),
+        ([b'one\r\ntwo\r', b'\n\n'], [b'one', b'two', b'']),
+        ([b'\xc5', b'\xa1\n'], [b'\xc5\xa1']),
+    ])
+    def test_iter_lines(self, chunks, lines):
+        assert list(LineFramer(iter(chunks)).iter_lines()) == lines
+
+    def test_iter_lines_keepends(self):
+        chunks = [b'one\r\nt', b'wo\nthree']
+        lines = list(LineFramer(iter(chunks)).iter_lines(keepends=True))
+        assert lines == [b'one\r\n', b'two\n', b'three']
+        assert b''.join(lines) == b''.join(chunks)
+
+    @pytest.mark.parametrize(('chunks', 'lines'), [
+        ([], []),
+        ([b'one\ntwo\n'], ['one', 'two']),
+        ([b'one\nt', b'w', b'o\nthree'], ['one', 'two', 'three']),
+        ([b'one\r\ntwo\r', b'\n\n'], ['one', 'two', '']),
+        # multibyte character split between chunks
+        ([b'\xc5', b'\xa1\n\xe2\x82', b'\xac'], ['\u0161', '\u20ac']),
+        # invalid UTF-8 is replaced
+        ([b'\xff\n'], ['\ufffd']),
+    ])
+    def test_iter_text_lines(self, chunks, lines):
+        assert list(LineFramer(iter(chunks)).iter_text_lines()) == lines
+
+
+class TestCaptureReplay(object):
+    def test_capture_and_replay(self, tmp_path):
+        capture = HttpCapture(str(tmp_path))
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, 'http://example.com/obj', json={'a': 1})
+            rsps.add(responses.GET, 'http://example.com/binary', body=b'\xff\x00')
+            rsps.add(responses.GET, 'http://example.com/stream', body=b'one\ntwo\n')
+            session = HttpSession(capture=capture)
+            assert session.get('http://example.com/obj').json() == {'a': 1}
+            assert session.get('http://example.com/binary').content == b'\xff\x00'
+            with session.get('http://example.com/stream', stream=True) as stream:
+                assert list(stream.iter_lines()) == [b'one', b'two']
+
+        replay = HttpReplay(str(tmp_path), speed=0)
+        session = HttpSession(replay=replay)
+        assert session.get('http://example.com/obj').json() == {'a': 1}
+        assert session.get('http://example.com/binary').content == b'\xff\x00'
+        with session.get('http://example.com/stream', stream=True) as stream:
+            assert list(stream.iter_lines()) == [b'one', b'two']
+        # polling gets the last recorded response again
+        assert session.get('http://example.com/obj').json() == {'a': 1}
+
+        assert session.get('http://example.com/missing').status_code == http.client.NOT_FOUND
+
+    def test_capture_redacts_credentials(self, tmp_path):
+        capture = HttpCapture(str(tmp_path))
+        location = ('https://oauth.example.com/callback'
+                    '#access_token=secret-token&expires_in=86400&token_type=Bearer')
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, 'http://example.com/oauth/authorize', status=302,
+                     headers={'Location': location, 'Set-Cookie': 'session=secret-cookie',
+                              'Authorization': 'Bearer secret-header'})
+            HttpSession(capture=capture).get('http://example.com/oauth/authorize',
+                                             allow_redirects=False)
+
+        with open(capture.path) as f:
+            captured = f.read()
+        assert 'secret' not in captured
+
+        replay = HttpReplay(str(tmp_path), speed=0)
+        response = HttpSession(replay=replay).get('http://example.com/oauth/authorize',
+                                                  allow_redirects=False)
+        assert response.headers['Location'] == (
+            'https://oauth.example.com/callback'
+            '#access_token=REDACTED&expires_in=REDACTED&token_type=REDACTED')
+        assert response.headers['Set-Cookie'] == 'REDACTED'
+
+    def test_capture_writes_chunks_as_they_arrive(self, tmp_path):
+        capture = HttpCapture(str(tmp_path))
+        with responses.RequestsMock() as rsps:
+            rsps.add(responses.GET, 'http://example.com/stream', body=b'one\ntwo\n')
+            with HttpSession(capture=capture).get('http://example.com/stream',
+                                                  stream=True) as stream:
+                lines = stream.iter_lines()
+                assert next(lines) == b'one'
+                # the stream is still open
+                with open(capture.path) as f:
+                    records = [json.loads(line) for line in f]
+                assert [record.get('chunk_of') for record in records] == [None, 0]
+                assert records[1]['data'] == 'one\ntwo\n'
+                assert list(lines) == [b'two']
+
+    def test_replay_connection_error(self, tmp_path):
+        capture = HttpCapture(str(tmp_path))
+        with responses.RequestsMock():
+            with pytest.raises(OsbsException):
+                HttpSession(capture=capture).get('http://example.com/obj')
+
+        with pytest.raises(OsbsException) as exc_info:
+            HttpSession(replay=HttpReplay(str(tmp_path), speed=0)).get('http://example.com/obj')
+        assert isinstance(exc_info.value.cause, requests.exceptions.ConnectionError)
@@ -0,0 +1,65 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+from flexmock import flexmock
+import pytest
+
+from tests import load_harness
+from tests.fake_openshift import PipelineLifecycle
+from tests.load_harness import PHASES, format_report, main, percentile, run_load
+
+
+@pytest.mark.parametrize(('percent', 'expected'), [
+    (50, 5),
+    (95, 10),
+    (99, 10),
+    (10, 1),
+])
+def test_percentile(percent, expected):
+    assert percentile(list(range(10, 0, -1)), percent) == expected
+
+
+def test_percentile_no_values():
+    assert percentile([], 50) is None
+
+
+def test_run_load():
+    lifecycle = PipelineLifecycle(tasks=('prebuild', 'build'), task_duration=0.02, log_lines=2)
+
+    report = run_load(3, 2, lifecycle=lifecycle, repos=2)
+
+    assert report['succeeded'] == 3
+    assert not report['errors']
+    assert report['log_lines_per_sec'] > 0
+    assert set(report['phases']) == set(PHASES)
+    for phase in PHASES:
+        assert report['phases'][phase]['p50'] <= report['phases'][phase]['p99']
+    assert report['requests']['POST pipelineruns'] == 3
+    assert report['cpu_secs_per_build']['p50'] > 0
+    assert report['rss_bytes']['peak'] >= report['rss_bytes']['baseline']
+    assert 'builds: 3/3 succeeded' in format_report(report)
+
+
+def test_run_load_parallel_tasks():
+    lifecycle = PipelineLifecycle(tasks=('build-x86', 'build-ppc'), task_duration=0.02,
+                                  log_lines=2, parallel_tasks=True)
+
+    report = run_load(2, 2, lifecycle=lifecycle)
+
+    assert report['succeeded'] == 2
+    assert not report['errors']
+    assert report['log_lines_per_sec'] > 0
+
+
+def test_main_json(capsys):
+    # keep logging set up for tests
+    flexmock(load_harness).should_receive('set_logging')
+
+    assert main(['--builds', '1', '--tasks', '1', '--task-duration', '0.01',
+                 '--log-lines', '1', '--json']) == 0
+
+    assert '"succeeded": 1' in capsys.readouterr().out
@@ -0,0 +1,117 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+import os
+
+import pytest
+
+from osbs import metrics
+from osbs.metrics import Registry
+from osbs.tekton import Openshift, PipelineRun, API_VERSION
+from osbs.utils import clone_git_repo
+from tests.fake_openshift import FakeOpenshift, PipelineLifecycle, NAMESPACE
+from tests.load_harness import create_git_repos
+
+
+@pytest.fixture
+def registry():
+    metrics.REGISTRY.clear()
+    yield metrics.REGISTRY
+    metrics.REGISTRY.clear()
+
+
+def test_render():
+    registry = Registry()
+    requests = registry.counter('requests_total', 'Requests', ('method', 'path'))
+    duration = registry.histogram('duration_seconds', 'Duration', buckets=(0.1, 1))
+    registry.counter('unused_total', 'Never incremented')
+
+    requests.inc(method='GET', path='a"b\\c')
+    requests.inc(2, method='GET', path='a"b\\c')
+    requests.inc(method='POST', path='/')
+    duration.observe(0.1)
+    duration.observe(0.5)
+    duration.observe(3)
+
+    assert registry.render() == '''\
+# HELP duration_seconds Duration
+# TYPE duration_seconds histogram
+duration_seconds_bucket{le="0.1"} 1
+duration_seconds_bucket{le="1"} 2
+duration_seconds_bucket{le="+Inf"} 3
+duration_seconds_sum 3.6
+duration_seconds_count 3
+# HELP requests_total Requests
+# TYPE requests_total counter
+requests_total{method="GET",path="a\\"b\\\\c"} 3
+requests_total{method="POST",path="/"} 1
+# HELP unused_total Never incremented
+# TYPE unused_total counter
+'''
+    assert requests.get(method='GET', path='a"b\\c') == 3
+    assert duration.get_count() == 3
+
+
+def test_labels_are_checked():
+    registry = Registry()
+    counter = registry.counter('requests_total', 'Requests', ('method',))
+    with pytest.raises(ValueError):
+        counter.inc()
+    with pytest.raises(ValueError):
+        counter.inc(method='GET', status=200)
+    with pytest.raises(ValueError):
+        registry.counter('requests_total', 'Requests again')
+
+
+def test_write_to_file_and_export(tmp_path):
+    registry = Registry()
+    registry.counter('requests_total', 'Requests').inc()
+    path = tmp_path / 'osbs.prom'
+
+    registry.write_to_file(str(path))
+    exported = []
+    registry.export(exported.append)
+
+    assert path.read_text() == exported[0] == registry.render()
+    assert os.listdir(str(tmp_path)) == ['osbs.prom']
+
+
+def test_api_metrics(registry):
+    lifecycle = PipelineLifecycle(tasks=('prebuild', 'build'), steps=('step-a', 'step-b'),
+                                  task_duration=0.05, log_lines=3)
+    with FakeOpenshift(lifecycle=lifecycle) as server:
+        openshift = Openshift(openshift_api_url=server.url,
+                              openshift_oauth_url=server.url + 'oauth/authorize',
+                              use_auth=False, namespace=NAMESPACE)
+        server.inject_fault('pipelineruns$', status=503, method='POST')
+        pipeline_run = PipelineRun(openshift, 'build-1', {
+            'apiVersion': API_VERSION, 'kind': 'PipelineRun',
+            'metadata': {'name': 'build-1'}, 'spec': {},
+        })
+        pipeline_run.start_pipeline_run()
+        logs = list(pipeline_run.get_logs(follow=True, wait=True))
+        pipeline_run.wait_for_finish()
+
+    assert metrics.HTTP_RETRIES.get(method='POST', resource='pipelineruns') == 1
+    assert metrics.HTTP_RESPONSES.get(method='POST', resource='pipelineruns', status=201) == 1
+    assert metrics.HTTP_REQUEST_DURATION.get_count(method='GET', resource='pods/log') >= 2
+    assert metrics.WATCH_EVENTS.get(resource='pipelineruns', type='MODIFIED') > 0
+    assert metrics.LOG_LINES.get(build='build-1') == len(logs)
+    assert metrics.LOG_BYTES.get(build='build-1') > sum(len(line) for _, line in logs)
+    assert 'osbs_http_request_duration_seconds_bucket{method="GET"' in registry.render()
+
+
+def test_git_metrics(registry, tmp_path):
+    repo = create_git_repos(str(tmp_path), 1)[0]
+
+    clone_git_repo(repo['git_uri'], str(tmp_path / 'clone'), commit=repo['git_ref'])
+    with pytest.raises(Exception):
+        clone_git_repo(repo['git_uri'] + '-missing', str(tmp_path / 'missing'), retry_times=0)
+
+    assert metrics.GIT_OPERATION_DURATION.get_count(operation='clone') == 2
+    assert metrics.GIT_OPERATION_DURATION.get_count(operation='reset') == 1
+    assert metrics.GIT_OPERATION_FAILURES.get(operation='clone') == 1
@@ -0,0 +1,170 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+import os
+import pstats
+import random
+import tracemalloc
+
+from flexmock import flexmock
+import pytest
+
+from osbs import profiling
+from osbs.api import osbsapi
+from osbs.exceptions import OsbsException
+
+
+@pytest.fixture
+def profiler(tmpdir):
+    profiler = profiling.Profiler(str(tmpdir.join('profiles')), cpu=True, memory=True)
+    profiling.set_profiler(profiler)
+    yield profiler
+    profiling.set_profiler(None)
+
+
+def profile_files(profiler, suffix):
+    if not os.path.isdir(profiler.directory):
+        return []
+    return sorted(os.path.join(profiler.directory, name)
+                  for name in os.listdir(profiler.directory) if name.endswith(suffix))
+
+
+def allocate():
+    return [str(number) * 10 for number in range(1000)]
+
+
+def test_profile_writes_cpu_and_memory_profiles(profiler):
+    with profiling.profile('create build'):
+        allocate()
+
+    [prof] = profile_files(profiler, '.prof')
+    [alloc] = profile_files(profiler, '.alloc.txt')
+    assert os.path.basename(prof).endswith('-create_build.prof')
+    stats = pstats.Stats(prof)
+    assert any(function == 'allocate' for _, _, function in stats.stats)
+    with open(alloc) as f:
+        header = f.readline()
+    assert header.startswith('# top ')
+    assert 'create build' in header
+    # tracing is stopped after the call
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_outermost_call_only(profiler):
+    with profiling.profile('outer'):
+        with profiling.profile('inner'):
+            allocate()
+
+    [prof] = profile_files(profiler, '.prof')
+    assert prof.endswith('-outer.prof')
+
+
+def test_profile_on_exception(profiler):
+    with pytest.raises(ValueError):
+        with profiling.profile('failing'):
+            raise ValueError('failed')
+
+    assert len(profile_files(profiler, '.prof')) == 1
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_sampling(profiler):
+    profiler.sample_rate = 0.5
+    flexmock(random).should_receive('random').and_return(0.7).and_return(0.2).one_by_one()
+
+    with profiling.profile('skipped'):
+        pass
+    with profiling.profile('sampled'):
+        pass
+
+    [prof] = profile_files(profiler, '.prof')
+    assert prof.endswith('-sampled.prof')
+
+
+def test_profile_write_failure(profiler, tmpdir, caplog):
+    profiler.directory = str(tmpdir.join('file'))
+    tmpdir.join('file').write('')
+
+    with profiling.profile('call'):
+        pass
+
+    assert 'Failed to write profile of call' in caplog.text
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_setup_failure(profiler, caplog):
+    profiler.cpu = False
+    (flexmock(profiler)
+        .should_receive('_start_tracemalloc')
+        .and_raise(RuntimeError('tracemalloc unavailable')))
+
+    with profiling.profile('call'):
+        allocate()
+
+    assert 'Not tracing allocations of call: tracemalloc unavailable' in caplog.text
+    assert profile_files(profiler, '') == []
+
+
+def test_profile_dump_failure(profiler, caplog):
+    (flexmock(profiler)
+        .should_receive('_write_allocations')
+        .and_raise(RuntimeError('snapshot failed')))
+
+    with profiling.profile('call'):
+        allocate()
+
+    assert 'Failed to write profile of call: snapshot failed' in caplog.text
+    assert len(profile_files(profiler, '.prof')) == 1
+    assert not tracemalloc.is_tracing()
+
+
+def test_osbsapi_is_profiled(profiler):
+    @osbsapi
+    def get_something():
+        return 'something'
+
+    @osbsapi
+    def fail():
+        raise RuntimeError('failed')
+
+    assert get_something() == 'something'
+    with pytest.raises(OsbsException):
+        fail()
+
+    profiles = profile_files(profiler, '.prof')
+    assert [os.path.basename(path).split('-', 3)[-1] for path in profiles] == \
+        ['get_something.prof', 'fail.prof']
+
+
+def test_profiling_disabled():
+    profiling.set_profiler(None)
+
+    with profiling.profile('call'):
+        pass
+
+    assert profiling.get_profiler() is None
+
+
+@pytest.mark.parametrize(('environ', 'expected'), [
+    ({}, None),
+    ({'OSBS_PROFILE': ''}, None),
+    ({'OSBS_PROFILE': 'cpu', 'OSBS_PROFILE_DIR': '/profiles'},
+     {'directory': '/profiles', 'cpu': True, 'memory': False, 'sample_rate': 1.0,
+      'top_allocations': 25}),
+    ({'OSBS_PROFILE': 'cpu, memory', 'OSBS_PROFILE_DIR': '/profiles',
+      'OSBS_PROFILE_SAMPLE_RATE': '0.01', 'OSBS_PROFILE_TOP': '10'},
+     {'directory': '/profiles', 'cpu': True, 'memory': True, 'sample_rate': 0.01,
+      'top_allocations': 10}),
+    ({'OSBS_PROFILE': 'memory', 'OSBS_PROFILE_SAMPLE_RATE': '2'}, None),
+    ({'OSBS_PROFILE': 'memory', 'OSBS_PROFILE_TOP': 'many'}, None),
+])
+def test_from_environment(environ, expected):
+    profiler = profiling.Profiler.from_environment(environ)
+    if expected is None:
+        assert profiler is None
+    else:
+        assert {key: getattr(profiler, key) for key in expected} == expected
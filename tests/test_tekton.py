@@ -5,8 +5,12 @@ All rights reserved.
 This software may be modified and distributed under the terms
 of the BSD license. See the LICENSE file for details.
 """
+import gzip
 import json
+import lzma
+import os
 import re
+import threading
 import time
 import responses
 import pytest
@@ -15,8 +19,13 @@ from copy import deepcopy
 from flexmock import flexmock
 
 from osbs.tekton import (Openshift, PipelineRun, TaskRun, Pod, API_VERSION, WAIT_RETRY_SECS,
-                         WAIT_RETRY)
-from osbs.exceptions import OsbsException
+                         WAIT_RETRY, WATCH_RETRY, WATCH_RETRY_SECS, WATCH_RETRY_MAX_SECS,
+                         WATCH_TIMEOUT_SECS, FAILED_STEP_TAIL_LINES, WatchStop, watch_changes,
+                         merge_timestamped_logs, PARTIAL_OBJECT_METADATA_ACCEPT,
+                         PARTIAL_OBJECT_METADATA_LIST_ACCEPT, wait_for_pipeline_runs,
+                         RunResults, RunStatus)
+from osbs.exceptions import (OsbsException, OsbsValidationException, OsbsResponseException,
+                             OsbsTimeoutException)
 from tests.constants import TEST_PIPELINE_RUN_TEMPLATE, TEST_OCP_NAMESPACE
 
 PIPELINE_NAME = 'source-container-0-1'
@@ -265,6 +274,538 @@ def pod(openshift):
     return Pod(os=openshift, pod_name=POD_NAME, containers=CONTAINERS)
 
 
+class TestOpenshift():
+
+    @responses.activate
+    def test_watch_resource_reconnects_after_server_close(self, openshift):
+        flexmock(time).should_receive('sleep').never()
+        responses.add(responses.GET, PIPELINE_WATCH_URL, json=PIPELINE_RUN_WATCH_JSON)
+        responses.add(responses.GET, PIPELINE_RUN_URL, json=PIPELINE_RUN_JSON)
+
+        watch = openshift.watch_resource('apis', API_VERSION, resource_type='pipelineruns',
+                                         resource_name=PIPELINE_RUN_NAME)
+        assert next(watch) == PIPELINE_RUN_JSON
+        assert next(watch) == PIPELINE_RUN_JSON
+        watch.close()
+
+        watch_calls = [call for call in responses.calls if '/watch/' in call.request.url]
+        assert len(watch_calls) == 2
+        for call in watch_calls:
+            assert f'timeoutSeconds={WATCH_TIMEOUT_SECS}' in call.request.url
+            assert 'allowWatchBookmarks=true' in call.request.url
+
+    @responses.activate
+    def test_watch_resource_reconnects_idle_watch(self, openshift):
+        flexmock(time).should_receive('sleep').never()
+        # idle watches closed by the server more times than failed ones are retried
+        for _ in range(WATCH_RETRY + 1):
+            responses.add(responses.GET, PIPELINE_WATCH_URL, body='')
+        responses.add(responses.GET, PIPELINE_WATCH_URL, json=PIPELINE_RUN_WATCH_JSON)
+        responses.add(responses.GET, PIPELINE_RUN_URL, json=PIPELINE_RUN_JSON)
+
+        watch = openshift.watch_resource('apis', API_VERSION, resource_type='pipelineruns',
+                                         resource_name=PIPELINE_RUN_NAME)
+        assert next(watch) == PIPELINE_RUN_JSON
+        watch.close()
+
+        watch_calls = [call for call in responses.calls if '/watch/' in call.request.url]
+        assert len(watch_calls) == WATCH_RETRY + 2
+
+    @responses.activate
+    def test_watch_resource_backoff_after_error_event(self, openshift):
+        flexmock(time).should_receive('sleep').once()
+        error = {'type': 'ERROR', 'object': {'kind': 'Status', 'code': 500,
+                                             'reason': 'InternalError'}}
+        responses.add(responses.GET, PIPELINE_WATCH_URL, json=error)
+        responses.add(responses.GET, PIPELINE_WATCH_URL, json=PIPELINE_RUN_WATCH_JSON)
+        responses.add(responses.GET, PIPELINE_RUN_URL, json=PIPELINE_RUN_JSON)
+
+        watch = openshift.watch_resource('apis', API_VERSION, resource_type='pipelineruns',
+                                         resource_name=PIPELINE_RUN_NAME)
+        assert next(watch) == PIPELINE_RUN_JSON
+        watch.close()
+
+        # the error event is not reported as a change of the object
+        assert [call.request.url for call in responses.calls][-1] == PIPELINE_RUN_URL
+        assert len(responses.calls) == 3
+
+    @responses.activate
+    def test_watch_resource_skips_bookmarks(self, openshift):
+        bookmark = {"type": "BOOKMARK",
+                    "object": {"kind": "PipelineRun",
+                               "metadata": {"resourceVersion": "12345"}}}
+        body = '\n'.join([json.dumps(bookmark), json.dumps(PIPELINE_RUN_WATCH_JSON)])
+        responses.add(responses.GET, PIPELINE_WATCH_URL, body=body)
+        responses.add(responses.GET, PIPELINE_RUN_URL, json=PIPELINE_RUN_JSON)
+
+        watch = openshift.watch_resource('apis', API_VERSION, resource_type='pipelineruns',
+                                         resource_name=PIPELINE_RUN_NAME)
+        assert next(watch) == PIPELINE_RUN_JSON
+        watch.close()
+
+        # watch + single fresh object
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_watch_resource_backoff_after_errors(self, openshift):
+        delays = []
+        (flexmock(time)
+            .should_receive('sleep')
+            .replace_with(delays.append)
+            .times(WATCH_RETRY - 1))
+        responses.add(responses.GET, PIPELINE_WATCH_URL, status=403)
+
+        watch = openshift.watch_resource('apis', API_VERSION, resource_type='pipelineruns',
+                                         resource_name=PIPELINE_RUN_NAME)
+        assert list(watch) == []
+
+        assert len(responses.calls) == WATCH_RETRY
+        assert all(WATCH_RETRY_SECS <= delay <= WATCH_RETRY_MAX_SECS for delay in delays)
+
+    @responses.activate
+    def test_list_resources_pages(self, openshift):
+        url = f'https://openshift.testing/apis/tekton.dev/v1beta1/namespaces/{TEST_OCP_NAMESPACE}/pipelineruns' # noqa E501
+        first_page = {'metadata': {'continue': 'token1'},
+                      'items': [{'metadata': {'name': 'build-1'}},
+                                {'metadata': {'name': 'build-2'}}]}
+        last_page = {'metadata': {}, 'items': [{'metadata': {'name': 'build-3'}}]}
+        responses.add(responses.GET, url, json=first_page,
+                      match=[responses.matchers.query_param_matcher({
+                          'limit': '2', 'labelSelector': 'app=osbs',
+                          'fieldSelector': 'metadata.namespace=test',
+                      })])
+        responses.add(responses.GET, url, json=last_page,
+                      match=[responses.matchers.query_param_matcher({
+                          'limit': '2', 'labelSelector': 'app=osbs',
+                          'fieldSelector': 'metadata.namespace=test', 'continue': 'token1',
+                      })])
+
+        resources = openshift.list_resources('apis', API_VERSION, 'pipelineruns',
+                                             label_selector='app=osbs',
+                                             field_selector='metadata.namespace=test',
+                                             page_size=2)
+        assert next(resources) == {'metadata': {'name': 'build-1'}}
+        # next page is fetched only once the first one is consumed
+        assert len(responses.calls) == 1
+
+        names = [resource['metadata']['name'] for resource in resources]
+        assert names == ['build-2', 'build-3']
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_list_resources_not_found(self, openshift):
+        url = f'https://openshift.testing/apis/tekton.dev/v1beta1/namespaces/{TEST_OCP_NAMESPACE}/pipelineruns' # noqa E501
+        first_page = {'metadata': {'continue': 'token1'},
+                      'items': [{'metadata': {'name': 'build-1'}}]}
+        responses.add(responses.GET, url, json=first_page)
+        responses.add(responses.GET, url, status=404, json={})
+
+        resources = openshift.list_resources('apis', API_VERSION, 'pipelineruns', page_size=1)
+        assert next(resources) == {'metadata': {'name': 'build-1'}}
+
+        with pytest.raises(OsbsResponseException) as exc:
+            next(resources)
+        assert exc.value.status_code == 404
+
+    @responses.activate
+    def test_list_resources_metadata_only(self, openshift):
+        url = f'https://openshift.testing/apis/tekton.dev/v1beta1/namespaces/{TEST_OCP_NAMESPACE}/pipelineruns' # noqa E501
+        page = {'kind': 'PartialObjectMetadataList', 'metadata': {},
+                'items': [{'kind': 'PartialObjectMetadata', 'metadata': {'name': 'build-1'}}]}
+        responses.add(responses.GET, url, json=page,
+                      match=[responses.matchers.header_matcher({
+                          'Accept': PARTIAL_OBJECT_METADATA_LIST_ACCEPT,
+                      })])
+
+        resources = openshift.list_resources('apis', API_VERSION, 'pipelineruns',
+                                             metadata_only=True)
+
+        assert list(resources) == page['items']
+
+    @responses.activate
+    @pytest.mark.parametrize(('status', 'metadata', 'expected'), [
+        (200, {'kind': 'PartialObjectMetadata', 'metadata': {'name': PIPELINE_RUN_NAME}},
+         {'kind': 'PartialObjectMetadata', 'metadata': {'name': PIPELINE_RUN_NAME}}),
+        (404, {}, None),
+    ])
+    def test_get_metadata(self, openshift, status, metadata, expected):
+        responses.add(responses.GET, PIPELINE_RUN_URL, status=status, json=metadata,
+                      match=[responses.matchers.header_matcher({
+                          'Accept': PARTIAL_OBJECT_METADATA_ACCEPT,
+                      })])
+
+        assert openshift.get_metadata(PIPELINE_RUN_URL) == expected
+        assert PipelineRun(openshift, PIPELINE_RUN_NAME).get_metadata() == expected
+
+    @responses.activate
+    def test_list_resources_empty(self, openshift):
+        url = f'https://openshift.testing/apis/tekton.dev/v1beta1/namespaces/{TEST_OCP_NAMESPACE}/pipelineruns' # noqa E501
+        responses.add(responses.GET, url, json={'metadata': {}, 'items': None})
+
+        assert list(openshift.list_resources('apis', API_VERSION, 'pipelineruns')) == []
+
+    @responses.activate
+    def test_delete_collection(self, openshift):
+        url = f'https://openshift.testing/apis/tekton.dev/v1beta1/namespaces/{TEST_OCP_NAMESPACE}/pipelineruns' # noqa E501
+        deleted = {'kind': 'PipelineRunList', 'metadata': {},
+                   'items': [{'metadata': {'name': 'build-1'}}]}
+        responses.add(responses.DELETE, url, json=deleted,
+                      match=[responses.matchers.query_param_matcher({
+                          'labelSelector': 'koji-task-id=123',
+                      })])
+
+        assert openshift.delete_collection('apis', API_VERSION, 'pipelineruns',
+                                           label_selector='koji-task-id=123') == deleted['items']
+
+    def test_delete_collection_requires_selector(self, openshift):
+        with pytest.raises(OsbsValidationException):
+            openshift.delete_collection('apis', API_VERSION, 'pipelineruns', label_selector='')
+
+    @responses.activate
+    def test_get_resource_version(self, openshift):
+        url = f'https://openshift.testing/apis/tekton.dev/v1beta1/namespaces/{TEST_OCP_NAMESPACE}/pipelineruns' # noqa E501
+        responses.add(responses.GET, url,
+                      json={'kind': 'PartialObjectMetadataList',
+                            'metadata': {'resourceVersion': '100'}, 'items': []},
+                      match=[responses.matchers.query_param_matcher({'limit': '1'}),
+                             responses.matchers.header_matcher({
+                                 'Accept': PARTIAL_OBJECT_METADATA_LIST_ACCEPT,
+                             })])
+
+        assert openshift.get_resource_version('apis', API_VERSION, 'pipelineruns') == '100'
+
+    @responses.activate
+    def test_watch_collection_resumes(self, openshift):
+        flexmock(time).should_receive('sleep').never()
+        url = f'https://openshift.testing/apis/tekton.dev/v1beta1/watch/namespaces/{TEST_OCP_NAMESPACE}/pipelineruns/' # noqa E501
+
+        def event(event_type, name, resource_version):
+            return json.dumps({'type': event_type,
+                               'object': {'metadata': {'name': name,
+                                                       'resourceVersion': resource_version}}})
+
+        first = '\n'.join([event('MODIFIED', 'build-1', '101'),
+                           event('BOOKMARK', '', '105')])
+        second = event('DELETED', 'build-2', '106')
+        responses.add(responses.GET, url, body=first,
+                      match=[responses.matchers.query_param_matcher({
+                          'resourceVersion': '100', 'allowWatchBookmarks': 'true',
+                          'timeoutSeconds': str(WATCH_TIMEOUT_SECS),
+                      })])
+        responses.add(responses.GET, url, body=second,
+                      match=[responses.matchers.query_param_matcher({
+                          'resourceVersion': '105', 'allowWatchBookmarks': 'true',
+                          'timeoutSeconds': str(WATCH_TIMEOUT_SECS),
+                      })])
+
+        watch = openshift.watch_collection('apis', API_VERSION, 'pipelineruns', '100')
+
+        event_type, obj = next(watch)
+        assert (event_type, obj['metadata']['name']) == ('MODIFIED', 'build-1')
+        event_type, obj = next(watch)
+        assert (event_type, obj['metadata']['name']) == ('DELETED', 'build-2')
+        watch.close()
+
+    @responses.activate
+    def test_watch_collection_reconnects_idle_watch(self, openshift):
+        flexmock(time).should_receive('sleep').never()
+        url = f'https://openshift.testing/apis/tekton.dev/v1beta1/watch/namespaces/{TEST_OCP_NAMESPACE}/pipelineruns/' # noqa E501
+        for _ in range(WATCH_RETRY + 1):
+            responses.add(responses.GET, url, body='')
+        responses.add(responses.GET, url, json={
+            'type': 'ADDED', 'object': {'metadata': {'name': 'build-1',
+                                                     'resourceVersion': '101'}}})
+
+        watch = openshift.watch_collection('apis', API_VERSION, 'pipelineruns', '100')
+
+        event_type, obj = next(watch)
+        assert (event_type, obj['metadata']['name']) == ('ADDED', 'build-1')
+        watch.close()
+        assert len(responses.calls) == WATCH_RETRY + 2
+
+    @responses.activate
+    def test_watch_collection_expired(self, openshift):
+        url = f'https://openshift.testing/apis/tekton.dev/v1beta1/watch/namespaces/{TEST_OCP_NAMESPACE}/pipelineruns/' # noqa E501
+        error = {'type': 'ERROR', 'object': {'kind': 'Status', 'code': 410,
+                                             'reason': 'Expired'}}
+        responses.add(responses.GET, url, json=error)
+
+        with pytest.raises(OsbsResponseException) as exc_info:
+            list(openshift.watch_collection('apis', API_VERSION, 'pipelineruns', '1'))
+        assert exc_info.value.status_code == 410
+
+
+class TestWaitForPipelineRuns():
+
+    @staticmethod
+    def pipeline_run(name, status='Unknown'):
+        return {'metadata': {'name': name},
+                'status': {'conditions': [{'status': status, 'reason': 'Running'}]}}
+
+    @staticmethod
+    def mock_get_info(monkeypatch, infos):
+        def get_info(pipeline_run, wait=False):
+            return infos[pipeline_run.pipeline_run_name]
+
+        monkeypatch.setattr(PipelineRun, 'get_info', get_info)
+
+    def test_completion_order(self, openshift, monkeypatch):
+        self.mock_get_info(monkeypatch, {
+            'build-1': self.pipeline_run('build-1'),
+            'build-2': self.pipeline_run('build-2'),
+            'build-3': self.pipeline_run('build-3', 'False'),
+            'build-4': None,
+        })
+        (flexmock(openshift)
+            .should_receive('get_resource_version')
+            .and_return('100')
+            .once())
+        events = [
+            ('MODIFIED', self.pipeline_run('build-1')),
+            ('MODIFIED', self.pipeline_run('other', 'True')),
+            ('MODIFIED', self.pipeline_run('build-2', 'True')),
+            ('DELETED', self.pipeline_run('build-1')),
+        ]
+        (flexmock(openshift)
+            .should_receive('watch_collection')
+            .with_args('apis', API_VERSION, 'pipelineruns', '100', timeout=None)
+            .and_return(iter(events))
+            .once())
+
+        finished = [(name, info and info['status']['conditions'][0]['status'])
+                    for name, info in wait_for_pipeline_runs(
+                        openshift, ['build-1', 'build-2', 'build-3', 'build-4'])]
+
+        assert finished == [('build-3', 'False'), ('build-4', None),
+                            ('build-2', 'True'), ('build-1', 'Unknown')]
+
+    def test_resync_after_expired_watch(self, openshift, monkeypatch):
+        infos = {'build-1': self.pipeline_run('build-1')}
+        self.mock_get_info(monkeypatch, infos)
+        (flexmock(openshift)
+            .should_receive('get_resource_version')
+            .and_return('100')
+            .and_return('200')
+            .times(2))
+
+        def watch_collection(api_path, api_version, resource_type, resource_version,
+                             timeout=None):
+            # build finished while the watch was not running
+            infos['build-1'] = self.pipeline_run('build-1', 'True')
+            raise OsbsResponseException('expired', 410)
+            yield  # pragma: no cover
+
+        flexmock(openshift).should_receive('watch_collection').replace_with(watch_collection)
+
+        finished = list(wait_for_pipeline_runs(openshift, ['build-1']))
+
+        assert finished == [('build-1', self.pipeline_run('build-1', 'True'))]
+
+    def test_timeout(self, openshift, monkeypatch):
+        self.mock_get_info(monkeypatch, {'build-1': self.pipeline_run('build-1')})
+        flexmock(openshift).should_receive('get_resource_version').and_return('100')
+        (flexmock(openshift)
+            .should_receive('watch_collection')
+            .and_return(iter([])))
+
+        with pytest.raises(OsbsTimeoutException):
+            list(wait_for_pipeline_runs(openshift, ['build-1'], timeout=0))
+
+
+class TestWatchChanges():
+
+    def test_filter(self):
+        def status(reason):
+            return {'status': {'conditions': [{'status': 'Unknown', 'reason': reason}]}}
+
+        watch = [status('Started'), status('Started'), {}, status('Running'), status('Running')]
+
+        def projection(obj):
+            return obj['status']['conditions'][0]['reason']
+
+        assert list(watch_changes(watch, projection)) == [
+            status('Started'), {}, status('Running'),
+        ]
+
+    def test_coalesce(self):
+        burst_yielded = threading.Event()
+
+        def watch():
+            yield 1
+            yield 2
+            yield 3
+            # the next object comes only after the end of the burst
+            burst_yielded.wait()
+            yield 4
+
+        changes = watch_changes(watch(), lambda obj: obj, coalesce_secs=0.5)
+        # the first object of a burst right away, then the latest one of the rest
+        assert next(changes) == 1
+        assert next(changes) == 3
+        burst_yielded.set()
+        assert list(changes) == [4]
+
+    def test_coalesce_stop(self):
+        stop = WatchStop()
+        response = flexmock()
+        response.should_receive('abort').once()
+
+        def watch():
+            stop.attach(response)
+            yield 1
+            yield 2
+
+        changes = watch_changes(watch(), lambda obj: obj, coalesce_secs=0.5, stop=stop)
+        assert next(changes) == 1
+        changes.close()
+
+        assert stop.is_set()
+
+    def test_coalesce_error(self):
+        def watch():
+            yield 1
+            raise OsbsException('watch failed')
+
+        changes = watch_changes(watch(), lambda obj: obj, coalesce_secs=0.2)
+        assert next(changes) == 1
+        with pytest.raises(OsbsException, match='watch failed'):
+            next(changes)
+
+
+class TestMergeTimestampedLogs():
+    def test_merge(self):
+        logs = [
+            ('x86_64', '2022-04-26T15:58:42.1Z x1'),
+            ('x86_64', '2022-04-26T15:58:43Z x2'),
+            ('aarch64', '2022-04-26T15:58:42.05Z a1'),
+            ('aarch64', '2022-04-26T15:58:42.12Z a2'),
+            ('aarch64', 'not timestamped'),
+            ('x86_64', '2022-04-26T15:58:43.000000001Z x3'),
+            ('aarch64', '2022-04-26T15:58:44Z '),
+        ]
+
+        merged = list(merge_timestamped_logs(iter(logs)))
+
+        assert merged == [
+            ('aarch64', 'a1'),
+            ('x86_64', 'x1'),
+            ('aarch64', 'a2'),
+            ('aarch64', 'not timestamped'),
+            ('x86_64', 'x2'),
+            ('x86_64', 'x3'),
+            ('aarch64', ''),
+        ]
+
+    def test_merge_window(self):
+        logs = [
+            ('late', '2022-04-26T15:58:40Z late'),
+            ('a', '2022-04-26T15:58:41Z a1'),
+            ('a', '2022-04-26T15:58:43Z a2'),
+            ('b', '2022-04-26T15:58:42Z b1'),
+            ('late', '2022-04-26T15:58:39Z too late'),
+        ]
+
+        merged = list(merge_timestamped_logs(logs, window=2))
+
+        # lines are released once more than 2 are buffered,
+        # a line later by more than the window is not reordered past them
+        assert [line for _, line in merged] == ['late', 'a1', 'too late', 'b1', 'a2']
+
+    def test_merge_max_delay(self):
+        logs = [
+            ('a', '2022-04-26T15:58:41Z a1'),
+            ('b', '2022-04-26T15:58:40Z b1'),
+            ('a', '2022-04-26T15:58:43Z a2'),
+            ('b', '2022-04-26T15:58:42Z b2'),
+            ('a', '2022-04-26T15:58:44Z a3'),
+        ]
+        # seconds when lines arrive, the source stalls before a2 and a3
+        (flexmock(time)
+            .should_receive('monotonic')
+            .and_return(0, 0.5, 10, 10.5, 11)
+            .one_by_one())
+
+        consumed = []
+
+        def source():
+            for task_name, line in logs:
+                consumed.append(line)
+                yield task_name, line
+
+        merged = merge_timestamped_logs(source(), window=10, max_delay=2)
+
+        # lines buffered for longer than 2 seconds are released with the next line,
+        # the window is not full yet
+        assert next(merged) == ('b', 'b1')
+        assert next(merged) == ('a', 'a1')
+        assert len(consumed) == 3
+        assert list(merged) == [('b', 'b2'), ('a', 'a2'), ('a', 'a3')]
+
+
+class TestRunStatus():
+    def test_results_decoded_lazily(self):
+        results = RunResults([{'name': 'json', 'value': '{"a": 1}'},
+                              {'name': 'plain', 'value': 'not json'}])
+
+        assert results.raw == {'json': '{"a": 1}', 'plain': 'not json'}
+        assert len(results) == 2
+
+        # each value is decoded once, on first access
+        (flexmock(json)
+            .should_call('loads')
+            .times(2))
+        assert results['json'] == {'a': 1}
+        assert results['json'] is results['json']
+        assert dict(results) == {'json': {'a': 1}, 'plain': 'not json'}
+        assert results['plain'] == 'not json'
+
+    def test_task_run_status(self):
+        task_run = deepcopy(TASK_RUN_JSON)
+        task_run['metadata']['name'] = 'task-run-1'
+        task_run['status'].update({
+            'podName': 'pod-1',
+            'completionTime': '2022-04-26T15:58:42Z',
+            'steps': [{'container': 'step-ok', 'terminated': {'exitCode': 0}},
+                      {'container': 'step-bad', 'terminated': {'exitCode': 1}}],
+            'taskResults': [{'name': 'result', 'value': '"value"'}],
+        })
+        task_run['status']['conditions'] = [{'status': 'False', 'reason': 'Failed',
+                                             'message': 'oops'}]
+
+        status = RunStatus(task_run)
+
+        assert status.name == 'task-run-1'
+        assert status.pipeline_task == 'short-sleep'
+        assert status.status == 'False'
+        assert status.reason == 'Failed'
+        assert status.message == 'oops'
+        assert status.finished
+        assert status.pod_name == 'pod-1'
+        assert status.failed_step_containers == ['step-bad']
+        assert status.results.raw == {'result': '"value"'}
+        assert status.results['result'] == 'value'
+        assert not hasattr(status, '__dict__')
+
+    def test_pipeline_run_status(self):
+        pipeline_run = {
+            'metadata': {'name': 'run', 'resourceVersion': '1'},
+            'status': {
+                'childReferences': [{'name': 'tr1', 'kind': 'TaskRun'},
+                                    {'name': 'run1', 'kind': 'Run'}],
+                'pipelineResults': [{'name': 'result', 'value': '{}'}],
+            },
+        }
+
+        status = RunStatus(pipeline_run)
+
+        assert status.task_run_names == ('tr1',)
+        assert status.resource_version == '1'
+        assert not status.has_conditions
+        assert status.status is None
+        assert not status.finished
+        assert dict(status.results) == {'result': {}}
+
+
 class TestPod():
 
     @responses.activate
@@ -327,6 +868,86 @@ class TestPod():
         assert len(responses.calls) == 3
         assert logs == EXPECTED_LOGS
 
+    @responses.activate
+    def test_get_logs_tail(self, pod):
+        for container in CONTAINERS:
+            url = f"{POD_URL}/log?container={container}&tailLines=10&limitBytes=2048"
+            responses.add(responses.GET, url, body=EXPECTED_LOGS[container],
+                          match=[responses.matchers.query_param_matcher({
+                              'container': container, 'tailLines': '10', 'limitBytes': '2048',
+                          })])
+        logs = pod.get_logs(tail_lines=10, limit_bytes=2048)
+
+        assert len(responses.calls) == 3
+        assert logs == EXPECTED_LOGS
+
+    @responses.activate
+    def test_get_logs_timestamps(self, pod):
+        for container in CONTAINERS:
+            url = f"{POD_URL}/log?container={container}&timestamps=true"
+            responses.add(responses.GET, url, body=EXPECTED_LOGS[container],
+                          match=[responses.matchers.query_param_matcher({
+                              'container': container, 'timestamps': 'true',
+                          })])
+        logs = pod.get_logs(timestamps=True)
+
+        assert len(responses.calls) == 3
+        assert logs == EXPECTED_LOGS
+
+    @responses.activate
+    def test_get_logs_stream_tail(self, openshift):
+        for container in CONTAINERS:
+            url = f"{POD_URL}/log?follow=True&container={container}&tailLines=10"
+            responses.add(responses.GET, url, body=EXPECTED_LOGS[container],
+                          match=[responses.matchers.query_param_matcher({
+                              'follow': 'True', 'container': container, 'tailLines': '10',
+                          })])
+        pod = Pod(os=openshift, pod_name=POD_NAME, containers=CONTAINERS, started=True)
+
+        logs = list(pod.get_logs(follow=True, tail_lines=10))
+
+        assert logs == ['Hello World', 'Bye World']
+
+    @responses.activate
+    @pytest.mark.parametrize(('compress', 'opener', 'suffix'), [
+        (None, open, ''),
+        ('gzip', gzip.open, '.gz'),
+        ('xz', lzma.open, '.xz'),
+    ])
+    def test_download_logs(self, pod, tmpdir, compress, opener, suffix):
+        for container in CONTAINERS:
+            url = f"{POD_URL}/log?container={container}"
+            responses.add(responses.GET, url, body=EXPECTED_LOGS[container],
+                          match=[responses.matchers.request_kwargs_matcher({"stream": True})])
+        directory = os.path.join(tmpdir, 'logs')
+
+        manifest = pod.download_logs(directory, compress=compress)
+
+        assert len(responses.calls) == 3
+        assert set(manifest) == set(CONTAINERS)
+        for container, log in EXPECTED_LOGS.items():
+            path = os.path.join(directory, f"{POD_NAME}-{container}.log{suffix}")
+            assert manifest[container] == {'path': path,
+                                           'bytes': len(log.encode('utf-8')),
+                                           'lines': log.count('\n')}
+            with opener(path, 'rb') as f:
+                assert f.read().decode('utf-8') == log
+
+    @responses.activate
+    def test_download_logs_unterminated_line(self, openshift, tmpdir):
+        url = f"{POD_URL}/log?container=step-build"
+        responses.add(responses.GET, url, body='one\ntwo\nthree')
+        pod = Pod(os=openshift, pod_name=POD_NAME, containers=['step-build'])
+
+        manifest = pod.download_logs(str(tmpdir), prefix='build')
+
+        path = os.path.join(tmpdir, 'build-step-build.log')
+        assert manifest == {'step-build': {'path': path, 'bytes': 13, 'lines': 3}}
+
+    def test_download_logs_unknown_compression(self, pod, tmpdir):
+        with pytest.raises(OsbsValidationException):
+            pod.download_logs(str(tmpdir), compress='zip')
+
     @responses.activate
     def test_get_logs_stream(self, pod):
         responses.add(
@@ -349,6 +970,50 @@ class TestPod():
         assert len(responses.calls) == 5
         assert logs == ['Hello World', 'Bye World']
 
+    @responses.activate
+    def test_get_logs_stream_bytes(self, openshift):
+        for container in CONTAINERS:
+            url = f"{POD_URL}/log?follow=True&container={container}"
+            responses.add(
+                responses.GET,
+                url,
+                body=EXPECTED_LOGS[container],
+                match=[responses.matchers.request_kwargs_matcher({"stream": True})],
+            )
+        pod = Pod(os=openshift, pod_name=POD_NAME, containers=CONTAINERS, started=True)
+
+        logs = list(pod.get_logs(wait=True, follow=True, decode=False))
+
+        assert logs == [b'Hello World\n', b'Bye World\n']
+
+    @responses.activate
+    def test_get_logs_stream_started(self, openshift):
+        flexmock(Openshift).should_receive('watch_resource').never()
+        for container in CONTAINERS:
+            url = f"{POD_URL}/log?follow=True&container={container}"
+            responses.add(
+                responses.GET,
+                url,
+                body=EXPECTED_LOGS[container],
+                match=[responses.matchers.request_kwargs_matcher({"stream": True})],
+            )
+        pod = Pod(os=openshift, pod_name=POD_NAME, containers=CONTAINERS, started=True)
+
+        logs = [line for line in pod.get_logs(wait=True, follow=True)]
+
+        assert len(responses.calls) == 3
+        assert logs == ['Hello World', 'Bye World']
+
+    @responses.activate
+    def test_get_logs_stream_started_removed(self, openshift):
+        flexmock(Openshift).should_receive('watch_resource').never()
+        responses.add(responses.GET, f"{POD_URL}/log?follow=True&container={CONTAINERS[0]}",
+                      status=404, json={'kind': 'Status', 'code': 404})
+        pod = Pod(os=openshift, pod_name=POD_NAME, containers=CONTAINERS, started=True)
+
+        assert list(pod.get_logs(wait=True, follow=True)) == []
+        assert len(responses.calls) == 1
+
     @responses.activate
     def test_get_logs_stream_removed(self, pod):
         def custom_watch(api_path, api_version, resource_type, resource_name,
@@ -440,6 +1105,31 @@ class TestTaskRun():
         logs = [line for line in task_run.get_logs(follow=True, wait=True)]
         assert logs == ['Hello World', 'Bye World']
 
+    @responses.activate
+    def test_get_logs_wait_pod_started(self, task_run):
+        started_task_run = deepcopy(TASK_RUN_JSON)
+        started_task_run['status']['steps'][0]['terminated'] = {'exitCode': 0}
+        started_task_run['status']['steps'][1]['running'] = {}
+        responses.add(
+            responses.GET,
+            TASK_RUN_WATCH_URL,
+            json={"type": "ADDED", "object": started_task_run},
+        )
+        responses.add(responses.GET, TASK_RUN_URL, json=started_task_run)
+        for container in CONTAINERS:
+            url = f"{POD_URL}/log?follow=True&container={container}"
+            responses.add(
+                responses.GET,
+                url,
+                body=EXPECTED_LOGS[container],
+                match=[responses.matchers.request_kwargs_matcher({"stream": True})],
+            )
+
+        logs = [line for line in task_run.get_logs(follow=True, wait=True)]
+        assert logs == ['Hello World', 'Bye World']
+        # task run watch + task run + 3 containers, pod is not watched
+        assert len(responses.calls) == 5
+
     @responses.activate
     def test_get_logs_wait_removed(self, task_run):
         def custom_watch(api_path, api_version, resource_type, resource_name,
@@ -481,6 +1171,7 @@ class TestPipelineRun():
                 req_body = json.loads(responses.calls[0].request.body)
                 if new_input_data:
                     assert req_body['metadata']['name'] == run_name_in_input
+                assert p_run.timings.get('create') is not None
             else:
                 msg = f"Pipeline run name provided '{PIPELINE_RUN_NAME}' is different " \
                       f"than in input data '{run_name_in_input}'"
@@ -766,7 +1457,7 @@ class TestPipelineRun():
 
         resp = pipeline_run.get_error_message()
 
-        assert len(responses.calls) == (4 + 2*len(tasks_json) if pipeline_json else 1)
+        assert len(responses.calls) == (1 + len(tasks_json) if pipeline_json else 1)
         assert resp == error_lines
 
     @responses.activate
@@ -860,6 +1551,131 @@ class TestPipelineRun():
         assert succeeded == pipeline_run.has_succeeded()
         assert pipeline_run.status_reason == reason
 
+    @responses.activate
+    def test_build_report_succeeded(self, pipeline_run):
+        prun_json = deepcopy(PIPELINE_RUN_JSON)
+        prun_json['status']['conditions'] = [{'status': 'True', 'reason': 'Succeeded'}]
+        prun_json['status']['childReferences'] = [{'name': TASK_RUN_NAME, 'kind': 'TaskRun'}]
+        prun_json['status']['pipelineResults'] = [{'name': 'repositories',
+                                                   'value': '{"primary": ["r1"]}'},
+                                                  {'name': 'empty', 'value': 'null'}]
+        taskrun_json = deepcopy(TASK_RUN_JSON)
+        taskrun_json['metadata']['labels']['tekton.dev/pipelineTask'] = \
+            'binary-container-prebuild'
+        taskrun_json['status'] = {
+            'conditions': [{'status': 'True', 'reason': 'Succeeded'}],
+            'startTime': '2022-04-26T15:58:10Z',
+            'completionTime': '2022-04-26T15:58:42Z',
+            'taskResults': [{'name': 'platforms_result', 'value': '{"platforms": ["x86_64"]}'}],
+        }
+        responses.add(responses.GET, PIPELINE_RUN_URL, json=prun_json)
+        responses.add(responses.GET, TASK_RUN_URL, json=taskrun_json)
+
+        report = pipeline_run.build_report()
+
+        # pipeline run and its task run are fetched only once
+        assert len(responses.calls) == 2
+        assert report.name == PIPELINE_RUN_NAME
+        assert report.info == prun_json
+        assert report.reason == 'Succeeded'
+        assert report.succeeded
+        assert report.finished
+        assert not report.cancelled
+        assert not report.any_task_failed
+        assert not report.any_task_cancelled
+        assert report.error_message is None
+        assert report.final_platforms == ['x86_64']
+        assert report.task_results == {
+            'binary-container-prebuild': {'platforms_result': '{"platforms": ["x86_64"]}'},
+        }
+        assert report.pipeline_results == {'repositories': {'primary': ['r1']}}
+        assert report.task_times == {
+            'binary-container-prebuild': {'start_time': '2022-04-26T15:58:10Z',
+                                          'completion_time': '2022-04-26T15:58:42Z'},
+        }
+
+    @responses.activate
+    def test_build_report_failed(self, pipeline_run):
+        prun_json = deepcopy(PIPELINE_RUN_JSON)
+        prun_json['status']['conditions'] = [{'status': 'False', 'reason': 'Failed'}]
+        prun_json['status']['childReferences'] = [{'name': TASK_RUN_NAME, 'kind': 'TaskRun'}]
+        taskrun_json = deepcopy(TASK_RUN_JSON)
+        taskrun_json['status'] = {
+            'conditions': [{'status': 'False', 'reason': 'Failed', 'message': 'task error'}],
+            'completionTime': '2022-04-26T15:58:42Z',
+        }
+        responses.add(responses.GET, PIPELINE_RUN_URL, json=prun_json)
+        responses.add(responses.GET, TASK_RUN_URL, json=taskrun_json)
+
+        report = pipeline_run.build_report()
+
+        assert len(responses.calls) == 2
+        assert not report.succeeded
+        assert report.finished
+        assert report.any_task_failed
+        assert report.error_message == 'Error in short-sleep: task error;\n'
+        assert report.final_platforms is None
+
+    @responses.activate
+    def test_child_references(self, pipeline_run):
+        task_run_reference = {'apiVersion': 'tekton.dev/v1beta1', 'kind': 'TaskRun',
+                              'name': TASK_RUN_NAME, 'pipelineTaskName': 'prebuild'}
+        prun_json = deepcopy(PIPELINE_RUN_JSON)
+        prun_json['status']['childReferences'] = [
+            task_run_reference,
+            {'apiVersion': 'tekton.dev/v1alpha1', 'kind': 'Run', 'name': 'custom-run'},
+        ]
+        responses.add(responses.GET, PIPELINE_RUN_URL, json=prun_json)
+
+        assert pipeline_run.child_references == [task_run_reference]
+
+    @responses.activate
+    def test_get_task_results_empty(self, pipeline_run):
+        prun_json = deepcopy(PIPELINE_RUN_JSON)
+        prun_json['status']['childReferences'] = [{'name': TASK_RUN_NAME, 'kind': 'TaskRun'},
+                                                  {'name': TASK_RUN_NAME2, 'kind': 'TaskRun'}]
+        with_empty_results = deepcopy(TASK_RUN_JSON)
+        with_empty_results['metadata']['labels']['tekton.dev/pipelineTask'] = 'prebuild'
+        with_empty_results['status'] = {'taskResults': []}
+        without_results = deepcopy(TASK_RUN_JSON)
+        without_results['metadata']['labels']['tekton.dev/pipelineTask'] = 'build'
+        without_results['status'] = {}
+        responses.add(responses.GET, PIPELINE_RUN_URL, json=prun_json)
+        responses.add(responses.GET, TASK_RUN_URL, json=with_empty_results)
+        responses.add(responses.GET, TASK_RUN_URL2, json=without_results)
+
+        # tasks which reported no results are there, tasks without results are not
+        assert pipeline_run.get_task_results() == {'prebuild': {}}
+
+    @pytest.mark.parametrize('conditions', [
+        [],
+        [{'status': 'Unknown', 'reason': 'Running'}],
+    ])
+    @responses.activate
+    def test_build_report_not_finished(self, pipeline_run, conditions):
+        prun_json = deepcopy(PIPELINE_RUN_JSON)
+        prun_json['status'] = {'conditions': conditions}
+        responses.add(responses.GET, PIPELINE_RUN_URL, json=prun_json)
+
+        report = pipeline_run.build_report()
+
+        assert not report.finished
+        assert not report.succeeded
+        assert not report.cancelled
+        assert report.error_message is None
+
+    @responses.activate
+    def test_build_report_removed(self, pipeline_run):
+        responses.add(responses.GET, PIPELINE_RUN_URL, status=404)
+
+        report = pipeline_run.build_report()
+
+        assert report.info is None
+        assert not report.succeeded
+        assert report.finished
+        assert report.error_message == 'pipeline run removed;'
+        assert report.task_times == {}
+
     @pytest.mark.parametrize(
         'any_failed, any_canceled, task_run_states',
         [
@@ -1060,10 +1876,12 @@ class TestPipelineRun():
             json=PIPELINE_RUN_WATCH_JSON,
         )
         responses.add(responses.GET, PIPELINE_RUN_URL, json=PIPELINE_RUN_JSON)
+        pipeline_run.timings.mark('created')
         resp = pipeline_run.wait_for_start()
 
         assert len(responses.calls) == 2
         assert resp == PIPELINE_RUN_JSON
+        assert pipeline_run.timings.get('time_to_start') is not None
 
     @responses.activate
     @pytest.mark.parametrize(('get_info_json', 'calls'), [
@@ -1156,6 +1974,111 @@ class TestPipelineRun():
                             TASK_RUN_JSON['metadata']['labels']['tekton.dev/pipelineTask']:
                             EXPECTED_LOGS}
 
+    def test_get_logs_merged(self, pipeline_run):
+        logs = [
+            ('x86_64', '2022-04-26T15:58:43Z x1'),
+            ('aarch64', '2022-04-26T15:58:42Z a1'),
+        ]
+        (flexmock(pipeline_run)
+         .should_receive('_get_logs_stream')
+         .with_args(tail_lines=None, limit_bytes=None, timestamps=True)
+         .and_return(iter(logs)))
+
+        merged = list(pipeline_run.get_logs(follow=True, merged=True))
+
+        assert merged == [('aarch64', 'a1'), ('x86_64', 'x1')]
+
+    @responses.activate
+    def test_get_failed_steps_logs(self, pipeline_run):
+        failed_task_run = deepcopy(TASK_RUN_JSON)
+        failed_task_run['status']['conditions'][0].update({'status': 'False',
+                                                           'reason': 'Failed'})
+        failed_task_run['status']['completionTime'] = '2022-04-26T15:58:42Z'
+        failed_task_run['status']['steps'] = [
+            {'container': 'step-hello', 'terminated': {'exitCode': 0}},
+            {'container': 'step-wait', 'terminated': {'exitCode': 1}},
+            {'container': 'step-bye', 'terminated': {'exitCode': 0}},
+        ]
+        responses.add(responses.GET, PIPELINE_RUN_URL, json=PIPELINE_RUN_JSON)
+        responses.add(responses.GET, TASK_RUN_URL, json=failed_task_run)
+        responses.add(responses.GET, TASK_RUN_URL2, json=TASK_RUN_JSON2)
+        url = f"{POD_URL}/log?container=step-wait&tailLines={FAILED_STEP_TAIL_LINES}"
+        responses.add(responses.GET, url, body='error\n',
+                      match=[responses.matchers.query_param_matcher({
+                          'container': 'step-wait', 'tailLines': str(FAILED_STEP_TAIL_LINES),
+                      })])
+
+        logs = pipeline_run.get_failed_steps_logs()
+
+        # pipeline = 2, tasks = 2, failed step = 1
+        assert len(responses.calls) == 5
+        assert logs == {'short-sleep': {'step-wait': 'error\n'}}
+
+    @responses.activate
+    def test_get_failed_steps_logs_removed(self, pipeline_run):
+        responses.add(responses.GET, PIPELINE_RUN_URL, json={})
+
+        assert pipeline_run.get_failed_steps_logs() is None
+
+    @responses.activate
+    @pytest.mark.parametrize(('get_json', 'empty_logs'), [
+        (PIPELINE_RUN_JSON, False),
+        ({}, True),
+    ])
+    def test_download_logs(self, pipeline_run, tmpdir, get_json, empty_logs):
+        responses.add(responses.GET, PIPELINE_RUN_URL, json=get_json)
+        responses.add(responses.GET, TASK_RUN_URL, json=TASK_RUN_JSON)
+        responses.add(responses.GET, TASK_RUN_URL2, json=TASK_RUN_JSON2)
+
+        for container in CONTAINERS:
+            url = f"{POD_URL}/log?container={container}"
+            responses.add(responses.GET, url, body=EXPECTED_LOGS[container])
+        for container in CONTAINERS2:
+            url = f"{POD_URL2}/log?container={container}"
+            responses.add(responses.GET, url, body=EXPECTED_LOGS2[container])
+        directory = str(tmpdir)
+
+        manifest = pipeline_run.download_logs(directory, compress='gzip')
+
+        if empty_logs:
+            assert len(responses.calls) == 1
+            assert manifest is None
+            assert os.listdir(directory) == []
+            return
+
+        assert len(responses.calls) == 10
+        expected = {
+            TASK_RUN_JSON['metadata']['labels']['tekton.dev/pipelineTask']: EXPECTED_LOGS,
+            TASK_RUN_JSON2['metadata']['labels']['tekton.dev/pipelineTask']: EXPECTED_LOGS2,
+        }
+        assert set(manifest) == set(expected)
+        for task_name, logs in expected.items():
+            assert set(manifest[task_name]) == set(logs)
+            for container, log in logs.items():
+                entry = manifest[task_name][container]
+                assert entry['path'] == os.path.join(directory,
+                                                     f"{task_name}-{container}.log.gz")
+                assert entry['bytes'] == len(log)
+                assert entry['lines'] == len(log.splitlines())
+                with gzip.open(entry['path'], 'rt') as f:
+                    assert f.read() == log
+
+    @responses.activate
+    def test_download_logs_skips_missing_task_runs(self, pipeline_run, tmpdir):
+        without_pod = deepcopy(TASK_RUN_JSON2)
+        del without_pod['status']['podName']
+        responses.add(responses.GET, PIPELINE_RUN_URL, json=PIPELINE_RUN_JSON)
+        responses.add(responses.GET, TASK_RUN_URL, status=404, json={})
+        responses.add(responses.GET, TASK_RUN_URL2, json=without_pod)
+
+        manifest = pipeline_run.download_logs(str(tmpdir))
+
+        assert manifest == {
+            TASK_RUN_NAME: {},
+            TASK_RUN_JSON2['metadata']['labels']['tekton.dev/pipelineTask']: {},
+        }
+        assert os.listdir(str(tmpdir)) == []
+
     @responses.activate
     def test_get_logs_stream(self, pipeline_run):
         responses.add(
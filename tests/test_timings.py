@@ -0,0 +1,54 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+import time
+
+from flexmock import flexmock
+import pytest
+
+from osbs.timings import PhaseTimings
+
+
+def mock_clock(*values):
+    flexmock(time).should_receive('monotonic').and_return(*values).one_by_one()
+
+
+def test_phase_durations_add_up():
+    timings = PhaseTimings()
+    mock_clock(10.0, 10.5, 20.0, 20.25)
+
+    with timings.phase('validation'):
+        pass
+    with pytest.raises(ValueError):
+        with timings.phase('validation'):
+            raise ValueError('invalid')
+
+    assert timings.get('validation') == 0.75
+    assert timings.get('create') is None
+
+
+def test_record_since():
+    timings = PhaseTimings()
+    # mark is not set, nothing is recorded
+    mock_clock(1.0, 5.0, 7.0, 9.0)
+    timings.record_since('time_to_start', 'created')
+    timings.mark('created')
+    timings.record_since('time_to_start', 'created')
+    # recorded only the first time
+    timings.record_since('time_to_start', 'created')
+
+    assert timings.as_dict() == {'time_to_start': 2.0}
+
+
+def test_as_dict_rounds_to_milliseconds():
+    timings = PhaseTimings()
+    mock_clock(0.0, 1.23456)
+
+    with timings.phase('repo_fetch'):
+        pass
+
+    assert timings.as_dict() == {'repo_fetch': 1.235}
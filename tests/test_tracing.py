@@ -0,0 +1,250 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+import pytest
+
+from osbs import tracing
+from osbs.api import osbsapi
+from tests.fake_openshift import FakeOpenshift, PipelineLifecycle
+from tests.load_harness import create_git_repos, create_osbs
+
+
+class RecordingSpan(tracing.Span):
+    def __init__(self, name, attributes, parent):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.parent = parent
+        self.exception = None
+        self.ended = False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exception):
+        self.exception = exception
+
+    def is_recording(self):
+        return True
+
+
+class RecordingTracer(tracing.Tracer):
+    def __init__(self):
+        self.spans = []
+        self._current = []
+
+    def start_span(self, name, attributes=None, current=True):
+        span = RecordingSpan(name, attributes, self._current[-1] if self._current else None)
+        self.spans.append(span)
+        if current:
+            self._current.append(span)
+        return span
+
+    def end_span(self, span):
+        if self._current and self._current[-1] is span:
+            self._current.pop()
+        span.ended = True
+
+    def activate(self, span):
+        self._current.append(span)
+
+    def deactivate(self, token):
+        self._current.pop()
+
+    def find(self, name):
+        return [span for span in self.spans if span.name == name]
+
+
+@pytest.fixture
+def tracer():
+    previous = tracing.get_tracer()
+    tracer = RecordingTracer()
+    tracing.set_tracer(tracer)
+    yield tracer
+    tracing.set_tracer(previous)
+
+
+def test_span_records_exception(tracer):
+    with pytest.raises(ValueError):
+        with tracing.span('failing', attribute='value'):
+            raise ValueError('bad')
+
+    span, = tracer.spans
+    assert span.attributes == {'attribute': 'value'}
+    assert isinstance(span.exception, ValueError)
+    assert span.ended
+
+
+def test_default_tracer_is_noop():
+    tracing.set_tracer(None)
+    try:
+        with tracing.span('nothing') as span:
+            span.set_attribute('key', 'value')
+    finally:
+        tracing.set_tracer(tracing.OpenTelemetryTracer() if tracing.otel_trace
+                           else tracing.Tracer())
+
+
+def test_submission_and_monitoring_spans(tracer, tmp_path):
+    lifecycle = PipelineLifecycle(tasks=('prebuild', 'build'), steps=('step-a',),
+                                  task_duration=0.01, log_lines=2)
+    with FakeOpenshift(lifecycle=lifecycle) as server:
+        repo = create_git_repos(str(tmp_path), 1)[0]
+        osbs = create_osbs(server.url, str(tmp_path))
+        pipeline_run = osbs.create_binary_container_pipeline_run(
+            user='user', target='target',
+            default_buildtime_limit=osbs.os_conf.get_default_buildtime_limit(),
+            max_buildtime_limit=osbs.os_conf.get_max_buildtime_limit(),
+            **repo)
+        list(pipeline_run.get_logs(follow=True, wait=True))
+        osbs.wait_for_build_to_finish(pipeline_run.pipeline_run_name)
+
+    submission, = tracer.find('osbs.create_binary_container_pipeline_run')
+    phases = [span.name for span in tracer.spans if span.parent is submission]
+    assert phases == ['git clone', 'check labels', 'user params', 'render pipeline run',
+                      'create pipeline run']
+
+    create, = tracer.find('create pipeline run')
+    assert create.attributes['osbs.pipeline_run'] == pipeline_run.pipeline_run_name
+    post, = [span for span in tracer.spans if span.parent is create]
+    assert post.name == 'HTTP POST pipelineruns'
+    assert post.attributes['http.status_code'] == 201
+    assert post.attributes['osbs.retries'] == 0
+
+    assert {span.attributes['osbs.resource'] for span in tracer.find('watch')} >= \
+        {'pipelineruns', 'taskruns'}
+    assert {span.attributes['osbs.pipeline_run'] for span in tracer.find('stream logs')} == \
+        {pipeline_run.pipeline_run_name}
+    wait, = tracer.find('osbs.wait_for_build_to_finish')
+    assert [span.name for span in tracer.spans if span.parent is wait][0] == 'wait for finish'
+    # watches read in background threads end right after their consumers
+    for thread in threading.enumerate():
+        if thread.name == 'osbs-watch':
+            thread.join(timeout=5)
+    assert all(span.ended for span in tracer.spans)
+
+
+def test_opentelemetry_adapter():
+    pytest.importorskip('opentelemetry.sdk')
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    previous = tracing.get_tracer()
+    tracing.set_tracer(tracing.OpenTelemetryTracer(tracer_provider=provider))
+    try:
+        with tracing.span('parent', **{'osbs.pipeline_run': 'build-1', 'unset': None}):
+            with tracing.span('child'):
+                pass
+            detached = tracing.get_tracer().start_span('detached', current=False)
+            tracing.get_tracer().end_span(detached)
+    finally:
+        tracing.set_tracer(previous)
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    assert dict(spans['parent'].attributes) == {'osbs.pipeline_run': 'build-1'}
+    assert spans['child'].parent.span_id == spans['parent'].context.span_id
+    assert spans['detached'].parent.span_id == spans['parent'].context.span_id
+
+
+def test_opentelemetry_propagate_to_threads():
+    pytest.importorskip('opentelemetry.sdk')
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    previous = tracing.get_tracer()
+    tracing.set_tracer(tracing.OpenTelemetryTracer(tracer_provider=provider))
+
+    def download(container):
+        with tracing.span(f'download {container}'):
+            pass
+
+    try:
+        with tracing.span('parent'):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(tracing.propagate(download), ['a', 'b']))
+            detached = tracing.get_tracer().start_span('generator', current=False)
+            token = tracing.get_tracer().activate(detached)
+            with tracing.span('item'):
+                pass
+            tracing.get_tracer().deactivate(token)
+            with tracing.span('consumer'):
+                pass
+            tracing.get_tracer().end_span(detached)
+    finally:
+        tracing.set_tracer(previous)
+
+    spans = {span.name: span for span in exporter.get_finished_spans()}
+    parent_id = spans['parent'].context.span_id
+    assert spans['download a'].parent.span_id == parent_id
+    assert spans['download b'].parent.span_id == parent_id
+    assert spans['item'].parent.span_id == spans['generator'].context.span_id
+    assert spans['consumer'].parent.span_id == parent_id
+
+
+def test_osbsapi_generator_span(tracer):
+    @osbsapi
+    def get_items():
+        for item in range(3):
+            with tracing.span(f'produce {item}'):
+                pass
+            yield item
+
+    items = get_items()
+    call, = tracer.find('osbs.get_items')
+    assert call.ended
+    assert tracer.find('osbs.get_items.iterate') == []
+
+    assert next(items) == 0
+    with tracing.span('consumer'):
+        pass
+    iterate, = tracer.find('osbs.get_items.iterate')
+    assert not iterate.ended
+    assert next(items) == 1
+    items.close()
+
+    assert iterate.ended
+    assert [span.parent for span in tracer.find('produce 0') + tracer.find('produce 1')] == \
+        [iterate, iterate]
+    consumer, = tracer.find('consumer')
+    assert consumer.parent is None
+    assert tracer.find('produce 2') == []
+
+
+def test_trace_generator_not_recorded():
+    previous = tracing.get_tracer()
+    tracing.set_tracer(None)
+    try:
+        generator = iter([1, 2])
+        assert list(tracing.trace_generator('items', generator)) == [1, 2]
+    finally:
+        tracing.set_tracer(previous)
+
+
+def test_osbsapi_generator_span_exhausted(tracer):
+    @osbsapi
+    def get_items():
+        yield 1
+        raise ValueError('failed')
+
+    items = get_items()
+    assert next(items) == 1
+    with pytest.raises(ValueError):
+        next(items)
+
+    iterate, = tracer.find('osbs.get_items.iterate')
+    assert iterate.ended
+    assert isinstance(iterate.exception, ValueError)
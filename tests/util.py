@@ -7,6 +7,8 @@ of the BSD license. See the LICENSE file for details.
 """
 from __future__ import absolute_import
 
+from collections import Counter
+from contextlib import contextmanager
 import json
 
 
@@ -22,3 +24,26 @@ class JsonMatcher(object):
         return self.expected == json.loads(json_str)
 
     __hash__ = None     # py2 compatibility
+
+
+@contextmanager
+def assert_request_budget(openshift, max_requests, operation=None):
+    """
+    Assert that no more than max_requests API requests are made in the context
+
+    :param openshift: Openshift, client making the requests
+    :param max_requests: int, budget of requests
+    :param operation: str, count only requests of this OSBS operation
+    """
+    accounting = openshift.request_accounting
+    before = Counter(accounting.counts(operation))
+    yield
+    made = Counter(accounting.counts(operation))
+    made.subtract(before)
+    made = +made
+    total = sum(made.values())
+    assert total <= max_requests, (
+        f"{total} requests made, budget is {max_requests}:\n" +
+        '\n'.join(f'{count:6d} {key.operation or "-"} {key.method} {key.endpoint}'
+                  for key, count in made.most_common())
+    )
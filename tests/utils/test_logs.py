@@ -0,0 +1,80 @@
+"""
+Copyright (c) 2022 Red Hat, Inc
+All rights reserved.
+
+This software may be modified and distributed under the terms
+of the BSD license. See the LICENSE file for details.
+"""
+from datetime import datetime
+
+import pytest
+
+from osbs.utils import UserWarningsStore
+from osbs.utils.logs import LogRecord, classify_logs, parse_log_line
+
+
+@pytest.mark.parametrize(('line', 'expected'), [
+    ('2021-11-25 23:17:49,886 platform:- - atomic_reactor.inner - INFO - YOLO 1',
+     LogRecord(None, '2021-11-25 23:17:49,886', None, 'atomic_reactor.inner', 'INFO',
+               'YOLO 1',
+               '2021-11-25 23:17:49,886 platform:- - atomic_reactor.inner - INFO - YOLO 1')),
+    ('2021-03-22 23:35:44,573 platform:x86_64 - atomic_reactor.inner - ERROR - a - b',
+     LogRecord(None, '2021-03-22 23:35:44,573', 'x86_64', 'atomic_reactor.inner', 'ERROR',
+               'a - b',
+               '2021-03-22 23:35:44,573 platform:x86_64 - atomic_reactor.inner - ERROR - a - b')),
+    ('2021-03-18 23:35:42,573 - osbs.http - DEBUG - ',
+     LogRecord(None, '2021-03-18 23:35:42,573', None, 'osbs.http', 'DEBUG', '',
+               '2021-03-18 23:35:42,573 - osbs.http - DEBUG - ')),
+    ('+ set -x', LogRecord(None, None, None, None, None, '+ set -x', '+ set -x')),
+    ('not - a - record', LogRecord(None, None, None, None, None,
+                                   'not - a - record', 'not - a - record')),
+    ('', LogRecord(None, None, None, None, None, '', '')),
+    # user warnings are recognized also with an unexpected prefix
+    ('2021-11-25T23:17:49 - atomic_reactor - USER_WARNING - {"message": "w"}',
+     LogRecord(None, None, None, None, 'USER_WARNING', '{"message": "w"}',
+               '2021-11-25T23:17:49 - atomic_reactor - USER_WARNING - {"message": "w"}')),
+    ('custom - USER_WARNING - not json',
+     LogRecord(None, None, None, None, None, 'custom - USER_WARNING - not json',
+               'custom - USER_WARNING - not json')),
+])
+def test_parse_log_line(line, expected):
+    assert parse_log_line(line) == expected
+
+
+def test_log_record_time():
+    record = parse_log_line('2021-11-25 23:17:49,886 - atomic_reactor - INFO - YOLO',
+                            task='binary-container-build')
+
+    assert record.task == 'binary-container-build'
+    assert record.time == datetime(2021, 11, 25, 23, 17, 49, 886000)
+    assert parse_log_line('YOLO').time is None
+
+
+def test_classify_logs():
+    logs = [
+        ('prebuild', '2021-11-25 23:17:49,886 platform:- - atomic_reactor.inner - INFO - YOLO 1'),
+        ('prebuild', '2021-11-25 23:17:50,000 platform:- - smth - USER_WARNING - '
+                     '{"message": "user warning"}'),
+        ('build', '2021-11-25 23:17:51,000 platform:- - smth - USER_WARNING - load info'),
+        ('build', 'plain output'),
+        ('build', '2021-11-25T23:17:52 - smth - USER_WARNING - {"message": "odd prefix"}'),
+    ]
+    user_warnings = UserWarningsStore()
+
+    records = list(classify_logs(iter(logs), user_warnings))
+
+    assert [(record.task, record.level, record.message) for record in records] == [
+        ('prebuild', 'INFO', 'YOLO 1'),
+        ('build', 'USER_WARNING', 'load info'),
+        ('build', None, 'plain output'),
+    ]
+    assert set(user_warnings) == {'odd prefix', 'user warning'}
+
+
+def test_classify_logs_keep_user_warnings():
+    logs = [('prebuild', '2021-11-25 23:17:50,000 - smth - USER_WARNING - {"message": "w"}')]
+
+    records = list(classify_logs(logs))
+
+    assert len(records) == 1
+    assert records[0].is_user_warning
@@ -21,7 +21,7 @@ from osbs.exceptions import OsbsValidationException
 import json
 import jsonschema
 import os
-import pkg_resources
+import pkgutil
 import pytest
 import yaml
 import re
@@ -62,15 +62,9 @@ def test_read_yaml_bad_package(caplog):
 
 
 def test_read_yaml_file_bad_extract(tmpdir, caplog):
-    class FakeProvider(object):
-        def get_resource_stream(self, pkg, rsc):
-            raise IOError
-
-    # pkg_resources.resource_stream() cannot be mocked directly
-    # Instead mock the module-level function it calls.
-    (flexmock(pkg_resources)
-        .should_receive('get_provider')
-        .and_return(FakeProvider()))
+    (flexmock(pkgutil)
+        .should_receive('get_data')
+        .and_raise(IOError))
 
     config_path = os.path.join(str(tmpdir), 'config.yaml')
     with open(config_path, 'w'):
@@ -83,7 +77,7 @@ def test_read_yaml_file_bad_extract(tmpdir, caplog):
 
 def test_read_yaml_file_bad_decode(tmpdir, caplog):
     (flexmock(json)
-        .should_receive('load')
+        .should_receive('loads')
         .and_raise(ValueError))
 
     config_path = os.path.join(str(tmpdir), 'config.yaml')
@@ -140,7 +134,7 @@ def test_load_schema_schema(schema, schema_pass, caplog):
     package = 'osbs'
     if not schema_pass:
         (flexmock(json)
-            .should_receive('load')
+            .should_receive('loads')
             .and_raise(ValueError))
         with pytest.raises(ValueError):
             load_schema(package, schema)